@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of the line parser of `Preprocess`.
+
+Compares the rows per second of the per-cell routine the parser used before the
+column plan was introduced, which looked up the table and formatted the header of
+every cell on every line, with the precompiled column plan.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_read_rtf.py [path] [repeat]
+"""
+
+import sys
+import time
+from typing import Callable, Dict, List
+from football_manager_scouting.backend.preprocess_data import Preprocess, CATEGORIES
+from football_manager_scouting.category_mappings.category_map import CATEGORY_MAP
+
+
+def parse_line_per_cell(process: Preprocess,
+                        line: str,
+                        column_headers: List[str],
+                        converters: Dict[tuple, Callable]) -> Dict[str, Dict[str, int | float | str]]:
+    """The per-cell parser, looking up the table, column name and converter of each cell on every line."""
+
+    tables = {category: {} for category in CATEGORIES}
+
+    line = {column_header: elem.strip()
+            for column_header, elem in zip(column_headers, process._clean_line(line))}
+
+    for column_header, value in line.items():
+
+        category = CATEGORY_MAP[column_header]
+
+        if category != 'Unused':
+            column = process._format_header(column_header)
+            tables[category][column] = converters[category, column](value)
+
+    if tables['Player']:
+        tables['Player']['season'] = process._season
+
+    return tables
+
+
+def time_parser(parse: Callable[[str], Dict], lines: List[str], repeat: int) -> float:
+    """Returns the best rows per second of the parser over a number of runs."""
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            parse(line)
+        best = min(best, time.perf_counter() - start)
+
+    return len(lines) / best
+
+
+def main(path: str = './data/test_data.rtf', repeat: int = 5) -> None:
+    process = Preprocess(season='24')
+
+    with open(path, 'r', encoding='utf-8') as fhand:
+        column_headers = process._get_column_headers(fhand.readline())
+        lines = [line for line in fhand if process._is_content(line)]
+
+    plan = process._compile_plan(column_headers)
+    converters = {(table, column): convert for _, table, column, convert in plan}
+
+    per_cell = time_parser(lambda line: parse_line_per_cell(process, line, column_headers, converters),
+                           lines, repeat)
+    planned = time_parser(lambda line: process._parse_line(line, plan), lines, repeat)
+
+    print(f'{len(lines)} rows, {len(column_headers)} columns')
+    print(f'per cell:    {per_cell:10.0f} rows/s')
+    print(f'column plan: {planned:10.0f} rows/s ({planned / per_cell:.2f}x)')
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2], *[int(arg) for arg in sys.argv[2:3]])
@@ -0,0 +1,152 @@
+"""
+Generates synthetic Football Manager exports for benchmarking the ingest.
+
+The rows of a template export, by default `data/test_data.rtf`, are repeated
+`scale` times with the same column layout, so that every header is one that
+`CATEGORY_MAP` expects. Each copy of a row gets a unique UID, a numbered name,
+jittered per-90 stats and minutes, and from the second copy onwards a numbered
+club, so that the number of players and clubs grows with the scale like in a
+larger save. The file is written row by row and never held in memory.
+
+Usage:
+    PYTHONPATH=src python benchmarks/generate_export.py [--scale 10 100 1000] [--out-dir benchmarks/data]
+"""
+
+import argparse
+import os
+import random
+from typing import List
+from football_manager_scouting.backend.preprocess_data import Preprocess
+from football_manager_scouting.category_mappings.category_map import CATEGORY_MAP
+
+
+TEMPLATE = './data/test_data.rtf'
+
+
+def _read_template(template: str):
+    """Returns the header line, the row border line and the content lines of an export."""
+
+    process = Preprocess(season='')
+
+    with open(template, 'r', encoding='utf-8', newline='') as fhand:
+        header = fhand.readline()
+        border = fhand.readline()
+        rows = [line for line in fhand if process._is_content(line.replace('\r\n', '\n'))]
+
+    return header, border, rows
+
+
+def _jitter_float(cell: str, rng: random.Random) -> str:
+    value = cell.strip()
+
+    if value == '-':
+        return cell
+
+    return f'{float(value) * rng.uniform(0.8, 1.2):.2f}'.ljust(len(cell))
+
+
+def _jitter_int(cell: str, rng: random.Random) -> str:
+    value = cell.strip().replace(',', '').replace(' ', '')
+
+    if not value.isdigit():
+        return cell
+
+    return str(int(int(value) * rng.uniform(0.8, 1.2))).ljust(len(cell))
+
+
+def _numbered(cell: str, n: int, max_length: int) -> str:
+    return f'{cell.strip()[:max_length - len(str(n)) - 1]} {n}'.ljust(len(cell))
+
+
+def _mutate(cells: List[str], column_headers: List[str], copy: int, uid: int, rng: random.Random) -> List[str]:
+    """Returns the cells of a template row for one copy of the row."""
+
+    cells = list(cells)
+
+    for i, column_header in enumerate(column_headers):
+
+        if CATEGORY_MAP[column_header] == 'Stats':
+            cells[i] = _jitter_float(cells[i], rng)
+
+        elif column_header == 'Mins':
+            cells[i] = _jitter_int(cells[i], rng)
+
+        elif column_header == 'UID':
+            cells[i] = f' {uid}'.ljust(len(cells[i]))
+
+        elif column_header == 'Name' and copy > 0:
+            cells[i] = ' ' + _numbered(cells[i], copy, 50)
+
+        elif column_header == 'Club' and copy > 0:
+            cells[i] = ' ' + _numbered(cells[i], copy, 100)
+
+    return cells
+
+
+def generate_export(path: str,
+                    scale: int,
+                    template: str = TEMPLATE,
+                    seed: int = 0) -> int:
+    """
+    Writes a synthetic export with `scale` times as many rows as the template.
+
+    Parameters:
+    ----------
+    path : str
+        The path of the generated file.
+    scale : int
+        How many copies of each row of the template to write.
+    template : str, optional
+        The export used as template. Default is the test data.
+    seed : int, optional
+        The seed of the random jitter, so that a scale always gives the same file.
+
+    Returns:
+    -------
+    int
+        The number of rows written.
+    """
+
+    rng = random.Random(seed)
+    header, border, rows = _read_template(template)
+    column_headers = Preprocess(season='')._get_column_headers(header)
+
+    # Keeps the line terminator of the template, e.g. CRLF for exports from Windows.
+    newline = '\r\n' if header.endswith('\r\n') else '\n'
+
+    n = 0
+    with open(path, 'w', encoding='utf-8', newline='') as fhand:
+        fhand.write(header)
+        fhand.write(border)
+
+        for copy in range(scale):
+            for row in rows:
+                cells = row.rstrip('\r\n').split('|')
+
+                # The first and the last cell are the empty strings outside the outer pipes.
+                cells[1:-1] = _mutate(cells[1:-1], column_headers, copy, 10**9 + n, rng)
+
+                fhand.write('|'.join(cells) + newline)
+                fhand.write(border)
+                n += 1
+
+    return n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Generate synthetic FM exports at several scales.')
+    parser.add_argument('--scale', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--out-dir', default='./benchmarks/data')
+    parser.add_argument('--template', default=TEMPLATE)
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    for scale in args.scale:
+        path = os.path.join(args.out_dir, f'export_{scale}x.rtf')
+        n = generate_export(path, scale, template=args.template)
+        print(f'{path}: {n} rows, {os.path.getsize(path) / 1024**2:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
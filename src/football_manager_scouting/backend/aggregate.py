@@ -0,0 +1,51 @@
+from typing import Dict, Iterator, Sequence, Tuple
+
+
+class Aggregates:
+    """
+    The statistics of a cohort of players, as computed in the database by `Interact.aggregate`.
+
+    Attributes:
+    ----------
+    count : int
+        The number of players of the cohort.
+    stats : dict
+        The 'min', 'max', 'avg' and 'stddev' of each stat, by stat name, and its 'percentiles' by
+        fraction if any were asked for. The stddev is None for a cohort of one player.
+    """
+
+    __slots__ = ('count', 'stats')
+
+    def __init__(self,
+                 count: int,
+                 stats: Dict[str, Dict[str, float | None | Dict[float, float]]]) -> None:
+        self.count = count
+        self.stats = stats
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, stat: str) -> Dict[str, float | None | Dict[float, float]]:
+        return self.stats[stat]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.stats)
+
+    @classmethod
+    def from_row(cls,
+                 row: Sequence[float],
+                 stats: Sequence[str],
+                 percentiles: Tuple[float, ...]) -> 'Aggregates':
+        """Builds the aggregates from the row of the query of `Interact._aggregate_query`."""
+
+        count, values = row[0], iter(row[1:])
+        aggregates = {}
+
+        for stat in stats:
+            aggregates[stat] = {'min': next(values), 'max': next(values),
+                                'avg': next(values), 'stddev': next(values)}
+
+            if percentiles:
+                aggregates[stat]['percentiles'] = {percentile: next(values) for percentile in percentiles}
+
+        return cls(count, aggregates)
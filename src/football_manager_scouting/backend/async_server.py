@@ -0,0 +1,196 @@
+import asyncio
+from typing import Dict, Iterable, List, Tuple
+from football_manager_scouting.backend.server import Interact
+from football_manager_scouting.backend.tables import Player, PlayerInfo, Attributes, Stats, Ca, Contract
+from football_manager_scouting.backend.query_cache import QueryCache
+from football_manager_scouting.backend.lookup_cache import LookupCache
+from football_manager_scouting.backend.frame import PlayerFrame
+from football_manager_scouting.backend.aggregate import Aggregates
+from football_manager_scouting.backend.errors import NoPlayerFoundError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class AsyncInteract:
+    """
+    Runs the queries of `Interact.project` on an asyncio engine, so that many queries can run
+    at once, each on a connection of the pool.
+
+    The queries are built by an `Interact` of the same database, which also creates the schema
+    if needed, once per shape of filters, see `StatementCache`. Building a query runs none, apart
+    from resolving the ids of position, division and eligibility names the first time they are
+    seen, see `LookupCache`, which is done in a worker thread so that the event loop is not blocked.
+    The values of the filters are parameters, so asyncpg prepares each shape once per connection.
+    """
+
+    def __init__(self,
+                 engine: AsyncEngine,
+                 interact: Interact) -> None:
+        """
+        Initializes an AsyncInteract instance.
+
+        Parameters:
+        ----------
+        engine : AsyncEngine
+            The asyncio engine the queries run on, see `Setup.create_async_engine`.
+        interact : Interact
+            An `Interact` of the same database, used to build the queries.
+        """
+
+        self.engine = engine
+        self.interact = interact
+
+    async def _shape(self, pos, mins, name, division, min_ca, eligible, season, attributes) -> Tuple[tuple, dict]:
+        """
+        Returns the shape of the filters and the values of its parameters, see `Interact._shape`.
+
+        Names of positions, divisions or eligibility that are not in the `LookupCache` are looked up
+        with the blocking engine of the `Interact`, so the shape is then built in a worker thread. The
+        version stamps the cached ids are checked against are read on the asyncio engine.
+        """
+
+        filters = (pos, mins, name, division, min_ca, eligible, season, attributes)
+        lookups = LookupCache.get(self.interact.engine)
+
+        names = {'Position': pos if pos else [], 'Division': division if division else [],
+                 'Eligible': [eligible] if eligible is not None else []}
+
+        if not any(names.values()):
+            return self.interact._shape(*filters)
+
+        versions = await self.versions()
+        lookups.validate(versions)
+
+        if all(lookups.cached(table_name, values if isinstance(values, (tuple, list)) else [values])
+               for table_name, values in names.items()):
+            return self.interact._shape(*filters, versions=versions)
+
+        return await asyncio.to_thread(self.interact._shape, *filters, versions=versions)
+
+    async def project(self,
+                      pos: Iterable[str] | str = None,
+                      mins: int = 0,
+                      name: Iterable[str] | str = None,
+                      division: Iterable[str] | str = None,
+                      min_ca: int = 0,
+                      eligible: str = None,
+                      season: Iterable[str] | str = None,
+                      attributes: Dict[str, int] = None,
+                      columns = (Player, PlayerInfo,
+                                 Ca, Contract, Stats, Attributes),
+                      fields: Dict[str, Iterable[str]] = None) -> List[Tuple[str, dict]]:
+        """
+        Retrieves player records from the database as plain values, already unpacked into their tables.
+
+        Takes the same arguments as `Interact.project` and gives the same players, but all at once
+        rather than one by one. The rows are streamed from a server-side cursor on a connection of
+        the pool, so other queries can run meanwhile.
+
+        Returns:
+        -------
+        list of tuple
+            A tuple containing the player's unique ID and the columns and values of each table of the player,
+            by table name, for each player.
+
+        Raises:
+        ------
+        NoPlayerFoundError
+            If no players match the specified filtering criteria.
+        UnexpectedColumnNameError
+            If given an attribute name that is not a column of the attributes table.
+        """
+
+        shape, params = await self._shape(pos, mins, name, division, min_ca, eligible, season, attributes)
+        results_query, unpack = self.interact._project_query(columns, shape, fields)
+
+        async with self.engine.connect() as connection:
+            results = await connection.stream(results_query.execution_options(yield_per=Interact.YIELD_PER), params)
+            players = [(row[0], unpack(row)) async for row in results]
+
+        if not players:
+            raise NoPlayerFoundError('No players found with the given filters.')
+
+        return players
+
+    async def project_frame(self,
+                            pos: Iterable[str] | str = None,
+                            mins: int = 0,
+                            name: Iterable[str] | str = None,
+                            division: Iterable[str] | str = None,
+                            min_ca: int = 0,
+                            eligible: str = None,
+                            season: Iterable[str] | str = None,
+                            attributes: Dict[str, int] = None,
+                            columns = (Player, PlayerInfo,
+                                       Ca, Contract, Stats, Attributes),
+                            fields: Dict[str, Iterable[str]] = None) -> PlayerFrame:
+        """
+        Retrieves player records from the database as a `PlayerFrame`, see `Interact.project_frame`.
+
+        Raises:
+        ------
+        NoPlayerFoundError
+            If no players match the specified filtering criteria.
+        UnexpectedColumnNameError
+            If given an attribute name that is not a column of the attributes table.
+        """
+
+        shape, params = await self._shape(pos, mins, name, division, min_ca, eligible, season, attributes)
+        results_query, unpack = self.interact._project_query(columns, shape, fields)
+
+        async with self.engine.connect() as connection:
+            results = await connection.stream(results_query.execution_options(yield_per=Interact.YIELD_PER), params)
+            batches = [batch async for batch in results.partitions()]
+
+        frame = PlayerFrame.from_batches(batches, unpack.layout, unpack.ranges, self.interact._frame_dtypes(columns))
+
+        if not len(frame):
+            raise NoPlayerFoundError('No players found with the given filters.')
+
+        return frame
+
+    async def aggregate(self,
+                        pos: Iterable[str] | str = None,
+                        mins: int = 0,
+                        name: Iterable[str] | str = None,
+                        division: Iterable[str] | str = None,
+                        min_ca: int = 0,
+                        eligible: str = None,
+                        season: Iterable[str] | str = None,
+                        attributes: Dict[str, int] = None,
+                        stats: Iterable[str] = None,
+                        percentiles: Iterable[float] = ()) -> Aggregates:
+        """
+        Computes the aggregates of stats over the players matching the filters, see `Interact.aggregate`.
+
+        Raises:
+        ------
+        NoPlayerFoundError
+            If no players match the specified filtering criteria.
+        UnexpectedColumnNameError
+            If given an attribute name or a stat name that is not a column of its table.
+        """
+
+        percentiles = tuple(percentiles)
+        shape, params = await self._shape(pos, mins, name, division, min_ca, eligible, season, attributes)
+        results_query, stats = self.interact._aggregate_query(shape, stats, percentiles)
+
+        async with self.engine.connect() as connection:
+            row = (await connection.execute(results_query, params)).one()
+
+        if not row[0]:
+            raise NoPlayerFoundError('No players found with the given filters.')
+
+        return Aggregates.from_row(row, stats, percentiles)
+
+    async def versions(self, season: Iterable[str] | str = None) -> tuple:
+        """Returns the current version stamps of the seasons, or of all seasons if None, see `QueryCache.versions`."""
+
+        async with self.engine.connect() as connection:
+            results = await connection.execute(QueryCache.versions_query(season))
+
+        return tuple(sorted(tuple(row) for row in results))
+
+    async def dispose(self) -> None:
+        """Closes the connections of the pool. Should be awaited before the event loop is closed."""
+
+        await self.engine.dispose()
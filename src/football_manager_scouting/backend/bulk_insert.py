@@ -0,0 +1,317 @@
+import csv
+import io
+import itertools
+from typing import Dict, Iterable, List, Tuple
+from football_manager_scouting.backend.tables import (Player, PlayerInfo, Attributes, Stats, Ca, Contract)
+from football_manager_scouting.backend.errors import UnexpecteTableNameError, UnexpectedColumnNameError
+from football_manager_scouting.backend.checkpoint import checkpoint_statement, clear_checkpoint_statement
+from football_manager_scouting.backend.query_cache import bump_version_statement
+import sqlalchemy
+from sqlalchemy import text
+
+
+class BulkInsert:
+    """
+    Bulk writer that streams player records into PostgreSQL with `COPY FROM STDIN`.
+
+    Works as a drop-in replacement for the `insert`/`commit` pair of `Interact`
+    when inserting a large number of players. Instead of building an ORM object
+    graph for each player, every record is written as a CSV line to an in-memory
+    buffer with one buffer per table. The buffers are copied to the database on
+    commit, all within one transaction.
+
+    The `_id` of each player is assigned client-side from a range reserved from
+    the sequence of the player table, which makes it possible to write the
+    `_playerID` foreign key of the child tables without waiting for the database.
+
+    Players written with `upsert` replace the player with the same `uid` and `season`
+    if it already exists. The existing player and its tables are deleted and the new
+    rows are copied with the `_id` of the existing player, in the same transaction.
+    """
+
+    TABLES = {'Player': Player, 'PlayerInfo': PlayerInfo, 'Attributes': Attributes,
+              'Stats': Stats, 'Ca': Ca, 'Contract': Contract}
+
+    def __init__(self,
+                 engine: sqlalchemy.engine.Engine,
+                 reserve: int = 10000) -> None:
+        """
+        Initializes the writer.
+
+        Parameters:
+        ----------
+        engine : sqlalchemy.engine.Engine
+            Engine connected to the PostgreSQL database.
+        reserve : int, optional
+            The number of player ids reserved from the sequence at a time. Default is 10000.
+        """
+
+        self.engine = engine
+        self.reserve = reserve
+
+        # The columns written for each table, in the order they appear in the table.
+        self._columns: Dict[str, List[str]] = {
+            table_name: [column.name for column in table.__table__.columns if column.name != '_id']
+            for table_name, table in self.TABLES.items()
+        }
+        self._columns['Player'].insert(0, '_id')
+
+        # Positions of the integer columns. COPY does not cast floats to integers
+        # like an INSERT does, so those values are rounded before being written.
+        self._integer_columns: Dict[str, List[int]] = {
+            table_name: [i for i, column in enumerate(columns)
+                         if isinstance(self.TABLES[table_name].__table__.columns[column].type, sqlalchemy.Integer)]
+            for table_name, columns in self._columns.items()
+        }
+
+        # Positions of the array columns, e.g. the positions of a player. Written as PostgreSQL array literals.
+        self._array_columns: Dict[str, List[int]] = {
+            table_name: [i for i, column in enumerate(columns)
+                         if isinstance(self.TABLES[table_name].__table__.columns[column].type, sqlalchemy.ARRAY)]
+            for table_name, columns in self._columns.items()
+        }
+
+        self._ids: List[int] = []
+        self._checkpoint = None
+        self._season_version = None
+        self._reset_buffers()
+
+    def _reset_buffers(self) -> None:
+        # The records are kept until commit, when the ids of the upserted players are known.
+        # Upserted players are keyed by (uid, season) so that a later record of the same player replaces the earlier.
+        self._records: Dict[Tuple[str, str] | int, Tuple[Dict, Dict]] = {}
+        self._inserts = itertools.count()
+        self._buffers = {table_name: io.StringIO() for table_name in self.TABLES}
+        self._writers = {table_name: csv.writer(buffer, lineterminator='\n')
+                         for table_name, buffer in self._buffers.items()}
+
+    def _reserve_ids(self) -> None:
+        """Reserves a new range of ids from the sequence of the player table."""
+
+        query = text("SELECT nextval(pg_get_serial_sequence('player', '_id')) "
+                     "FROM generate_series(1, :n)")
+
+        with self.engine.begin() as connection:
+            self._ids = [row[0] for row in connection.execute(query, {'n': self.reserve})]
+
+        # Pop from the end of the list.
+        self._ids.reverse()
+
+    def _check_columns(self,
+                       table_name: str,
+                       table: Dict[str, str | int | float]) -> None:
+
+        columns = self._columns[table_name]
+
+        unexpected = set(table) - set(columns)
+        if unexpected:
+            expected_cols = ', '.join([column for column in columns if not column.startswith('_')])
+            found_cols = ', '.join(list(table.keys()))
+            raise UnexpectedColumnNameError(f"Unexpected mapped column!\nExpected columns: {expected_cols},\nbut found columns: {found_cols}")
+
+    def _write_row(self,
+                   table_name: str,
+                   table: Dict[str, str | int | float]) -> None:
+
+        row = [table.get(column) for column in self._columns[table_name]]
+
+        for i in self._integer_columns[table_name]:
+            if isinstance(row[i], float):
+                row[i] = round(row[i])
+
+        for i in self._array_columns[table_name]:
+            if row[i] is not None:
+                row[i] = '{' + ','.join(map(str, row[i])) + '}'
+
+        self._writers[table_name].writerow(row)
+
+    def insert(self,
+               tables: Dict[str, Dict[str, str | float] |
+                                 Iterable[Dict[str, int]]],
+               player_table: Dict[str, str | int],
+               ) -> None:
+        """
+        Writes the player record and its associated tables to the COPY buffers.
+
+        Takes the same arguments as `Interact.insert`.
+
+        Parameters:
+        ----------
+        tables : dict
+            A dictionary where keys are table names and values are either a dictionary of attributes
+            or a tuple of dictionaries representing individual records to be inserted.
+        player_table : dict
+            A dictionary of attributes representing the player record to be inserted.
+
+        Raises:
+        ------
+        UnexpecteTableNameError
+            If given a table name not import from tables.py.
+        UnexpectedColumnNameError
+            If given a column name not present in the table mapping.
+        """
+
+        self._records[next(self._inserts)] = self._check(tables, player_table)
+
+    def upsert(self,
+               tables: Dict[str, Dict[str, str | float] |
+                                 Iterable[Dict[str, int]]],
+               player_table: Dict[str, str | int],
+               ) -> None:
+        """
+        Writes the player record and its associated tables to the COPY buffers, replacing the player if it already exists.
+
+        Takes the same arguments as `Interact.upsert`. A player is identified by its `uid` and `season`.
+
+        Raises:
+        ------
+        UnexpecteTableNameError
+            If given a table name not import from tables.py.
+        UnexpectedColumnNameError
+            If given a column name not present in the table mapping.
+        """
+
+        # Compared as strings with the columns of the player table, e.g. when the season is given as an int.
+        key = (str(player_table.get('uid')), str(player_table.get('season')))
+
+        self._records.pop(key, None)
+        self._records[key] = self._check(tables, player_table)
+
+    def checkpoint(self,
+                   fingerprint: str,
+                   season: str,
+                   offset: int) -> None:
+        """Saves how far into a file the ingest has come. The checkpoint is written with the next commit, see `Interact.checkpoint`."""
+
+        self._checkpoint = checkpoint_statement(fingerprint, season, offset)
+
+    def clear_checkpoint(self,
+                         fingerprint: str,
+                         season: str) -> None:
+        """Deletes the checkpoint of a file whose lines have all been inserted. The checkpoint is deleted with the next commit, see `Interact.clear_checkpoint`."""
+
+        self._checkpoint = clear_checkpoint_statement(fingerprint, season)
+
+    def bump_season_version(self, season: str) -> None:
+        """Gives a season a new version stamp. The stamp is written with the next commit, see `Interact.bump_season_version`."""
+
+        self._season_version = bump_version_statement(str(season))
+
+    def _check(self,
+               tables: Dict[str, Dict[str, str | float] |
+                                 Iterable[Dict[str, int]]],
+               player_table: Dict[str, str | int]) -> Tuple[Dict, Dict]:
+        """Validates the table and column names of a player record and returns it."""
+
+        for table_name in tables:
+            if table_name not in self.TABLES or table_name == 'Player':
+                raise UnexpecteTableNameError(f"Cannot find ORM table mapping with the name `{table_name}`.")
+
+        self._check_columns('Player', player_table)
+
+        for table_name, table in tables.items():
+
+            if not isinstance(table, (tuple, list)):
+                table = (table,)
+
+            for t in table:
+                self._check_columns(table_name, t)
+
+        return player_table, tables
+
+    def _replace_existing(self, connection: sqlalchemy.engine.Connection) -> Dict[Tuple[str, str], int]:
+        """
+        Deletes the upserted players that already exist, together with their tables.
+
+        Returns the `_id` of each deleted player by (uid, season), to be reused for the new rows.
+        """
+
+        keys = [key for key in self._records if isinstance(key, tuple)]
+
+        if not keys:
+            return {}
+
+        query = text('SELECT p._id, p.uid, p.season FROM player p '
+                     'JOIN unnest(:uids, :seasons) AS k(uid, season) '
+                     'ON p.uid = k.uid AND p.season = k.season')
+
+        existing = {(uid, season): id for id, uid, season in
+                    connection.execute(query, {'uids': [uid for uid, _ in keys],
+                                               'seasons': [season for _, season in keys]})}
+
+        if existing:
+            ids = list(existing.values())
+
+            # The player table must be deleted from last since the other tables reference it.
+            for table_name, table in self.TABLES.items():
+                if table_name != 'Player':
+                    connection.execute(text(f'DELETE FROM "{table.__tablename__}" WHERE "_playerID" = ANY(:ids)'),
+                                       {'ids': ids})
+
+            connection.execute(text('DELETE FROM player WHERE _id = ANY(:ids)'), {'ids': ids})
+
+        return existing
+
+    def commit(self,
+               close: bool = True,
+               verbose: bool = False) -> None:
+        """
+        Copies the buffered records to the database in one transaction and empties the buffers.
+
+        Parameters:
+        ----------
+        close : bool, optional
+            Kept for compatibility with `Interact.commit`. The connection is always returned to the pool.
+        verbose : bool, optional
+            Print progress messages. Default is False.
+        """
+
+        if verbose:
+            print(f'Copying {len(self._records)} entries...')
+
+        with self.engine.begin() as connection:
+
+            existing = self._replace_existing(connection)
+
+            for key, (player_table, tables) in self._records.items():
+
+                if key in existing:
+                    player_id = existing[key]
+                else:
+                    if not self._ids:
+                        self._reserve_ids()
+                    player_id = self._ids.pop()
+
+                self._write_row('Player', {'_id': player_id, **player_table})
+
+                for table_name, table in tables.items():
+
+                    if not isinstance(table, (tuple, list)):
+                        table = (table,)
+
+                    for t in table:
+                        self._write_row(table_name, {'_playerID': player_id, **t})
+
+            cursor = connection.connection.cursor()
+
+            # The player table must be copied first since the other tables reference it.
+            for table_name, table in self.TABLES.items():
+                buffer = self._buffers[table_name]
+                buffer.seek(0)
+
+                columns = ', '.join([f'"{column}"' for column in self._columns[table_name]])
+                cursor.copy_expert(f'COPY "{table.__tablename__}" ({columns}) FROM STDIN WITH (FORMAT csv)',
+                                   buffer)
+
+            if self._checkpoint is not None:
+                connection.execute(self._checkpoint)
+
+            if self._season_version is not None:
+                connection.execute(self._season_version)
+
+        self._checkpoint = None
+        self._season_version = None
+        self._reset_buffers()
+
+        if verbose:
+            print('All entries commited to database!')
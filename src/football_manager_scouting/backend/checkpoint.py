@@ -0,0 +1,81 @@
+import hashlib
+import os
+from football_manager_scouting.backend.tables import Checkpoint
+import sqlalchemy
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+
+def fingerprint(path: str, sample: int = 1024 * 1024) -> str:
+    """
+    Returns a fingerprint of a file, used to recognise the file when an interrupted ingest is resumed.
+
+    The fingerprint is the SHA-256 of the size of the file together with its first and
+    last `sample` bytes, so that it can be computed without reading a multi-GB file.
+
+    Parameters:
+    ----------
+    path : str
+        The path of the file.
+    sample : int, optional
+        The number of bytes read from the beginning and the end of the file. Default is 1 MB.
+
+    Returns:
+    -------
+    str
+        The hexadecimal digest of the fingerprint.
+    """
+
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as fhand:
+        size = os.fstat(fhand.fileno()).st_size
+        digest.update(str(size).encode())
+        digest.update(fhand.read(sample))
+
+        if size > sample:
+            fhand.seek(max(sample, size - sample))
+            digest.update(fhand.read(sample))
+
+    return digest.hexdigest()
+
+
+def load_checkpoint(engine: sqlalchemy.engine.Engine,
+                    fingerprint: str,
+                    season: str) -> int | None:
+    """Returns the byte offset of the last committed line of a file and season, or None if there is no checkpoint."""
+
+    with engine.connect() as connection:
+        return connection.execute(select(Checkpoint.offset)
+                                  .where(Checkpoint.fingerprint == fingerprint,
+                                         Checkpoint.season == season)).scalar()
+
+
+def checkpoint_statement(fingerprint: str,
+                         season: str,
+                         offset: int) -> sqlalchemy.Insert:
+    """
+    Returns the statement that saves a checkpoint.
+
+    The statement should be executed in the same transaction as the commit of the
+    rows up to the offset, so that the checkpoint never gets ahead of the data.
+    """
+
+    stmt = insert(Checkpoint).values(fingerprint=fingerprint, season=season, offset=offset)
+
+    return stmt.on_conflict_do_update(index_elements=[Checkpoint.fingerprint, Checkpoint.season],
+                                      set_={'offset': stmt.excluded.offset})
+
+
+def clear_checkpoint_statement(fingerprint: str,
+                               season: str) -> sqlalchemy.Delete:
+    """
+    Returns the statement that deletes the checkpoint of a file and season.
+
+    The statement should be executed in the same transaction as the commit of the
+    last rows of the file, so that a finished ingest leaves no checkpoint for a later
+    ingest of the same file to resume from.
+    """
+
+    return delete(Checkpoint).where(Checkpoint.fingerprint == fingerprint,
+                                    Checkpoint.season == season)
@@ -13,6 +13,9 @@ class UnexpecteTableNameError(Exception):
 class UnexpectedColumnNameError(Exception):
     pass
 
+class OutdatedSchemaError(Exception):
+    pass
+
 
 
 
@@ -0,0 +1,264 @@
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+from football_manager_scouting.backend.player import Players, format_range
+import numpy as np
+
+
+class Categorical:
+    """
+    A dictionary-encoded column: each distinct value is stored once, in `categories`, and the
+    value of each player is the index of its category, in `codes`.
+
+    Used for the columns of names, like the clubs, which repeat across many players.
+
+    Attributes:
+    ----------
+    codes : np.ndarray
+        The index in `categories` of the value of each player.
+    categories : list
+        The distinct values, in the order they were first seen.
+    """
+
+    __slots__ = ('codes', 'categories')
+
+    def __init__(self,
+                 codes: np.ndarray,
+                 categories: List[Any]) -> None:
+        self.codes = codes
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, i: int) -> Any:
+        return self.categories[self.codes[i]]
+
+    def tolist(self) -> List[Any]:
+        """Returns the value of each player."""
+
+        categories = self.categories
+        return [categories[code] for code in self.codes.tolist()]
+
+    def take(self, indices: np.ndarray) -> 'Categorical':
+        """Returns the column of the players at the indices."""
+
+        return Categorical(self.codes[indices], self.categories)
+
+    def copy(self) -> 'Categorical':
+        return Categorical(self.codes.copy(), list(self.categories))
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the codes. The categories are few and left out."""
+
+        return self.codes.nbytes
+
+
+class _Encoder:
+    """Encodes the values of a column batch by batch, with the same categories for all batches."""
+
+    __slots__ = ('index', 'categories')
+
+    def __init__(self) -> None:
+        self.index: Dict[Any, int] = {}
+        self.categories: List[Any] = []
+
+    def __call__(self, values: Sequence[Any]) -> np.ndarray:
+        index, categories = self.index, self.categories
+        codes = []
+
+        for value in values:
+            # Arrays, like the positions, are read as lists, which cannot be keys.
+            key = tuple(value) if isinstance(value, list) else value
+            code = index.get(key)
+
+            if code is None:
+                code = index[key] = len(categories)
+                categories.append(value)
+
+            codes.append(code)
+
+        return np.array(codes, dtype=np.int32)
+
+
+class PlayerFrame:
+    """
+    Players as a struct of arrays: one array per column of each table, with the values of a player at
+    the same index in every array.
+
+    Numeric columns are NumPy arrays, e.g. float32 for the stats and integers for the minutes and
+    the current ability. All other columns, like names, lookup names, positions and attributes, are
+    `Categorical`. Compared to `Players` there are no dictionaries per player, which takes several
+    times less memory for large cohorts and lets scores and ranges be computed on whole columns.
+
+    Like `Players`, a frame has one entry per uid.
+
+    Attributes:
+    ----------
+    uids : Categorical
+        The uid of each player.
+    tables : dict
+        The columns of each table, by table name and column name, in the order of `Players`.
+    """
+
+    __slots__ = ('uids', 'tables')
+
+    def __init__(self,
+                 uids: Categorical,
+                 tables: Dict[str, Dict[str, np.ndarray | Categorical]]) -> None:
+        self.uids = uids
+        self.tables = tables
+
+    def __len__(self) -> int:
+        return len(self.uids)
+
+    def __getitem__(self, table_name: str) -> Dict[str, np.ndarray | Categorical]:
+        """Returns the columns of a table by column name."""
+
+        return self.tables[table_name]
+
+    @property
+    def nbytes(self) -> int:
+        """The size of the columns."""
+
+        return self.uids.nbytes + sum(column.nbytes for columns in self.tables.values()
+                                      for column in columns.values())
+
+    @staticmethod
+    def _exact(column: np.ndarray | Categorical) -> np.ndarray | Categorical:
+        """
+        Returns float32 columns as float64 with the shortest decimals of each value, e.g. 12.55
+        rather than 12.550000190734863, which are the values `Players` gets from the database.
+        """
+
+        if isinstance(column, np.ndarray) and column.dtype == np.float32:
+            return column.astype(str).astype(np.float64)
+
+        return column
+
+    def values(self,
+               table_name: str,
+               col_names: Iterable[str] = None) -> np.ndarray:
+        """
+        Returns the values of numeric columns of a table as a 2-D float64 array, one row per player.
+
+        Parameters:
+        ----------
+        table_name : str
+            The name of the table, e.g. 'Stats'.
+        col_names : iterable of str, optional
+            The columns, in the order of the array. Default is all columns of the table.
+
+        Returns:
+        -------
+        np.ndarray
+            The values, of shape (number of players, number of columns).
+        """
+
+        columns = self.tables[table_name]
+        col_names = list(columns) if col_names is None else list(col_names)
+
+        if not col_names:
+            return np.empty((len(self), 0))
+
+        return np.column_stack([self._exact(columns[col_name]) for col_name in col_names]).astype(np.float64)
+
+    def tolists(self, table_name: str) -> Dict[str, List[Any]]:
+        """Returns the columns of a table as lists of Python values, with the values `Players` would have."""
+
+        return {col_name: self._exact(column).tolist() for col_name, column in self.tables[table_name].items()}
+
+    def to_players(self) -> Players:
+        """Returns the players as `Players`, with the same tables and values as `Request.fetch_all` without a frame."""
+
+        players = Players()
+        columns = {table_name: self.tolists(table_name) for table_name in self.tables}
+
+        for i, uid in enumerate(self.uids.tolist()):
+            players.add(uid, {table_name: {col_name: values[i] for col_name, values in table.items()}
+                              for table_name, table in columns.items()})
+
+        return players
+
+    def take(self, indices: np.ndarray) -> 'PlayerFrame':
+        """Returns a frame of the players at the indices."""
+
+        return PlayerFrame(self.uids.take(indices),
+                           {table_name: {col_name: column[indices] if isinstance(column, np.ndarray)
+                                         else column.take(indices)
+                                         for col_name, column in columns.items()}
+                            for table_name, columns in self.tables.items()})
+
+    def copy(self) -> 'PlayerFrame':
+        return PlayerFrame(self.uids.copy(),
+                           {table_name: {col_name: column.copy() for col_name, column in columns.items()}
+                            for table_name, columns in self.tables.items()})
+
+    @classmethod
+    def from_batches(cls,
+                     batches: Iterable[Sequence[Sequence[Any]]],
+                     layout: Sequence[Tuple[str, str] | None],
+                     ranges: Dict[int, int],
+                     dtypes: Dict[Tuple[str, str], np.dtype]) -> 'PlayerFrame':
+        """
+        Builds a frame from batches of the plain tuples of a projection, see `Interact.project_frame`.
+
+        The rows are turned into columns one batch at a time, so no dictionaries are made per player.
+        If a uid has several rows, e.g. one per season, the frame has the last of them, at the
+        position of the first, as `Players` has.
+
+        Parameters:
+        ----------
+        batches : iterable of sequences of tuples
+            The rows, with the uid of the player first.
+        layout : sequence of tuple
+            The table name and the column name of each position of the rows, see `Unpacker`.
+        ranges : dict
+            The position of the high end of each attribute stored as a range, by the position of its low end.
+        dtypes : dict
+            The dtype of each numeric column by table name and column name. Other columns are `Categorical`.
+
+        Returns:
+        -------
+        PlayerFrame
+            The players of the rows.
+        """
+
+        outputs = [(i, entry) for i, entry in enumerate(layout) if entry is not None]
+        encoders = defaultdict(_Encoder)
+        chunks = defaultdict(list)
+
+        for batch in batches:
+            columns = list(zip(*batch))
+
+            chunks[0].append(encoders[0](columns[0]))
+
+            for i, entry in outputs:
+                values = columns[i]
+
+                if i in ranges:
+                    values = [format_range(low, high) for low, high in zip(values, columns[ranges[i]])]
+
+                dtype = dtypes.get(entry)
+                chunks[i].append(np.array(values, dtype=dtype) if dtype is not None else encoders[i](values))
+
+        def concatenate(i, dtype):
+            codes = np.concatenate(chunks[i]) if chunks[i] else np.empty(0, dtype=dtype or np.int32)
+            return codes if dtype is not None else Categorical(codes, encoders[i].categories)
+
+        tables = defaultdict(dict)
+        for i, (table_name, col_name) in outputs:
+            tables[table_name][col_name] = concatenate(i, dtypes.get((table_name, col_name)))
+
+        frame = cls(concatenate(0, None), dict(tables))
+
+        # One entry per uid: the last row of the uid at the position of its first row, as in a dict.
+        codes = frame.uids.codes
+        _, first = np.unique(codes, return_index=True)
+
+        if len(first) < len(codes):
+            _, last = np.unique(codes[::-1], return_index=True)
+            last = len(codes) - 1 - last
+            frame = frame.take(last[np.argsort(first)])
+
+        return frame
@@ -0,0 +1,284 @@
+from collections import defaultdict, OrderedDict
+from typing import Dict, Iterable, List, Tuple
+from football_manager_scouting.backend.tables import Position, Division, Foot, Nat, Club, Eligible
+from football_manager_scouting.backend.errors import UnexpecteTableNameError, UnexpectedColumnNameError
+from football_manager_scouting.backend.positions import split_positions
+from football_manager_scouting.backend.query_cache import QueryCache
+import sqlalchemy
+from sqlalchemy import select, insert
+
+
+class LookupCache:
+    """
+    In-memory cache of the lookup tables, mapping each name to its `id`.
+
+    Every division, club, nationality, foot, eligibility and position of every
+    player is encoded with the id of its row in the corresponding lookup table.
+    The cache is preloaded with the content of the lookup tables, so only names
+    never seen before reach the database. Misses are resolved in batches with
+    one SELECT and one INSERT per lookup table and one commit.
+
+    The position strings of FM, like 'D/WB/M (R)', are split and encoded once and kept
+    as tuples of `Position.id` in a bounded LRU cache, since an export only has a few
+    hundred distinct position strings.
+
+    There is one cache per database and process, retrieved with `LookupCache.get`. It is
+    shared by the ingest and the filters of `Interact.select`.
+
+    The ids are only kept while the seasons have the version stamps they had when the ids
+    were cached, see `validate`, since the lookup tables may have been emptied and loaded
+    again by another process meanwhile, giving the names other ids.
+
+    Attributes
+    ----------
+    hits : int
+        The number of lookups answered from the cache.
+    misses : int
+        The number of lookups that had to be resolved in the database.
+    """
+
+    TABLES = {'Position': Position, 'Division': Division, 'Foot': Foot,
+              'Nat': Nat, 'Club': Club, 'Eligible': Eligible}
+
+    _caches: Dict[str, 'LookupCache'] = {}
+
+    def __init__(self,
+                 engine: sqlalchemy.engine.Engine,
+                 maxsize: int = 4096) -> None:
+        self.engine = engine
+        self.maxsize = maxsize
+        self._ids: Dict[str, Dict[str, int]] = {table_name: {} for table_name in self.TABLES}
+        self._positions: OrderedDict[str, Tuple[int, ...]] = OrderedDict()
+        self._versions: tuple = None
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get(cls, engine: sqlalchemy.engine.Engine) -> 'LookupCache':
+        """Returns the cache of the database the engine is connected to, creating it if needed."""
+
+        key = engine.url.render_as_string(hide_password=False)
+
+        if key not in cls._caches:
+            cls._caches[key] = cls(engine)
+
+        return cls._caches[key]
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups answered from the cache."""
+
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self) -> None:
+        """Empties the cache, e.g. after the lookup tables have been dropped."""
+
+        self._ids = {table_name: {} for table_name in self.TABLES}
+        self._positions.clear()
+        self._versions = None
+
+    def validate(self, versions: tuple) -> None:
+        """
+        Empties the cache if the version stamps of the seasons have changed since the ids were cached.
+
+        Names are only added to the lookup tables together with players, whose commit gives their
+        seasons new stamps, see `QueryCache`. If the tables have been emptied, e.g. with TRUNCATE ...
+        RESTART IDENTITY, and loaded again, a cached name may since have another id, so the cache
+        is emptied and the names are looked up again.
+
+        Args:
+            versions (tuple): The current version stamps of all seasons, see `QueryCache.versions`.
+        """
+
+        if versions != self._versions:
+            self.clear()
+            self._versions = versions
+
+    def preload(self) -> None:
+        """Replaces the content of the cache with the content of the lookup tables and resets the counters."""
+
+        self.hits = 0
+        self.misses = 0
+        self._positions.clear()
+
+        with self.engine.connect() as connection:
+            self._versions = tuple(sorted(tuple(row) for row in connection.execute(QueryCache.versions_query())))
+
+            for table_name, table in self.TABLES.items():
+                column = getattr(table, table_name.lower())
+                self._ids[table_name] = {name: id for id, name in
+                                         connection.execute(select(table.id, column))}
+
+    def get_lookup_id(self,
+                      lookup_table_name: str,
+                      lookup: Tuple[str, str]) -> int:
+        """
+        Retrieves the `id` of a name in a lookup table, inserting the name if it does not exist.
+
+        Takes the same arguments as `Interact.get_lookup_id`.
+
+        Args:
+            lookup_table_name (str): The name of the lookup table, e.g. 'Division'.
+            lookup (Tuple[str, str]): A tuple of the name of the lookup column and the value to look up.
+
+        Returns:
+            int: The `id` of the row that matches the value.
+        """
+
+        return self.get_lookup_ids([(lookup_table_name, lookup)])[0]
+
+    def get_lookup_ids(self,
+                       lookups: Iterable[Tuple[str, Tuple[str, str]]]) -> List[int]:
+        """
+        Retrieves the `id` of several names at once, inserting the names that do not exist.
+
+        Args:
+            lookups (Iterable[Tuple[str, Tuple[str, str]]]): Pairs of lookup table names and
+                (column, value) tuples, e.g. [('Division', ('division', 'Bundesliga 2')), ...].
+
+        Returns:
+            List[int]: The ids of the values, in the same order as the lookups.
+
+        Raises:
+        ------
+        UnexpecteTableNameError
+            If given a table name not import from tables.py.
+        UnexpectedColumnNameError
+            If given a column name not present in the table mapping.
+        """
+
+        lookups = [self._check_lookup(lookup_table_name, lookup) for lookup_table_name, lookup in lookups]
+
+        missing = defaultdict(set)
+        for lookup_table_name, value in lookups:
+            if value in self._ids[lookup_table_name]:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing[lookup_table_name].add(value)
+
+        if missing:
+            self._resolve(missing)
+
+        return [self._ids[lookup_table_name][value] for lookup_table_name, value in lookups]
+
+    def find_lookup_ids(self,
+                        lookup_table_name: str,
+                        values: Iterable[str]) -> List[int]:
+        """
+        Retrieves the `id` of the names that exist in a lookup table, without inserting the others.
+
+        Used by the filters of queries, where a name that does not exist matches nothing.
+
+        Args:
+            lookup_table_name (str): The name of the lookup table, e.g. 'Position'.
+            values (Iterable[str]): The names to look up, e.g. ['DC', 'ML'].
+
+        Returns:
+            List[int]: The ids of the names that exist, in the same order as the names.
+
+        Raises:
+        ------
+        UnexpecteTableNameError
+            If given a table name not import from tables.py.
+        """
+
+        lookup_table_name, _ = self._check_lookup(lookup_table_name, (lookup_table_name.lower(), None))
+        ids = self._ids[lookup_table_name]
+
+        missing = set()
+        for value in values:
+            if value in ids:
+                self.hits += 1
+            else:
+                self.misses += 1
+                missing.add(value)
+
+        if missing:
+            table = self.TABLES[lookup_table_name]
+            column = getattr(table, lookup_table_name.lower())
+
+            with self.engine.connect() as connection:
+                for id, name in connection.execute(select(table.id, column).where(column.in_(missing))):
+                    ids.setdefault(name, id)
+
+        return [ids[value] for value in values if value in ids]
+
+    def cached(self,
+               lookup_table_name: str,
+               values: Iterable[str]) -> bool:
+        """Returns whether all names are in the cache, so that `find_lookup_ids` runs no query for them."""
+
+        ids = self._ids[lookup_table_name]
+
+        return all(value in ids for value in values)
+
+    def get_position_ids(self, position: str) -> Tuple[int, ...]:
+        """
+        Retrieves the `Position.id` of each position of an FM position string, inserting the positions that do not exist.
+
+        The string is split with `split_positions`, e.g. 'M/AM (LC)' to ML, MC, AML and AMC, and
+        the result is kept in an LRU cache of at most `maxsize` strings.
+
+        Args:
+            position (str): The position string of a player, e.g. 'D/WB/M (R)'.
+
+        Returns:
+            Tuple[int, ...]: The ids of the positions, in the order of `split_positions`.
+        """
+
+        try:
+            ids = self._positions[position]
+            self._positions.move_to_end(position)
+            return ids
+
+        except KeyError:
+            pass
+
+        ids = tuple(self.get_lookup_ids([('Position', ('position', pos))
+                                         for pos in split_positions(position)]))
+
+        self._positions[position] = ids
+        if len(self._positions) > self.maxsize:
+            self._positions.popitem(last=False)
+
+        return ids
+
+    def _check_lookup(self,
+                      lookup_table_name: str,
+                      lookup: Tuple[str, str]) -> Tuple[str, str]:
+
+        try:
+            table = self.TABLES[lookup_table_name]
+        except KeyError:
+            raise UnexpecteTableNameError(f"Cannot find ORM table mapping with the name `{lookup_table_name}`.")
+
+        if lookup[0] != lookup_table_name.lower():
+            expected_cols = ', '.join([column.name for column in table.__table__.columns if not column.name.startswith('_') and not column.name == 'id'])
+            raise UnexpectedColumnNameError(f'Unexpected mapped column!\nExpected columns: {expected_cols},\nbut found column: {lookup[0]}')
+
+        return lookup_table_name, lookup[1]
+
+    def _resolve(self, missing: Dict[str, set]) -> None:
+        """
+        Retrieves the ids of the missing values from the database in one transaction.
+
+        Values that have been added by another process since the cache was loaded are
+        selected, the rest are inserted.
+        """
+
+        with self.engine.begin() as connection:
+            for lookup_table_name, values in missing.items():
+                table = self.TABLES[lookup_table_name]
+                column = getattr(table, lookup_table_name.lower())
+                ids = self._ids[lookup_table_name]
+
+                for id, name in connection.execute(select(table.id, column).where(column.in_(values))):
+                    ids.setdefault(name, id)
+
+                new = [{column.key: value} for value in values if value not in ids]
+
+                if new:
+                    for id, name in connection.execute(insert(table).returning(table.id, column), new):
+                        ids[name] = id
@@ -0,0 +1,58 @@
+import base64
+import binascii
+from typing import Iterator, List, Tuple
+
+
+def encode_cursor(id: int) -> str:
+    """Returns the opaque cursor of the page that follows the player with the given id."""
+
+    return base64.urlsafe_b64encode(str(id).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Returns the id of the last player of a page from the cursor of the page that follows it.
+
+    Raises:
+    ------
+    ValueError
+        If the cursor was not given by `encode_cursor`.
+    """
+
+    try:
+        id = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+
+    except (binascii.Error, UnicodeDecodeError, TypeError):
+        raise ValueError(f'Invalid cursor: {cursor!r}')
+
+    if not id.isdigit():
+        raise ValueError(f'Invalid cursor: {cursor!r}')
+
+    return int(id)
+
+
+class Page:
+    """
+    One page of the players of `Interact.page`.
+
+    Attributes:
+    ----------
+    players : list of tuple
+        The unique ID and the tables of each player of the page, as given by `Interact.project`.
+    after : str or None
+        The cursor of the next page, to be given as `after`, or None if this is the last page.
+    """
+
+    __slots__ = ('players', 'after')
+
+    def __init__(self,
+                 players: List[Tuple[str, dict]],
+                 after: str | None) -> None:
+        self.players = players
+        self.after = after
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def __iter__(self) -> Iterator[Tuple[str, dict]]:
+        return iter(self.players)
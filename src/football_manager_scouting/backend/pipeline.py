@@ -0,0 +1,176 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, TypeVar
+
+
+T = TypeVar('T')
+
+
+class StageStats:
+    """
+    Time spent by one stage of a `Pipeline`.
+
+    Attributes
+    ----------
+    items : int
+        The number of items handled by the stage.
+    busy : float
+        Seconds spent doing work, i.e. producing or consuming items.
+    waiting : float
+        Seconds spent blocked on the queue, waiting for the other stage.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """The number of items per second of work of the stage."""
+
+        return self.items / self.busy if self.busy else 0.0
+
+    def __str__(self) -> str:
+        return (f'{self.name}: {self.items} entries, {self.throughput:.0f} entries/s, '
+                f'busy {self.busy:.2f}s, waiting {self.waiting:.2f}s')
+
+
+class Pipeline:
+    """
+    Runs a producer and a consumer stage at the same time, joined by a bounded queue.
+
+    The producer is iterated in a background thread and its items are put on the
+    queue in batches. The consumer is called with each batch in the calling thread,
+    in the same order as produced. When the queue is full the producer blocks until
+    the consumer has caught up, so no more than `maxsize` batches are ever waiting.
+
+    Used to parse the file in one thread while the database writes happen in another,
+    since the database driver releases the GIL while waiting for the database.
+
+    Attributes
+    ----------
+    stats : dict
+        The `StageStats` of the 'Parser' and the 'Writer' stage, filled in by `run`.
+    """
+
+    # Put on the queue when the producer is exhausted.
+    _DONE = object()
+
+    def __init__(self,
+                 batch_size: int = 1000,
+                 maxsize: int = 8) -> None:
+        """
+        Initializes the pipeline.
+
+        Parameters:
+        ----------
+        batch_size : int, optional
+            The number of items in each batch passed between the stages. Default is 1000.
+        maxsize : int, optional
+            The maximum number of batches waiting in the queue. Default is 8.
+        """
+
+        if batch_size < 1 or maxsize < 1:
+            raise ValueError(f'Expected a positive batch_size and maxsize but got {batch_size} and {maxsize}.')
+
+        self.batch_size = batch_size
+        self.maxsize = maxsize
+        self.stats: Dict[str, StageStats] = {}
+
+    def run(self,
+            producer: Iterable[T],
+            consumer: Callable[[List[T]], None]) -> None:
+        """
+        Passes all items of the producer to the consumer in batches.
+
+        An exception raised by either stage stops both stages and is raised again here.
+
+        Parameters:
+        ----------
+        producer : iterable
+            The items, e.g. the parsed entries of a file. Iterated in a background thread.
+        consumer : callable
+            Called with each batch of items, e.g. to write them to the database.
+        """
+
+        parser, writer = StageStats('Parser'), StageStats('Writer')
+        self.stats = {'Parser': parser, 'Writer': writer}
+
+        batches = queue.Queue(maxsize=self.maxsize)
+        stop = threading.Event()
+        errors = []
+
+        def put(item) -> bool:
+            """Puts an item on the queue, giving up if the consumer has stopped."""
+
+            start = time.perf_counter()
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    parser.waiting += time.perf_counter() - start
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def produce() -> None:
+            try:
+                batch = []
+                start = time.perf_counter()
+
+                for item in producer:
+                    batch.append(item)
+
+                    if len(batch) == self.batch_size:
+                        parser.busy += time.perf_counter() - start
+                        parser.items += len(batch)
+
+                        if not put(batch):
+                            return
+
+                        batch = []
+                        start = time.perf_counter()
+
+                parser.busy += time.perf_counter() - start
+                parser.items += len(batch)
+
+                if batch and not put(batch):
+                    return
+
+            except BaseException as e:
+                errors.append(e)
+
+            finally:
+                put(self._DONE)
+
+        thread = threading.Thread(target=produce, name='pipeline-parser', daemon=True)
+        thread.start()
+
+        try:
+            while True:
+                start = time.perf_counter()
+                batch = batches.get()
+                writer.waiting += time.perf_counter() - start
+
+                if batch is self._DONE:
+                    break
+
+                start = time.perf_counter()
+                consumer(batch)
+                writer.busy += time.perf_counter() - start
+                writer.items += len(batch)
+
+        finally:
+            stop.set()
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+    def report(self) -> str:
+        """Returns the throughput of each stage of the last run, one stage per line."""
+
+        return '\n'.join(str(stats) for stats in self.stats.values())
@@ -1,5 +1,15 @@
-from typing import Any
+from typing import Any, Dict, Sequence, Tuple
 from collections import defaultdict
+from operator import itemgetter
+
+
+def format_range(low, high):
+    """Formats an attribute stored as a low and a high end the way FM shows it, e.g. 12-15, 12 or -."""
+
+    if low is None:
+        return '-'
+
+    return low if low == high or high is None else f'{low}-{high}'
 
 
 class Players(dict):
@@ -62,6 +72,24 @@ class Players(dict):
                 
         return super().__setitem__(key, value)
     
+    def add(self, key: Any, tables: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Stores the tables of a player that are already unpacked, e.g. by an `Unpacker`.
+
+        Parameters:
+        ----------
+        key : Any
+            The key under which the tables are stored.
+        tables : dict
+            The columns and values of each table of the player, by table name.
+
+        Returns:
+        -------
+        None
+        """
+
+        return super().__setitem__(key, tables)
+
     def __getitem__(self, key: Any) -> Any:
         """
         Retrieves the value for a specified key from the dictionary.
@@ -129,9 +157,16 @@ class Players(dict):
             col_names = [col_name for col_name in table.__table__.columns.keys()
                             if not col_name.startswith('_')]
             
+            range_columns = set([col_name for col_name in table.__table__.columns.keys()
+                                 if col_name.startswith('_') and col_name.endswith('High')])
+            
             for col_name in col_names:
                 
-                if col_name in lookup_tables:
+                if col_name in lookup_tables and isinstance(getattr(table, col_name.capitalize()), list):
+                    # Array columns, like the positions, are loaded with the names of all their ids.
+                    val = getattr(table, col_name.capitalize())
+
+                elif col_name in lookup_tables:
                     
                     try:
                         val = get_lookup_column_value(table, col_name)
@@ -139,12 +174,16 @@ class Players(dict):
                     except AttributeError:
                         val = get_lookup_column_value_with_annoying_name(table, col_name)
                 
+                elif f'_{col_name}High' in range_columns:
+                    val = format_range(get_column_value(table, col_name),
+                                       get_column_value(table, f'_{col_name}High'))
+
                 else:
                     val = get_column_value(table, col_name)
                 
                 if col_name in self._iterable:
                     iterable_value = tables[table_name].get(col_name, [])
-                    val = iterable_value + [val]
+                    val = iterable_value + (val if isinstance(val, list) else [val])
                 
                 tables[table_name][col_name] = val
         
@@ -155,4 +194,99 @@ class Players(dict):
                 
         return dict(tables)
     
-    
\ No newline at end of file
+    
+
+
+class Unpacker:
+    """
+    Unpacks the plain tuples of a projection into the tables of a player, as `Players.unpack_tables`
+    does for rows of ORM objects.
+
+    Built once per column set: the position of every value in the tuple is known beforehand, so
+    unpacking a row only picks the values of each table by position, with no lookups of attributes.
+
+    Attributes:
+    ----------
+    layout : tuple
+        The table name and the column name of each position of the rows, as given.
+    ranges : dict
+        The position of the high end of each range by the position of its low end, as given.
+    _tables : tuple
+        The name, the column names and the getter of the values of each table, in output order.
+    _ranges : tuple
+        The table name, the column name and the positions of the low and the high end of each
+        attribute stored as a range.
+
+    Methods:
+    -------
+    __call__(row: Sequence) -> Dict[str, Dict[str, Any]]
+        Unpacks one row.
+    """
+
+    __slots__ = ('layout', 'ranges', '_tables', '_ranges')
+
+    def __init__(self,
+                 layout: Sequence[Tuple[str, str] | None],
+                 ranges: Dict[int, int] = None) -> None:
+        """
+        Initializes an Unpacker instance.
+
+        Parameters:
+        ----------
+        layout : sequence of tuple
+            The table name and the column name of each position of the rows, or None for
+            positions that are not part of the output, e.g. the high ends of ranges.
+        ranges : dict, optional
+            The position of the high end of each attribute stored as a range, by the position
+            of its low end. Formatted like FM shows it, see `format_range`.
+        """
+
+        ranges = ranges or {}
+        positions = defaultdict(list)
+
+        self.layout = tuple(layout)
+        self.ranges = dict(ranges)
+
+        for i, entry in enumerate(layout):
+            if entry is not None:
+                positions[entry[0]].append((entry[1], i))
+
+        self._tables = tuple((table_name, tuple(col_name for col_name, _ in columns),
+                              self._getter([i for _, i in columns]))
+                             for table_name, columns in positions.items())
+
+        self._ranges = tuple((layout[low][0], layout[low][1], low, high) for low, high in ranges.items())
+
+    @staticmethod
+    def _getter(positions):
+        """Returns a function returning the values at the positions of a row, always as a tuple."""
+
+        if len(positions) == 1:
+            i = positions[0]
+            return lambda row: (row[i],)
+
+        return itemgetter(*positions)
+
+    def __call__(self, row: Sequence) -> Dict[str, Dict[str, Any]]:
+        """
+        Unpacks one row of the projection.
+
+        Parameters:
+        ----------
+        row : sequence
+            The values of one row, in the order of the layout.
+
+        Returns:
+        -------
+        dict
+            A dictionary where each key is a table name and each value is another
+            dictionary containing column names and their corresponding values.
+        """
+
+        tables = {table_name: dict(zip(col_names, getter(row)))
+                  for table_name, col_names, getter in self._tables}
+
+        for table_name, col_name, low, high in self._ranges:
+            tables[table_name][col_name] = format_range(row[low], row[high])
+
+        return tables
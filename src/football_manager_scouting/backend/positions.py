@@ -0,0 +1,37 @@
+import re
+from typing import List
+
+
+def split_positions(pos_string: str) -> List[str]:
+    """
+    Helper function for splitting Football Manager's position strings
+    to something more managable.
+
+    For example a position string like: 'M/AM (LC) would be split to the list: ['ML', 'MC', 'AML', 'AMC']
+    """
+
+    raw_positions = pos_string.split(', ')
+
+    processed_positions = []
+    for raw_pos in raw_positions:
+
+        # Finds the lateral marker, e.g. R, C or L (right, center, left).
+        lateral_markers = list(''.join(re.findall(r'\((.*?)\)', raw_pos)))
+
+        # Finds the position without the lateral marker, e.g. GK, D, WB, DM, M, AM, ST
+        # (Goalkeeper, Defender, Wing back, Midfielder, Attacking midfielder, Striker)
+        positions = re.search(r'[A-Z]{1,2}(/([A-Z]){1,2})*', raw_pos).group(0).split('/')
+
+        # Combines the position with the lateral marker to form positions like:
+        # AM (LC) -> AML, AMC; D/M (LC) -> DL, DC, ML, MC.
+        combined = []
+        for pos in positions:
+            if lateral_markers:
+                for lateral_marker in lateral_markers:
+                    combined.append(pos+lateral_marker)
+            else:
+                combined.append(pos)
+
+        processed_positions.extend(combined)
+
+    return processed_positions
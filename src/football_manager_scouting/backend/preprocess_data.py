@@ -1,7 +1,15 @@
-import re, random
-from typing import Iterable, Dict, List, Tuple
+import hashlib, io, os, re, random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, Dict, List, Tuple
 from football_manager_scouting.backend.server import Setup, Interact
+from football_manager_scouting.backend.lookup_cache import LookupCache
 from football_manager_scouting.category_mappings.category_map import CATEGORY_MAP
+import sqlalchemy
+
+
+# The tables a line of the file is parsed into.
+CATEGORIES = tuple(sorted(set(CATEGORY_MAP.values()) - {'Unused'}))
 
 
 class Preprocess:
@@ -41,20 +49,32 @@ class Preprocess:
             'expires': 'expiryDate',
             'opt ext by club': 'extension',
             'min fee rls': 'releaseClauseFee',
+            'ap': 'value',
             'str': 'strength'
             }
     
     def __init__(self,
                  season: str,
-                 user: str,
-                 password: str,
-                 host: str,
-                 database: str
+                 user: str = None,
+                 password: str = None,
+                 host: str = None,
+                 database: str = None,
+                 engine: sqlalchemy.engine.Engine = None
                  ) -> None:
-        """Class for preprocessing data from Football Manager."""
+        """
+        Class for preprocessing data from Football Manager.
+        
+        The lookup ids are retrieved from the database of the login, or of `engine` if given.
+        If neither is given, the instance can only parse lines and not encode the
+        string names with lookup ids. This is used by the worker processes of
+        `read_rtf_file_parallel`.
+        """
 
         self._season = season
 
+        # The byte offset of the end of the last line read by `read_rtf_file`.
+        self.offset = 0
+
         self.lookup_tables = {
             'division': 'division',
             'club': 'club',
@@ -64,12 +84,20 @@ class Preprocess:
             'eligible': 'eligible'
         }
 
-        engine = Setup.create_engine(user, password, host, database)
+        if engine is None:
+            if database is None:
+                return
+
+            engine = Setup.create_engine(user, password, host, database)
 
-        interact = Interact(engine)
-        self.get_lookup_id = interact.get_lookup_id
+        # Makes sure that the tables exist before the lookup tables are loaded.
+        Interact(engine)
 
-    def read_rtf_file(self, path: str):
+        self.lookup_cache = LookupCache.get(engine)
+        self.lookup_cache.preload()
+        self.get_lookup_id = self.lookup_cache.get_lookup_id
+
+    def read_rtf_file(self, path: str, offset: int = 0):
         """
         Preprocesses the data of an RTF file generated from Football Manager.
         
@@ -84,10 +112,16 @@ class Preprocess:
         Processes the RTF file, categorizes data based on the given JSON mapping,
         and yields the structured tables for one row, corresponding to the information of one player.
 
+        When a row is yielded, `offset` holds the byte offset of the end of its line,
+        so that an interrupted ingest can be resumed from the last committed row.
+
         Parameters:
         ----------
         path : str
             The file path to the RTF file containing the FM data.
+        offset : int, optional
+            The byte offset to start reading from, e.g. the offset of a checkpoint.
+            The header line is always read. Default is 0, i.e. the whole file.
 
         Yields:
         -------
@@ -97,246 +131,285 @@ class Preprocess:
             Each dictionary corresponds to one single player.
         """
 
-        tables: Dict[str, Dict[str, int | float | str]] = \
-            {category: {} for category in set(CATEGORY_MAP.values())
-             if category != "Unused"}
+        with open(path, 'rb') as fhand:
 
-        with open(path, 'r', encoding='utf-8') as fhand:
+            plan = self._compile_plan(self._get_column_headers(self._decode(fhand.readline())))
 
-            column_headers = self._get_column_headers(fhand.readline())
+            if offset > fhand.tell():
+                fhand.seek(offset)
 
-            for line in fhand:
+            self.offset = fhand.tell()
+
+            for raw_line in fhand:
+
+                self.offset += len(raw_line)
+
+                line = self._decode(raw_line)
 
                 if self._is_content(line):
 
-                    line = self._format_line(line, column_headers)
-
-                    for column_header, value in line.items():
-
-                        category = CATEGORY_MAP[column_header]
-
-                        if category != 'Unused':
-                            column_header = self._format_header(column_header)
-
-                            try:
-                                tables[category][column_header] = value
-
-                            # Avoid the broken out PlayerInfo that is tuple.
-                            except TypeError:
-
-                                if isinstance(tables[category], Iterable):
-                                    tables[category] = {}
-                                    tables[category][column_header] = value
-                                else:
-                                    raise TypeError
-                                
-                            except KeyError:
-                                tables[category].setdefault(column_header, value)
-        
-                    self._clean(**tables)
-                    
-                    try:
-                        
-                        tables['PlayerInfo'] = self._encode_string_names(tables['PlayerInfo'])
-                        
-                        tables['PlayerInfo'] = self._breakout_positions(tables['PlayerInfo'])
-                        
-                    except KeyError:
-                        pass
-                    
-                    yield tables
-
-    def _clean(self,
-               Player: Dict[str, str] = None,
-               PlayerInfo: Dict[str, str] = None,
-               Stats: Dict[str, str] = None,
-               Attributes: Dict[str, str] = None,
-               Contract: Dict[str, str] = None,
-               Ca: Dict[str, str] = None) -> None:
+                    yield self._encode(self._parse_line(line, plan))
+
+    def read_rtf_file_parallel(self,
+                               path: str,
+                               offset: int = 0,
+                               workers: int = None,
+                               chunk_size: int = 4 * 1024 * 1024) -> Iterator[Dict[str, Dict[str, int | float | str]]]:
         """
-        Cleans and formats data within specified tables (dictionaries) to ensure consistent data types
-        and structures for further processing.
+        Preprocesses the data of an RTF file generated from Football Manager using several processes.
+        
+        Works like `read_rtf_file`, but the file is split into chunks of roughly `chunk_size` bytes,
+        cut at line boundaries, that are parsed in parallel by a pool of worker processes.
+        The workers send back their parsed rows in compact batches and the string names are
+        encoded in this process, so that only one process talks to the database.
+        
+        The rows are yielded in the same order as in the file. Only the last row of a chunk
+        moves `offset` to the end of the chunk, the other rows leave it at the start of their chunk.
 
         Parameters:
         ----------
-        Player : dict, optional
-            Dictionary containing player-specific data.
-        PlayerInfo : dict, optional
-            Dictionary with player information, including age, position, and minutes played.
-        Stats : dict, optional
-            Dictionary of player statistics, where keys are stat names and values are numbers.
-        Attributes : dict, optional
-            Dictionary for general attributes related to the player.
-        Contract : dict, optional
-            Dictionary containing player contract details, such as wage, value, and contract dates.
-        Ca : dict, optional
-            Dictionary containing player "ca" (current ability) details.
+        path : str
+            The file path to the RTF file containing the FM data.
+        offset : int, optional
+            The byte offset to start reading from, see `read_rtf_file`.
+        workers : int, optional
+            The number of worker processes. Default (None) is the number of CPUs.
+        chunk_size : int, optional
+            The approximate size in bytes of the chunk parsed by a worker at a time.
 
-        Returns:
+        Yields:
         -------
-        dict
-            The cleaned dictionaries with updated data values as per specified formatting rules.
+        tables : dict
+            A dictionary of categorized tables for one player, see `read_rtf_file`.
         """
+
+        workers = workers if workers is not None else os.cpu_count()
+
+        with open(path, 'rb') as fhand:
+            column_headers = self._get_column_headers(self._decode(fhand.readline()))
+
+            if offset > fhand.tell():
+                fhand.seek(offset)
+
+            chunks = self._split_file(fhand, chunk_size)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+
+            # Only keep a few batches in flight so that memory stays bounded
+            # if the database is slower than the parsing.
+            pending = deque()
+
+            for start, end in chunks:
+                pending.append((start, end, executor.submit(_parse_chunk, path, start, end,
+                                                            self._season, column_headers)))
+
+                if len(pending) > 2 * workers:
+                    yield from self._encode_chunk(*pending.popleft())
+
+            while pending:
+                yield from self._encode_chunk(*pending.popleft())
+
+    def _encode_chunk(self,
+                      start: int,
+                      end: int,
+                      future) -> Iterator[Dict[str, Dict[str, int | float | str]]]:
+        """Yields the encoded rows of a chunk parsed by a worker process, keeping `offset` at a line boundary."""
+
+        rows = list(_expand(future.result()))
+
+        self.offset = start
+
+        for tables in rows[:-1]:
+            yield self._encode(tables)
+
+        self.offset = end
+
+        for tables in rows[-1:]:
+            yield self._encode(tables)
+
+    @staticmethod
+    def _split_file(fhand, chunk_size: int) -> List[Tuple[int, int]]:
+        """Returns the (start, end) byte offsets of chunks of the file that begin and end at line boundaries."""
         
-        def clean_player_table():
-            try:
-                Player['season'] = self._season
-            except KeyError:
-                pass
-            
-        def clean_playerInfo_table():
-            try:
-                PlayerInfo['age']        = int(PlayerInfo['age'])
-            except KeyError:
-                pass
-            
-            try:
-                PlayerInfo['mins']       = self._make_int(PlayerInfo['mins']) \
-                                           if PlayerInfo['mins'] != '-' else 0
-            except KeyError:
-                pass
-
-        def clean_stats_table():
-            for key, val in Stats.items():
-                Stats[key] = float(val) if val != '-' else 0.0
-            
-        def clean_contract_table():
-            try:
-                Contract['beginDate']        = int(Contract['beginDate'][-4:]) \
-                                               if Contract['beginDate'] != '-' else 0
-            except KeyError:
-                pass
-            
-            try:
-                Contract['expiryDate']       = int(Contract['expiryDate'][-4:]) \
-                                               if Contract['expiryDate'] != '-' else 0
-            except KeyError:
-                pass
-            
-            try:
-                Contract['extension']        = int(Contract['extension']) \
-                                               if Contract['extension'] != '' else 0
-            except KeyError:
-                pass
-            
-            try:
-                Contract['wage']             = self._make_int(Contract['wage']) \
-                                               if Contract['wage'] != '-' and Contract['wage'] != 'N/A' else 0
-            except KeyError:
-                pass
-            
-            try:
-                Contract['value']            = self._obfuscate_asking_price(
-                                               self._format_high_values(Contract['ap']))
-            except KeyError:
-                pass
-            
-            try:
-                Contract['releaseClauseFee'] = self._format_high_values(Contract['releaseClauseFee']) \
-                                               if Contract['releaseClauseFee'] != '-' else 0
-            except KeyError:
-                pass
-            
-            try:
-                del Contract['ap']
-            except KeyError:
-                pass
-            
-        def clean_ca_table():
-            try:
-                Ca['ca'] = int(Ca['ca'])
-            except KeyError:
-                pass
-
-        if Player:
-            clean_player_table()
-        if PlayerInfo:
-            clean_playerInfo_table()
-        if Stats:
-            clean_stats_table()
-        if Contract:
-            clean_contract_table()
-        if Ca:
-            clean_ca_table()
-    
-    def _encode_positions(self, positions: list[str]) -> list[int]:
-        """
-        Encodes a list of string positions to unique int ids.
-        """
+        size = os.fstat(fhand.fileno()).st_size
         
-        position_ids = []
-        for pos in positions:
-            id = self.get_lookup_id('Position', ('position', pos))
-            position_ids.append(id)
+        chunks = []
+        start = fhand.tell()
+        while start < size:
+            fhand.seek(start + chunk_size)
+            fhand.readline()
+            end = min(fhand.tell(), size)
+            chunks.append((start, end))
+            start = end
         
-        return position_ids
-    
-    def _breakout_positions(
-                            self,
-                            playerInfo: Dict[str, str | int]
-                            ) -> Tuple[Dict[str, str | int]]:
+        return chunks
+
+    def _compile_plan(self,
+                      column_headers: List[str]) -> List[Tuple[int, str, str, Callable[[str], int | float | str]]]:
         """
-        Breaks out the position a player can play at from a string
-        with multimple positions to atomic strings with one position per string.
-        
-        Returns a tuple containing the playerInfo dict, but with one position per dict in the tuple.
+        Compiles the column headers of a file into a plan for parsing its lines.
         
+        The plan has one entry for each used column of the file, holding the index of the
+        cell in the line, the table the column belongs to, the formatted column name
+        and the function that converts the raw cell to its value in the database.
+        Attributes have a second entry for the high end of their range.
+        Unused columns are left out of the plan.
+
         Parameters:
         ----------
-        playerInfo
-            The playerinfo table.
+        column_headers : list of str
+            The column headers of the file, as returned by `_get_column_headers`.
 
         Returns:
         -------
-        tables
-            A tuple of dicts containing one position per dict with the other values copied.
+        plan : list of tuple
+            A list of (index, table, column, converter) tuples.
         """
-        
-        positions = self._split_positions(playerInfo.pop('position'))
-        
-        positions = self._encode_positions(positions)
-        
-        tables = []
-        for i in range(len(positions)):
-            tables.append(playerInfo.copy())
-            tables[i]['position'] = positions[i]
 
-        return tuple(tables)
+        plan = []
+        for i, column_header in enumerate(column_headers):
+
+            table = CATEGORY_MAP[column_header]
+
+            if table != 'Unused':
+                column = self._format_header(column_header)
+                plan.append((i, table, column, self._get_converter(table, column)))
+
+                if table == 'Attributes':
+                    # The same cell also gives the high end of the range of the attribute.
+                    plan.append((i, table, f'_{column}High', self._parse_attribute_high))
+
+        return plan
+
+    def _get_converter(self, table: str, column: str) -> Callable[[str], int | float | str]:
+        """Returns the function that converts a raw cell of a column to its value in the database."""
+
+        if table == 'Stats':
+            return lambda val: float(val) if val != '-' else 0.0
+
+        if table == 'Attributes':
+            return self._parse_attribute_low
+
+        converters = {
+            'PlayerInfo': {
+                'age': int,
+                'mins': lambda val: self._make_int(val) if val != '-' else 0
+            },
+            'Contract': {
+                'beginDate': lambda val: int(val[-4:]) if val != '-' else 0,
+                'expiryDate': lambda val: int(val[-4:]) if val != '-' else 0,
+                'extension': lambda val: int(val) if val != '' else 0,
+                'wage': lambda val: self._make_int(val) if val != '-' and val != 'N/A' else 0,
+                'value': lambda val: self._obfuscate_asking_price(self._format_high_values(val)),
+                'releaseClauseFee': lambda val: self._format_high_values(val) if val != '-' else 0
+            },
+            'Ca': {
+                'ca': int
+            }
+        }
+
+        return converters.get(table, {}).get(column, str)
+
+    @staticmethod
+    def _parse_attribute_low(val: str) -> int | None:
+        """Returns the low end of an attribute, which FM shows as a range like 12-15 for players that are not fully scouted."""
+
+        return int(val.split('-', 1)[0]) if val != '-' else None
+
+    @staticmethod
+    def _parse_attribute_high(val: str) -> int | None:
+        """Returns the high end of an attribute, the same as the low end unless the attribute is a range."""
+
+        return int(val.rsplit('-', 1)[-1]) if val != '-' else None
+
+    def _parse_line(self,
+                    line: str,
+                    plan: List[Tuple[int, str, str, Callable[[str], int | float | str]]]
+                    ) -> Dict[str, Dict[str, int | float | str]]:
+        """Parses one line of the file into cleaned tables with a plan from `_compile_plan`, without encoding the string names."""
+
+        cells = self._clean_line(line)
+
+        if plan and plan[-1][0] >= len(cells):
+            # Short line, parse the cells it has.
+            plan = [step for step in plan if step[0] < len(cells)]
+
+        tables: Dict[str, Dict[str, int | float | str]] = {category: {} for category in CATEGORIES}
+
+        for i, table, column, convert in plan:
+            tables[table][column] = convert(cells[i].strip())
+
+        if tables['Player']:
+            tables['Player']['season'] = self._season
+
+        return tables
+
+    def _encode(self,
+                tables: Dict[str, Dict[str, int | float | str]]) -> Dict[str, Dict[str, int | float | str]]:
+        """Encodes the string names and the positions of the PlayerInfo table with lookup ids."""
+
+        try:
+            
+            tables['PlayerInfo'] = self._encode_string_names(tables['PlayerInfo'])
+            
+            tables['PlayerInfo'] = self._encode_positions(tables['PlayerInfo'])
+            
+        except KeyError:
+            pass
+
+        return tables
 
     @staticmethod
-    def _split_positions(pos_string: str) -> List[str]:
+    def checksum(tables: Dict[str, Dict[str, int | float | str] | List[Dict[str, int]]]) -> str:
         """
-        Helper function for splitting Football Manager's position strings
-        to something more managable.
+        Returns a checksum of the tables of one player, as yielded by `read_rtf_file`.
         
-        For example a position string like: 'M/AM (LC) would be split to the list: ['ML', 'MC', 'AML', 'AMC']
+        Used to tell which players have changed since the last import of a season.
+        The asking price is left out since it is obfuscated with a random number
+        every time the file is read, so a change of only the asking price is not detected.
+
+        Parameters:
+        ----------
+        tables : dict
+            A dictionary of categorized tables for one player.
+
+        Returns:
+        -------
+        str
+            The hexadecimal MD5 digest of the tables.
         """
         
-        raw_positions = pos_string.split(', ')
+        digest = hashlib.md5()
         
-        processed_positions = []
-        for raw_pos in raw_positions:
+        for table_name, table in tables.items():
             
-            # Finds the lateral marker, e.g. R, C or L (right, center, left).
-            lateral_markers = list(''.join(re.findall(r'\((.*?)\)', raw_pos)))
+            if table_name == 'Contract':
+                table = {column: val for column, val in table.items() if column != 'value'}
             
-            # Finds the position without the lateral marker, e.g. GK, D, WB, DM, M, AM, ST
-            # (Goalkeeper, Defender, Wing back, Midfielder, Attacking midfielder, Striker)
-            positions = re.search(r'[A-Z]{1,2}(/([A-Z]){1,2})*', raw_pos).group(0).split('/')
+            digest.update(repr((table_name, table)).encode('utf-8'))
+        
+        return digest.hexdigest()
 
-            # Combines the position with the lateral marker to form positions like:
-            # AM (LC) -> AML, AMC; D/M (LC) -> DL, DC, ML, MC.
-            combined = []
-            for pos in positions:
-                if lateral_markers:
-                    for lateral_marker in lateral_markers:
-                        combined.append(pos+lateral_marker)
-                else:
-                    combined.append(pos)
+    def _encode_positions(self, playerInfo: Dict[str, str | int]) -> Dict[str, str | int | List[int]]:
+        """
+        Encodes the position string of a player, e.g. 'D/WB (R), M (C)', with the ids of all its positions.
+        
+        The positions are stored as one array per player rather than one playerInfo row per position.
+        
+        Parameters:
+        ----------
+        playerInfo
+            The playerinfo table.
 
-            processed_positions.extend(combined)
+        Returns:
+        -------
+        playerInfo
+            The playerinfo table with the position replaced by a list of position ids.
+        """
+        
+        playerInfo['position'] = list(self.lookup_cache.get_position_ids(playerInfo['position']))
 
-        return processed_positions
+        return playerInfo
 
     def _encode_string_names(self, playerInfo: Dict[str, str | int]) -> Dict[str, str | int]:
         """Encodes loose string names with int IDs.
@@ -345,12 +418,13 @@ class Preprocess:
         Also updates the lookup table for new names.
         """
         
-        for column, val in playerInfo.items():
-            
-            if self.lookup_tables.get(column):
-                id = self.get_lookup_id(self.lookup_tables[column].capitalize(), 
-                                                 (self.lookup_tables[column], val))
-                playerInfo[column] = id
+        columns = [column for column in playerInfo if self.lookup_tables.get(column)]
+        
+        ids = self.lookup_cache.get_lookup_ids([(self.lookup_tables[column].capitalize(),
+                                                 (self.lookup_tables[column], playerInfo[column]))
+                                                for column in columns])
+        
+        playerInfo.update(zip(columns, ids))
         
         return playerInfo
 
@@ -395,6 +469,17 @@ class Preprocess:
         """Helper method for making ints of string values with unicode chars."""
         return int(''.join(re.findall(r'\d+', val)))
     
+    @staticmethod
+    def _decode(raw_line: bytes) -> str:
+        """Decodes a line read in binary mode like a file opened in text mode, i.e. with universal newlines."""
+        
+        line = raw_line.decode('utf-8')
+        
+        if line.endswith('\r\n'):
+            line = line[:-2] + '\n'
+        
+        return line
+
     @staticmethod
     def _clean_line(line: str) -> list[str]:
         """Returns a list with the elements in the line."""
@@ -407,14 +492,6 @@ class Preprocess:
         
         return line != '\n' and line[3] != '-'
     
-    def _format_line(self, line: str, column_headers: list[str]) -> dict[str, str]:
-        """Returns a dict with the column header as key and the cell content as value."""
-        
-        line = {column_header: elem.strip()
-                for column_header, elem in
-                zip(column_headers, self._clean_line(line))}
-        return line
-
     def _get_column_headers(self, header_line: str) -> list[str]:
         """Returns a list of all headers in file."""
         
@@ -424,3 +501,64 @@ class Preprocess:
         """Returns a formatted header that is valid for SQL"""
         
         return self.CORRECT_COLUMN_HEADERS.get(header.lower(), header.lower())
+
+
+def _parse_chunk(path: str,
+                 start: int,
+                 end: int,
+                 season: str,
+                 column_headers: List[str]) -> Tuple[list, list]:
+    """Parses the lines between two byte offsets of a file. Run by the worker processes of `read_rtf_file_parallel`."""
+
+    process = Preprocess(season)
+
+    with open(path, 'rb') as fhand:
+        fhand.seek(start)
+        content = fhand.read(end - start).decode('utf-8')
+
+    plan = process._compile_plan(column_headers)
+
+    # Read the content like a file opened in text mode, i.e. with universal newlines.
+    rows = [process._parse_line(line, plan)
+            for line in io.StringIO(content, newline=None)
+            if process._is_content(line)]
+
+    return _compact(rows)
+
+
+def _compact(rows: List[Dict[str, Dict[str, int | float | str]]]) -> Tuple[list, list]:
+    """
+    Packs parsed rows into a batch that is cheap to send between processes.
+    
+    The table and column names are stored once per batch as layouts, and
+    each row only as a flat tuple of values and the index of its layout.
+    """
+
+    layouts, layout_index, values = [], {}, []
+
+    for tables in rows:
+        layout = tuple((table_name, tuple(table)) for table_name, table in tables.items())
+
+        if layout not in layout_index:
+            layout_index[layout] = len(layouts)
+            layouts.append(layout)
+
+        values.append((layout_index[layout],
+                       tuple(value for table in tables.values() for value in table.values())))
+
+    return layouts, values
+
+
+def _expand(batch: Tuple[list, list]) -> Iterator[Dict[str, Dict[str, int | float | str]]]:
+    """Unpacks a batch created by `_compact` back into parsed rows."""
+
+    layouts, values = batch
+
+    for i, row in values:
+        tables, n = {}, 0
+
+        for table_name, columns in layouts[i]:
+            tables[table_name] = dict(zip(columns, row[n:n+len(columns)]))
+            n += len(columns)
+
+        yield tables
@@ -0,0 +1,256 @@
+import hashlib
+import os
+import pickle
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Tuple
+from football_manager_scouting.backend.tables import SeasonVersion
+from football_manager_scouting.backend.frame import PlayerFrame
+import sqlalchemy
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+
+def bump_version_statement(season: str) -> sqlalchemy.Insert:
+    """
+    Returns the statement that gives a season a new version stamp, invalidating the cached
+    queries of its players.
+
+    The statement should be executed in the same transaction as the commit of the players.
+    """
+
+    stmt = insert(SeasonVersion).values(season=season, version=uuid.uuid4().hex)
+
+    return stmt.on_conflict_do_update(index_elements=[SeasonVersion.season],
+                                      set_={'version': stmt.excluded.version})
+
+
+class QueryCache:
+    """
+    Cache of the players fetched by `Request.fetch_all`, keyed by the filters and the columns
+    of the query.
+
+    Each cached query is stored with the version stamps of its seasons, see `SeasonVersion`,
+    and is only returned while the stamps in the database are the same. `insert_data_to_database`
+    gives a season a new stamp with each commit of its players, so checking the stamps takes one
+    small query in place of the query of the players. Writes in other ways should give the season
+    a new stamp with `Interact.bump_season_version`.
+
+    The most recently used queries are kept in memory, up to `maxsize`. If given a directory,
+    every query is also written to it, so that the cache outlives the process.
+
+    There is one cache per database and process, retrieved with `QueryCache.get`.
+
+    Attributes
+    ----------
+    hits : int
+        The number of queries answered from the cache.
+    misses : int
+        The number of queries that had to be run in the database.
+    """
+
+    _caches: Dict[str, 'QueryCache'] = {}
+
+    def __init__(self,
+                 engine: sqlalchemy.engine.Engine,
+                 maxsize: int = 32,
+                 directory: str = None) -> None:
+        self.engine = engine
+        self.maxsize = maxsize
+        self.directory = directory
+        self._players: OrderedDict[tuple, Tuple[tuple, Dict[Any, dict]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get(cls,
+            engine: sqlalchemy.engine.Engine,
+            maxsize: int = None,
+            directory: str = None) -> 'QueryCache':
+        """
+        Returns the cache of the database the engine is connected to, creating it if needed.
+
+        The size and the directory of the cache are changed to those given, if any.
+        """
+
+        key = engine.url.render_as_string(hide_password=False)
+
+        if key not in cls._caches:
+            cls._caches[key] = cls(engine)
+
+        cache = cls._caches[key]
+
+        if maxsize is not None:
+            cache.maxsize = maxsize
+            cache._evict()
+
+        if directory is not None:
+            cache.directory = directory
+
+        return cache
+
+    @staticmethod
+    def key(filter: Dict[str, Any]) -> tuple:
+        """
+        Returns the key of a query, the same for all filters that select the same players.
+
+        Filters that are None are left out, single values are the same as lists of one value, the
+        order of the values of a list does not matter and the columns are given by table name.
+        """
+
+        key = []
+
+        for name, value in sorted(filter.items()):
+
+            if value is None:
+                continue
+
+            if name == 'columns':
+                value = tuple(table.__tablename__ for table in value)
+
+            elif isinstance(value, dict):
+                # The values of e.g. the fields are lists of columns, in any order.
+                value = tuple(sorted((key, tuple(sorted(val)) if isinstance(val, (list, tuple, set)) else val)
+                                     for key, val in value.items()))
+
+            elif isinstance(value, (list, tuple, set)):
+                value = tuple(sorted(str(val) for val in value))
+
+            elif name in ('pos', 'name', 'division', 'season'):
+                value = (str(value),)
+
+            key.append((name, value))
+
+        return tuple(key)
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of queries answered from the cache."""
+
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @staticmethod
+    def versions_query(season: Iterable[str] | str = None) -> sqlalchemy.Select:
+        """Returns the query of the version stamps of the seasons, or of all seasons if None, see `versions`."""
+
+        query = select(SeasonVersion.season, SeasonVersion.version)
+
+        if season is not None:
+            seasons = season if isinstance(season, (list, tuple, set)) else [season]
+            query = query.where(SeasonVersion.season.in_([str(season) for season in seasons]))
+
+        return query
+
+    def versions(self, season: Iterable[str] | str = None) -> tuple:
+        """Returns the current version stamps of the seasons, or of all seasons if None."""
+
+        with self.engine.connect() as connection:
+            return tuple(sorted(tuple(row) for row in connection.execute(self.versions_query(season))))
+
+    def lookup(self,
+               key: tuple,
+               versions: tuple) -> Dict[Any, dict] | None:
+        """
+        Returns a copy of the players of a query, or None if the query is not cached for the
+        given version stamps of its seasons.
+
+        Parameters:
+        ----------
+        key : tuple
+            The key of the query, see `key`.
+        versions : tuple
+            The current version stamps of the seasons of the query, see `versions`.
+
+        Returns:
+        -------
+        dict or None
+            The tables of each player by uid, as given by `Interact.project`.
+        """
+
+        entry = self._players.get(key)
+
+        if entry is None and self.directory is not None:
+            entry = self._read(key)
+
+        if entry is None or entry[0] != versions:
+            self.misses += 1
+            return None
+
+        self._players[key] = entry
+        self._players.move_to_end(key)
+        self._evict()
+
+        self.hits += 1
+
+        return self._copy(entry[1])
+
+    def store(self,
+              key: tuple,
+              versions: tuple,
+              players: Dict[Any, dict]) -> None:
+        """
+        Caches the players of a query, fetched with the given version stamps of its seasons.
+
+        A copy is cached, so the players can be modified afterwards.
+        """
+
+        entry = (versions, self._copy(players))
+
+        self._players[key] = entry
+        self._players.move_to_end(key)
+        self._evict()
+
+        if self.directory is not None:
+            self._write(key, entry)
+
+    def clear(self) -> None:
+        """Empties the cache in memory, e.g. after the tables have been dropped, and resets its counts."""
+
+        self._players.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _evict(self) -> None:
+        """Removes the least recently used queries from memory while there are more than `maxsize`."""
+
+        while len(self._players) > self.maxsize:
+            self._players.popitem(last=False)
+
+    @staticmethod
+    def _copy(players: Dict[Any, dict] | PlayerFrame) -> Dict[Any, dict] | PlayerFrame:
+        """Copies the players down to the tables, which is what callers like `create_index` modify."""
+
+        if isinstance(players, PlayerFrame):
+            return players.copy()
+
+        return {uid: {table_name: dict(columns) for table_name, columns in tables.items()}
+                for uid, tables in players.items()}
+
+    def _path(self, key: tuple) -> str:
+        """Returns the path of the file of a query, unique for the database and the key."""
+
+        digest = hashlib.sha256(repr((self.engine.url.render_as_string(), key)).encode()).hexdigest()
+
+        return os.path.join(self.directory, f'players-{digest}.pickle')
+
+    def _read(self, key: tuple) -> Tuple[tuple, Dict[Any, dict]] | None:
+        """Returns the entry of a query from the directory, or None if it has not been written."""
+
+        try:
+            with open(self._path(key), 'rb') as fhand:
+                return pickle.load(fhand)
+
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: tuple, entry: Tuple[tuple, Dict[Any, dict]]) -> None:
+        """Writes the entry of a query to the directory, replacing the file at once so readers never see half of it."""
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        path = self._path(key)
+        with open(f'{path}.tmp', 'wb') as fhand:
+            pickle.dump(entry, fhand, protocol=pickle.HIGHEST_PROTOCOL)
+
+        os.replace(f'{path}.tmp', path)
@@ -1,8 +1,14 @@
+import asyncio
 from collections import defaultdict
 from football_manager_scouting.backend.server import Setup, Interact
+from football_manager_scouting.backend.async_server import AsyncInteract
 from football_manager_scouting.backend.player import Players
+from football_manager_scouting.backend.frame import PlayerFrame
+from football_manager_scouting.backend.page import Page
+from football_manager_scouting.backend.aggregate import Aggregates
+from football_manager_scouting.backend.query_cache import QueryCache
 from football_manager_scouting.backend.tables import Player, Division, Club, Nat
-from typing import Dict
+from typing import Dict, Iterable, List
 
 
 class Request:
@@ -19,31 +25,57 @@ class Request:
                  user: str,
                  password: str,
                  host: str,
-                 database: str) -> None:
+                 database: str,
+                 cache_size: int = None,
+                 cache_dir: str = None) -> None:
         """
         Initializes the Request object and creates an instance of Players.
 
+        Parameters
+        ----------
+        cache_size : int, optional
+            The number of queries of `fetch_all` kept in memory, see `QueryCache`. The cache is shared by all
+            requests of the database, so a size given here is the size for all of them. Default is None, which
+            keeps the size of the cache, 32 unless changed.
+        cache_dir : str, optional
+            A directory where the queries of `fetch_all` are also cached, so that they are kept
+            between runs. Default is None, which keeps them in memory only.
+
         Attributes
         ----------
         players : Players
             An instance of the Players class to store player records.
+        cache : QueryCache
+            The cache of the queries of `fetch_all`, shared by all requests to the same database.
         """
         
         self.players = Players()
         engine = Setup.create_engine(user, password, host, database)
         self.connection = Interact(engine)
+        self.cache = QueryCache.get(engine, maxsize=cache_size, directory=cache_dir)
 
     def fetch_all(self,
-                  filter={}) -> Players:
+                  filter={},
+                  cache: bool = True,
+                  frame: bool = False) -> Players | PlayerFrame:
         """
         Retrieves all player records from the database based on the given filter.
 
         This method retrieves records and stores them in the players attribute.
+        The records of a filter are cached until the players of its seasons are
+        written again, see `QueryCache`, so repeating a query does not run it.
 
         Parameters
         ----------
         filter : dict, optional
-            A dictionary of filters to apply when retrieving records.
+            A dictionary of filters to apply when retrieving records. It may also give the `fields`
+            to select, e.g. {'season': '24', 'fields': {'Stats': ['xa', 'npXg']}}, so that only
+            these columns of the tables are retrieved, see `Interact.project`.
+        cache : bool, optional
+            If False, the records are retrieved from the database even if cached. Default is True.
+        frame : bool, optional
+            If True, returns the records as a `PlayerFrame`, with one array per column, instead
+            of storing them in the players attribute. Recommended for large cohorts. Default is False.
         login : dict, optional
             A dictionary containing login credentials if the connection is not provided.
         connection : Interact, optional
@@ -51,14 +83,31 @@ class Request:
 
         Returns
         -------
-        Players
-            An instance of the Players class containing all fetched player records.
+        Players or PlayerFrame
+            An instance of the Players class containing all fetched player records,
+            or a PlayerFrame of them if `frame` is True.
         """
         
-        print('Retrieving records from database...')
-        
-        for uid, tables in self.connection.select(**filter):
-            self.players[uid] = tables
+        key = QueryCache.key({**filter, 'frame': frame or None})
+        versions = self.cache.versions(filter.get('season'))
+
+        players = self.cache.lookup(key, versions) if cache else None
+
+        if players is None:
+            print('Retrieving records from database...')
+
+            if frame:
+                players = self.connection.project_frame(**filter)
+            else:
+                players = {uid: tables for uid, tables in self.connection.project(**filter)}
+
+            self.cache.store(key, versions, players)
+
+        if frame:
+            return players
+
+        for uid, tables in players.items():
+            self.players.add(uid, tables)
         
         return self.players
     
@@ -69,7 +118,7 @@ class Request:
         Returns an iterator for fetching player records from the database.
 
         This method retrieves records one at a time, yielding unpacked player 
-        data using the unpack_tables method.
+        data as given by the project method of the connection.
 
         Parameters
         ----------
@@ -88,9 +137,71 @@ class Request:
         
         print('Retrieving records from database...')
         
-        for _, tables in self.connection.select(**filter):
-            yield self.players.unpack_tables(tables)
-    
+        for _, tables in self.connection.project(**filter):
+            yield tables
+
+    def fetch_page(self,
+                   filter={},
+                   size: int = 100,
+                   after: str = None) -> Page:
+        """
+        Retrieves one page of the player records of a filter, in the order of their ids.
+
+        The memory and time of a page only depend on its size, not on how far it is, see
+        `Interact.page`. The pages are neither stored in the players attribute nor cached.
+
+        Parameters
+        ----------
+        filter : dict, optional
+            A dictionary of filters to apply when retrieving records.
+        size : int, optional
+            The maximum number of players of the page. Default is 100.
+        after : str, optional
+            The cursor of the page, i.e. `Page.after` of the previous page. Default is None,
+            which gives the first page.
+
+        Returns
+        -------
+        Page
+            The players of the page and the cursor of the next page, None if it is the last.
+
+        Example
+        -------
+        ```python
+        page = request.fetch_page({'season': '24', 'pos': 'DC'}, size=50)
+
+        while page.after is not None:
+            page = request.fetch_page({'season': '24', 'pos': 'DC'}, size=50, after=page.after)
+        ```
+        """
+
+        return self.connection.page(**filter, size=size, after=after)
+
+    def aggregate(self,
+                  filter={},
+                  stats: Iterable[str] = None,
+                  percentiles: Iterable[float] = ()) -> Aggregates:
+        """
+        Retrieves the minimum, maximum, average and standard deviation of stats over the players
+        of a filter, computed in the database, see `Interact.aggregate`.
+
+        Parameters
+        ----------
+        filter : dict, optional
+            A dictionary of filters of the players.
+        stats : iterable of str, optional
+            The names of the stats to aggregate. Default is None, all stats.
+        percentiles : iterable of float, optional
+            Fractions between 0 and 1 of which the percentiles of each stat are also computed. Default is none.
+
+        Returns
+        -------
+        Aggregates
+            The number of players and the aggregates of each stat.
+        """
+
+        return self.connection.aggregate(**filter, stats=stats, percentiles=percentiles)
+
     def fetch_lookup_tables(self) -> Dict[str, str | int]:
         """
         Retrieves lookup table IDs for divisions, clubs, and nationalities.
@@ -118,4 +229,150 @@ class Request:
             tables['Club'][club.club] = club.id
             tables['Nat'][nat.nat] = nat.id
                 
-        return dict(tables)
\ No newline at end of file
+        return dict(tables)
+
+
+class AsyncRequest:
+    """
+    An asyncio variant of `Request`, for fetching several cohorts of players at once.
+
+    Each fetch runs on a connection of its own from the pool of an asyncio engine, so
+    awaiting many fetches together takes as long as the slowest rather than the sum of all.
+    Each fetch also returns its own `Players` instead of adding to a shared one. The
+    queries are cached in the same `QueryCache` as those of `Request`.
+    """
+
+    # The Interact that builds the queries of each database, shared by all requests, see `AsyncInteract`.
+    _interacts: Dict[str, Interact] = {}
+
+    def __init__(self,
+                 user: str,
+                 password: str,
+                 host: str,
+                 database: str,
+                 cache_size: int = None,
+                 cache_dir: str = None,
+                 pool_size: int = 5) -> None:
+        """
+        Initializes the AsyncRequest object.
+
+        Parameters
+        ----------
+        cache_size : int, optional
+            The number of queries kept in memory, see `QueryCache` and `Request`. Default is None, which
+            keeps the size of the cache.
+        cache_dir : str, optional
+            A directory where the queries are also cached. Default is None.
+        pool_size : int, optional
+            The number of connections kept in the pool, see `Setup.create_async_engine`. Default is 5.
+
+        Attributes
+        ----------
+        connection : AsyncInteract
+            The connection the queries run on.
+        cache : QueryCache
+            The cache of the queries, shared by all requests to the same database.
+        """
+
+        engine = Setup.create_engine(user, password, host, database)
+        async_engine = Setup.create_async_engine(user, password, host, database, pool_size=pool_size)
+
+        key = engine.url.render_as_string(hide_password=False)
+
+        if key not in self._interacts:
+            self._interacts[key] = Interact(engine)
+
+        self.connection = AsyncInteract(async_engine, self._interacts[key])
+        self.cache = QueryCache.get(engine, maxsize=cache_size, directory=cache_dir)
+
+    async def fetch_all(self,
+                        filter={},
+                        cache: bool = True,
+                        frame: bool = False) -> Players | PlayerFrame:
+        """
+        Retrieves all player records from the database based on the given filter, see `Request.fetch_all`.
+
+        Parameters
+        ----------
+        filter : dict, optional
+            A dictionary of filters to apply when retrieving records.
+        cache : bool, optional
+            If False, the records are retrieved from the database even if cached. Default is True.
+        frame : bool, optional
+            If True, returns the records as a `PlayerFrame`. Default is False.
+
+        Returns
+        -------
+        Players or PlayerFrame
+            A new instance of the Players class containing the fetched player records,
+            or a PlayerFrame of them if `frame` is True.
+        """
+
+        key = QueryCache.key({**filter, 'frame': frame or None})
+        versions = await self.connection.versions(filter.get('season'))
+
+        players = self.cache.lookup(key, versions) if cache else None
+
+        if players is None:
+            if frame:
+                players = await self.connection.project_frame(**filter)
+            else:
+                players = dict(await self.connection.project(**filter))
+
+            self.cache.store(key, versions, players)
+
+        if frame:
+            return players
+
+        fetched = Players()
+        for uid, tables in players.items():
+            fetched.add(uid, tables)
+
+        return fetched
+
+    async def fetch_many(self,
+                         filters: Iterable[dict],
+                         cache: bool = True,
+                         frame: bool | Iterable[bool] = False) -> List[Players | PlayerFrame]:
+        """
+        Retrieves the player records of several filters at once.
+
+        Parameters
+        ----------
+        filters : iterable of dict
+            The filters of each fetch, see `fetch_all`.
+        cache : bool, optional
+            If False, the records are retrieved from the database even if cached. Default is True.
+        frame : bool or iterable of bool, optional
+            If True, the records are returned as a `PlayerFrame`, either for all filters or for
+            each filter. Default is False.
+
+        Returns
+        -------
+        list of Players or PlayerFrame
+            The fetched player records of each filter, in the order of the filters.
+
+        Raises
+        ------
+        NoPlayerFoundError
+            If no players match one of the filters.
+        """
+
+        filters = list(filters)
+        frames = [frame] * len(filters) if isinstance(frame, bool) else list(frame)
+
+        return list(await asyncio.gather(*[self.fetch_all(filter, cache, frame)
+                                           for filter, frame in zip(filters, frames)]))
+
+    async def aggregate(self,
+                        filter={},
+                        stats: Iterable[str] = None,
+                        percentiles: Iterable[float] = ()) -> Aggregates:
+        """Retrieves the aggregates of stats over the players of a filter, see `Request.aggregate`."""
+
+        return await self.connection.aggregate(**filter, stats=stats, percentiles=percentiles)
+
+    async def close(self) -> None:
+        """Closes the connections of the pool. Should be awaited before the event loop is closed."""
+
+        await self.connection.dispose()
@@ -0,0 +1,136 @@
+from typing import List
+from football_manager_scouting.backend.tables import Attributes
+import sqlalchemy
+from sqlalchemy import inspect, text
+
+
+# The changes of the columns since the first version of the schema, by the columns they change.
+CHECKSUM = 'player._checksum'
+POSITIONS = 'playerInfo.position'
+ATTRIBUTE_RANGES = 'attributes'
+
+
+def _attribute_columns() -> List[str]:
+    """Returns the attributes, whose range is stored in the column of the attribute and its `_<attribute>High`."""
+
+    return [column.name for column in Attributes.__table__.columns
+            if not column.name.startswith('_')]
+
+
+def outdated_schema(engine: sqlalchemy.engine.Engine) -> List[str]:
+    """
+    Returns the changes of the columns of the schema that a database created with an older
+    version is missing, see `migrate_schema`. Empty if the database has the current columns.
+
+    Parameters:
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The engine of the database.
+
+    Returns:
+    -------
+    list of str
+        The columns to migrate, out of `CHECKSUM`, `POSITIONS` and `ATTRIBUTE_RANGES`.
+    """
+
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    outdated = []
+
+    if 'player' in tables:
+        if '_checksum' not in [column['name'] for column in inspector.get_columns('player')]:
+            outdated.append(CHECKSUM)
+
+    if 'playerInfo' in tables:
+        columns = {column['name']: column['type'] for column in inspector.get_columns('playerInfo')}
+
+        # The first version had one row per position of a player, with the id of the position.
+        if isinstance(columns.get('position'), sqlalchemy.Integer):
+            outdated.append(POSITIONS)
+
+    if 'attributes' in tables:
+        columns = {column['name']: column['type'] for column in inspector.get_columns('attributes')}
+
+        # The first version stored each attribute as the text FM shows, e.g. 12-15.
+        if any(isinstance(columns.get(attribute), sqlalchemy.String) for attribute in _attribute_columns()):
+            outdated.append(ATTRIBUTE_RANGES)
+
+    return outdated
+
+
+def migrate_schema(engine: sqlalchemy.engine.Engine,
+                   verbose: bool = False) -> List[str]:
+    """
+    Converts the columns of a database created with an older version of the schema to the
+    current ones, keeping the data.
+
+    - Adds the `_checksum` of the players, empty until the players are inserted again.
+    - Groups the rows of the player info of each player, one per position, into one row
+      with the ids of all positions of the player, in the order they were inserted.
+    - Parses each attribute, e.g. '12-15', into its low end and its high end `_<attribute>High`.
+      An unknown attribute, '-', becomes NULL.
+
+    The changes are made in one transaction, so a failed migration leaves the database as it was.
+    Only PostgreSQL databases are migrated.
+
+    Parameters:
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The engine of the database.
+    verbose : bool, optional
+        Print each change as it is made. Default is False.
+
+    Returns:
+    -------
+    list of str
+        The migrated columns, see `outdated_schema`. Empty if the database already has the current columns.
+    """
+
+    outdated = outdated_schema(engine)
+
+    with engine.begin() as connection:
+
+        if CHECKSUM in outdated:
+            if verbose:
+                print('Adding the checksums of the players...')
+
+            connection.execute(text('ALTER TABLE player ADD COLUMN "_checksum" VARCHAR(32)'))
+
+        if POSITIONS in outdated:
+            if verbose:
+                print('Grouping the positions of the players...')
+
+            connection.execute(text('ALTER TABLE "playerInfo" ADD COLUMN "_positions" INTEGER[]'))
+            connection.execute(text(
+                'UPDATE "playerInfo" AS info SET "_positions" = grouped.positions '
+                'FROM (SELECT min(_id) AS _id, '
+                "             coalesce(array_agg(position ORDER BY _id) FILTER (WHERE position IS NOT NULL), '{}') AS positions "
+                '      FROM "playerInfo" GROUP BY "_playerID") AS grouped '
+                'WHERE info._id = grouped._id'))
+            # The rows of the other positions of each player.
+            connection.execute(text('DELETE FROM "playerInfo" WHERE "_positions" IS NULL'))
+            connection.execute(text('ALTER TABLE "playerInfo" DROP COLUMN position'))
+            connection.execute(text('ALTER TABLE "playerInfo" RENAME COLUMN "_positions" TO position'))
+            connection.execute(text('ALTER TABLE "playerInfo" ALTER COLUMN position SET NOT NULL'))
+
+        if ATTRIBUTE_RANGES in outdated:
+            if verbose:
+                print('Parsing the ranges of the attributes...')
+
+            attributes = _attribute_columns()
+
+            connection.execute(text('ALTER TABLE attributes ' +
+                                    ', '.join(f'ADD COLUMN "_{attribute}High" SMALLINT' for attribute in attributes)))
+            connection.execute(text('UPDATE attributes SET ' +
+                                    ', '.join(f'"_{attribute}High" = '
+                                              f"CASE WHEN \"{attribute}\" IN ('-', '') THEN NULL "
+                                              f"ELSE reverse(split_part(reverse(\"{attribute}\"), '-', 1))::SMALLINT END"
+                                              for attribute in attributes)))
+            connection.execute(text('ALTER TABLE attributes ' +
+                                    ', '.join(f'ALTER COLUMN "{attribute}" DROP NOT NULL, '
+                                              f'ALTER COLUMN "{attribute}" TYPE SMALLINT USING '
+                                              f"CASE WHEN \"{attribute}\" IN ('-', '') THEN NULL "
+                                              f"ELSE split_part(\"{attribute}\", '-', 1)::SMALLINT END"
+                                              for attribute in attributes)))
+
+    return outdated
@@ -1,4 +1,7 @@
 import math
+import sys
+import numpy as np
+from typing import Tuple
 
 
 class Score:
@@ -10,6 +13,11 @@ class Score:
     mean and standard deviation. The scores are normalized using the hyperbolic 
     tangent function and then scaled.
 
+    The statistics of all players can also be scored at once with `scores`, on a
+    matrix of one row per player, with the same results as scoring each player.
+    A score can also be made from the `Moments` of a stream of players with
+    `from_moments`, without holding all of them in memory.
+
     Attributes
     ----------
     mean : list of float
@@ -19,10 +27,14 @@ class Score:
 
     Parameters
     ----------
-    all_stats : list of list of float
+    all_stats : list of list of float or np.ndarray
         A list containing statistics for all players. Each sublist represents the 
-        statistics of an individual player.
+        statistics of an individual player. May also be a 2-D array, one row per player.
     """
+
+    # The number of players computed at a time by `scores` and `_normal`, so that the arrays of each
+    # step are small enough to stay in the CPU cache.
+    CHUNK = 4096
     
     def __init__(self,
                  all_stats) -> None:
@@ -31,15 +43,39 @@ class Score:
 
         Parameters
         ----------
-        all_stats : list of list of float
+        all_stats : list of list of float or np.ndarray
             A list containing statistics for all players. Each sublist represents the 
-            statistics of an individual player.
+            statistics of an individual player. May also be a 2-D array, one row per player.
         """
         
         self.mean, self.std  = self._normal(all_stats,
                                             n_stats=len(all_stats[0]))
         
 
+    @classmethod
+    def from_moments(cls, moments: 'Moments') -> 'Score':
+        """
+        Creates a Score from the mean and standard deviation accumulated by `Moments`.
+
+        The mean and standard deviation may differ from those of the statistics of all
+        players in the last digits, so a score may rarely differ by a hundredth.
+
+        Parameters
+        ----------
+        moments : Moments
+            The moments of the statistics of all players.
+
+        Returns
+        -------
+        Score
+            A score with the mean and standard deviation of the moments.
+        """
+
+        score = cls.__new__(cls)
+        score.mean, score.std = moments.mean.tolist(), moments.std.tolist()
+
+        return score
+
     def __call__(self, stats, e=0.0000001):
         """
         Normalizes the given player statistics and computes the weighted score.
@@ -70,17 +106,85 @@ class Score:
                     for i, stat in enumerate(t)]
         
         return weighted
-    
+
+    def scores(self, all_stats, e=0.0000001) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Normalizes the statistics of many players at once and computes their weighted and total scores.
+
+        Gives exactly the scores of calling the object on the statistics of each player, and the
+        totals of Python's `sum` of these, but computed on whole columns with NumPy. The few values
+        where NumPy's tanh or rounding could differ from Python's, those halfway between two
+        rounded scores, are computed as by `__call__`.
+
+        Parameters
+        ----------
+        all_stats : np.ndarray or list of list of float
+            The statistics of the players, one row per player and one column per statistic.
+        e : float, optional
+            A small value added to the standard deviation to prevent division by zero. 
+            Default is 1e-7.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            The weighted and rounded scores, of the same shape as the statistics, and the
+            total score of each player.
+        """
+
+        all_stats = np.asarray(all_stats, dtype=np.float64).reshape(len(all_stats), len(self.mean))
+
+        mean, std = np.array(self.mean), np.array(self.std) + e
+
+        weighted = np.empty(all_stats.shape)
+        totals = np.empty(len(all_stats))
+
+        for start in range(0, len(all_stats), self.CHUNK):
+            Z = (all_stats[start:start + self.CHUNK] - mean) / std
+
+            hundredths = np.tanh(Z) * 10 * 100
+            rounded = np.rint(hundredths)
+            chunk = rounded / 100
+
+            # Rounds the same as Python's round unless the score is about halfway between two hundredths,
+            # where NumPy's tanh, which may differ from Python's by an ULP, or its rounding may not.
+            halfway = np.nonzero(np.abs(hundredths - rounded) > 0.5 - 1e-6)
+
+            chunk[halfway] = [round(math.tanh(z)*10, 2) for z in Z[halfway].tolist()]
+
+            weighted[start:start + self.CHUNK] = chunk
+            totals[start:start + self.CHUNK] = self._sum_rows(chunk)
+
+        return weighted, totals
+
+    @staticmethod
+    def _sum_rows(weighted: np.ndarray) -> np.ndarray:
+        """Returns the sum of each row as given by Python's `sum` of the row, which is compensated since Python 3.12."""
+
+        total = np.zeros(len(weighted))
+        compensation = np.zeros(len(weighted))
+
+        for x in weighted.T:
+            t = total + x
+
+            if sys.version_info >= (3, 12):
+                # Neumaier's summation, as in CPython's sum of floats.
+                compensation += np.where(np.abs(total) >= np.abs(x), (total - t) + x, (x - t) + total)
+
+            total = t
+
+        return total + compensation
+
     def _normal(self, all_stats, n_stats):
         """
         Computes the mean and standard deviation for the provided statistics.
 
         This method calculates the mean and standard deviation of the player 
-        statistics from the given data.
+        statistics from the given data. The sums are computed on whole columns, 
+        adding the players in order, so they are the same as adding them one by one.
 
         Parameters
         ----------
-        div_stats : list of list of float
+        div_stats : list of list of float or np.ndarray
             A list containing statistics for all players. Each sublist represents 
             the statistics of an individual player.
         n_stats : int
@@ -92,26 +196,124 @@ class Score:
             A tuple containing two lists: the mean statistics and the standard 
             deviation statistics for the players.
         """
-        
-        mean_stats = [0] * n_stats
-        
-        for player_stat in all_stats:
-            
-            for i in range(len(player_stat)):
-                
-                mean_stats[i] += player_stat[i]
-                
-        mean_stats = [mean_stats[i] / len(all_stats) for i in range(len(mean_stats))]
-        
-        summed_squares = [0] * n_stats
-        
-        for player_stat in all_stats:
-            
-            for i in range(len(player_stat)):
-                
-                summed_squares[i] += (player_stat[i] - mean_stats[i]) ** 2
-        
-        std_devs = [math.sqrt(summed_squares[i]/len(all_stats))
-                    for i in range(len(summed_squares))]
-        
-        return mean_stats, std_devs
+
+        # C order, so that each sum over the players adds one row at a time rather than pairwise.
+        all_stats = np.ascontiguousarray(all_stats, dtype=np.float64).reshape(len(all_stats), n_stats)
+
+        mean_stats = np.add.reduce(all_stats, axis=0) / len(all_stats)
+
+        summed_squares = np.zeros(n_stats)
+
+        for start in range(0, len(all_stats), self.CHUNK):
+            # float_power is the pow of the C library, as Python's ** of floats, which does not always
+            # give the same square as multiplying.
+            squares = np.float_power(all_stats[start:start + self.CHUNK] - mean_stats, 2)
+            # The sum of the previous players is the first row, so the players are still added in order.
+            summed_squares = np.add.reduce(np.vstack([summed_squares, squares]), axis=0)
+
+        std_devs = np.sqrt(summed_squares / len(all_stats))
+
+        return mean_stats.tolist(), std_devs.tolist()
+
+
+class Moments:
+    """
+    The count, mean and sum of squared deviations of player statistics, accumulated one chunk of
+    players at a time with Welford's online algorithm generalized to chunks by Chan et al.
+
+    Only the moments are kept, not the statistics, so a stream of players can be accumulated in
+    bounded memory. The moments of different chunks, or of different worker processes, can be
+    merged with `merge` into those of all their players.
+
+    Attributes
+    ----------
+    count : int
+        The number of players accumulated.
+    mean : np.ndarray
+        The mean value of each statistic.
+    m2 : np.ndarray
+        The sum of the squared deviations from the mean of each statistic.
+
+    Parameters
+    ----------
+    n_stats : int
+        The number of statistics of each player.
+    """
+
+    def __init__(self, n_stats: int) -> None:
+        self.count = 0
+        self.mean = np.zeros(n_stats)
+        self.m2 = np.zeros(n_stats)
+
+    @property
+    def std(self) -> np.ndarray:
+        """The standard deviation of each statistic, over all players as by `Score`."""
+
+        return np.sqrt(self.m2 / self.count)
+
+    def update(self, stats) -> 'Moments':
+        """
+        Adds the statistics of a chunk of players to the moments.
+
+        Parameters
+        ----------
+        stats : np.ndarray or list of list of float
+            The statistics of the players, one row per player, or of a single player.
+
+        Returns
+        -------
+        Moments
+            The moments, updated in place.
+        """
+
+        stats = np.asarray(stats, dtype=np.float64).reshape(-1, len(self.mean))
+
+        if not len(stats):
+            return self
+
+        chunk = Moments(len(self.mean))
+        chunk.count = len(stats)
+        chunk.mean = stats.mean(axis=0)
+        chunk.m2 = ((stats - chunk.mean) ** 2).sum(axis=0)
+
+        merged = self.merge(chunk)
+        self.count, self.mean, self.m2 = merged.count, merged.mean, merged.m2
+
+        return self
+
+    def merge(self, other: 'Moments') -> 'Moments':
+        """
+        Returns the moments of the players of both moments, leaving them unchanged.
+
+        Parameters
+        ----------
+        other : Moments
+            The moments of other players, of the same statistics.
+
+        Returns
+        -------
+        Moments
+            The moments of all players.
+
+        Raises
+        ------
+        ValueError
+            If the moments are not of the same number of statistics.
+        """
+
+        if len(self.mean) != len(other.mean):
+            raise ValueError(f'Expected moments of {len(self.mean)} statistics but got {len(other.mean)} instead.')
+
+        merged = Moments(len(self.mean))
+        merged.count = self.count + other.count
+
+        if not other.count or not self.count:
+            source = self if self.count else other
+            merged.mean, merged.m2 = source.mean.copy(), source.m2.copy()
+            return merged
+
+        delta = other.mean - self.mean
+        merged.mean = self.mean + delta * (other.count / merged.count)
+        merged.m2 = self.m2 + other.m2 + delta ** 2 * (self.count * other.count / merged.count)
+
+        return merged
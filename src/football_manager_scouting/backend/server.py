@@ -1,25 +1,49 @@
-from typing import Dict, Tuple, Iterable
+from typing import Dict, List, Tuple, Iterable
 from football_manager_scouting.backend.tables import (Player, PlayerInfo, Attributes, Stats, Ca, Contract, Base,
                     Position, Division, Foot, Nat, Club, Eligible)
-from football_manager_scouting.backend.errors import NoPlayerFoundError, UnexpecteTableNameError, UnexpectedColumnNameError
+from football_manager_scouting.backend.checkpoint import checkpoint_statement, clear_checkpoint_statement
+from football_manager_scouting.backend.lookup_cache import LookupCache
+from football_manager_scouting.backend.query_cache import QueryCache, bump_version_statement
+from football_manager_scouting.backend.statement_cache import StatementCache
+from football_manager_scouting.backend.errors import (NoPlayerFoundError, UnexpecteTableNameError, UnexpectedColumnNameError,
+                                                      OutdatedSchemaError)
+from football_manager_scouting.backend.schema import outdated_schema
+from football_manager_scouting.backend.player import Unpacker
+from football_manager_scouting.backend.frame import PlayerFrame
+from football_manager_scouting.backend.page import Page, encode_cursor, decode_cursor
+from football_manager_scouting.backend.aggregate import Aggregates
 import sqlalchemy
-from sqlalchemy.orm import Session
-from sqlalchemy import select, create_engine, and_, func, inspect
+from sqlalchemy.orm import Session, aliased, contains_eager
+from sqlalchemy import (select, create_engine, and_, inspect, delete, literal_column, text, event, func, cast,
+                        any_, bindparam, Float, Integer, SmallInteger, BigInteger, String)
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
 from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import AddConstraint, UniqueConstraint
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from tqdm import tqdm
+import numpy as np
 
 class Setup:
+
+    # The engines of `create_engine` by URL, shared by the whole process.
+    _engines: Dict[str, sqlalchemy.engine.Engine] = {}
     
     @classmethod
     def create_engine(self,
                       user: str,
                       password: str,
                       host: str,
-                      database: str
+                      database: str,
+                      pool_size: int = 5,
+                      max_overflow: int = 10
                       ) -> sqlalchemy.engine.Engine:
         """
         Creates and returns a SQLAlchemy engine for connecting to a PostgreSQL database.
 
+        The engine is created once per URL and process: later calls with the same login return
+        the same engine, and so share its pool of connections. A script that builds many spiders
+        or requests thus connects to the database once.
+
         Parameters:
         ----------
         user : str
@@ -30,6 +54,11 @@ class Setup:
             The hostname or IP address of the database server.
         database : str
             The name of the database to connect to.
+        pool_size : int, optional
+            The number of connections kept open in the pool. Default is 5.
+        max_overflow : int, optional
+            The number of connections opened beyond `pool_size` when all are in use, and closed
+            when returned. Default is 10. Both sizes only apply when the engine is created.
 
         Raises:
         ------
@@ -45,39 +74,139 @@ class Setup:
         ------
         - Uses `psycopg2` as the PostgreSQL driver.
         - Constructs the database URL with the provided credentials and database details.
+        - The connections of the pool are tested before use, so a cached engine outlives a restart
+          of the database server.
         """
         
         url = f'postgresql+psycopg2://{user}:{password}@{host}/{database}'
+
+        if url in self._engines:
+            return self._engines[url]
         
-        engine = create_engine(url)
+        engine = create_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
         
         try:
-            engine.connect()
+            with engine.connect():
+                pass
             
         except OperationalError:
+            engine.dispose()
             stmnt = f'Error: Database {database} does not exist! An empty database must be created before use.'
             raise OperationalError(statement=stmnt, params=None, orig=OperationalError)
+
+        self._engines[url] = engine
         
         return engine
 
+    @classmethod
+    def dispose_engines(self) -> None:
+        """Closes the connections of all engines of `create_engine` and forgets them."""
+
+        for engine in self._engines.values():
+            engine.dispose()
+
+        self._engines.clear()
+
+    @classmethod
+    def create_async_engine(self,
+                            user: str,
+                            password: str,
+                            host: str,
+                            database: str,
+                            pool_size: int = 5) -> AsyncEngine:
+        """
+        Creates and returns a SQLAlchemy asyncio engine for connecting to a PostgreSQL database.
+
+        Parameters:
+        ----------
+        user : str
+            The username for authenticating the database connection.
+        password : str
+            The password for authenticating the database connection.
+        host : str
+            The hostname or IP address of the database server.
+        database : str
+            The name of the database to connect to.
+        pool_size : int, optional
+            The number of connections kept in the pool, i.e. how many queries run at once
+            without opening new connections. Default is 5.
+
+        Returns:
+        -------
+        sqlalchemy.ext.asyncio.AsyncEngine
+            A SQLAlchemy AsyncEngine instance configured to connect to the specified PostgreSQL database.
+
+        Notes:
+        ------
+        - Uses `asyncpg` as the PostgreSQL driver, which must be installed.
+        - Unlike `create_engine` no connection is made, so a database that does not exist is
+          only reported by the first query.
+        - Unlike `create_engine` the engine is not shared, since the connections of an asyncio
+          engine belong to the event loop they were opened in.
+        """
+
+        url = f'postgresql+asyncpg://{user}:{password}@{host}/{database}'
+
+        engine = create_async_engine(url, pool_size=pool_size)
+
+        # Reads the real columns, like the stats, from their text like psycopg2 does, so that both
+        # engines give e.g. 12.55 rather than the nearest double of the 4-byte float, 12.550000190734863.
+        @event.listens_for(engine.sync_engine, 'connect')
+        def decode_real_as_text(dbapi_connection, connection_record):
+            dbapi_connection.run_async(lambda connection: connection.set_type_codec(
+                'float4', schema='pg_catalog', encoder=str, decoder=float, format='text'))
+
+        return engine
+
 
 class Interact:
 
     TABLE_NAMES = ('player', 'playerInfo', 'attributes', 'stats',
                    'ca', 'contract', 'position', 'division', 'foot',
-                   'nat', 'club', 'eligible')
+                   'nat', 'club', 'eligible', 'checkpoint', 'seasonVersion')
+
+    # The number of rows `select` fetches from the server-side cursor at a time.
+    YIELD_PER = 1000
+
+    # The number of players `upsert` writes per statement at commit.
+    UPSERT_BATCH = 1000
+
+    # The projections of `project`, by column set, built once per process.
+    _projections: Dict[tuple, tuple] = {}
+
+    # The URLs of the databases known to have all tables, checked once per process.
+    _checked_schemas: set = set()
 
     def __init__(self, engine) -> None:
         self.engine = engine
         self.session = Session(engine)
+        self.statements = StatementCache.get(engine)
+
+        # The players of `upsert` not yet written, keyed by (uid, season) so that a later record of
+        # the same player replaces the earlier.
+        self._upserts: Dict[Tuple[str, str], Tuple[Dict, list]] = {}
         
         self._check_if_tables_not_exist()
 
     def _check_if_tables_not_exist(self):
-        if not all([inspect(self.engine).has_table(table_name)
-                    for table_name in self.TABLE_NAMES]):
+        # The check is forgotten when the tables are dropped through the ORM models, see `_forget_checked_schema`.
+        key = self.engine.url.render_as_string(hide_password=False)
+
+        if key in self._checked_schemas:
+            return
+
+        if not set(self.TABLE_NAMES).issubset(inspect(self.engine).get_table_names()):
             print("Table relation not found")
             self.create(drop=False)
+
+        # The queries of the current version fail on the columns of an older one, so it is caught before any query.
+        outdated = outdated_schema(self.engine)
+        if outdated:
+            raise OutdatedSchemaError(f'The database was created with an older version of the schema, whose columns '
+                                      f'{", ".join(outdated)} have since changed. Migrate it with migrate_database, '
+                                      f'or drop the tables and load the data again.')
+
+        self._checked_schemas.add(key)
                 
     def commit(self,
                close: bool = True,
@@ -85,6 +214,8 @@ class Interact:
         
         if verbose:
             print('Commiting entries...')
+
+        self._write_upserts()
         
         self.session.commit()
             
@@ -125,7 +256,11 @@ class Interact:
             print('Creating database...')
 
         if drop:
+            # Dropping the tables forgets the cached lookup ids, see `_forget_checked_schema`, and the
+            # cached queries of the players are forgotten here. Neither is forgotten if the tables are
+            # emptied in other ways, e.g. with TRUNCATE.
             Base.metadata.drop_all(self.engine)
+            QueryCache.get(self.engine).clear()
 
         Base.metadata.create_all(self.engine)
 
@@ -161,8 +296,6 @@ class Interact:
         - Player records are added to the session before committing, enabling batch insertion.
         """
         
-        global_vars = globals()
-        
         try:
             player = Player(**player_table)
         except TypeError:
@@ -170,6 +303,285 @@ class Interact:
             found_cols = ', '.join(list(player_table.keys()))
             raise UnexpectedColumnNameError(f"Unexpected mapped column!\nExpected columns: {expected_cols},\nbut found columns: {found_cols}")
         
+        self._make_table_objs(tables, _player=player)
+        
+        self.session.add(player)
+
+    def upsert(self,
+               tables: Dict[str, Dict[str, str | float] |
+                                 Iterable[Dict[str, int]]],
+               player_table: Dict[str, str | int],
+               ) -> None:
+        """
+        Inserts player data and associated tables into the database, replacing the player if it already exists.
+
+        Takes the same arguments as `insert`. A player is identified by its `uid` and `season`.
+        If the player already exists its columns are updated, its associated tables are deleted
+        and the new ones are inserted, keeping the `_id` of the player. Inserting the same
+        player twice therefore never creates a duplicate.
+
+        The players are written with the next commit, `UPSERT_BATCH` players per statement, so
+        that a batch of players takes a few round trips rather than a few per player.
+
+        Parameters:
+        ----------
+        tables : dict
+            A dictionary where keys are table names and values are either a dictionary of attributes
+            or a tuple of dictionaries representing individual records to be inserted.
+        player_table : dict
+            A dictionary of attributes representing the player record to be inserted.
+
+        Raises:
+        ------
+        UnexpecteTableNameError
+            If given a table name not import from tables.py.
+        UnexpectedColumnNameError
+            If given a column name not present in the table mapping.
+        """
+
+        if not set(player_table) <= set(Player.__table__.columns.keys()) - {'_id'}:
+            expected_cols = ', '.join([column.name for column in Player.__table__.columns if not column.name.startswith('_')])
+            found_cols = ', '.join(list(player_table.keys()))
+            raise UnexpectedColumnNameError(f"Unexpected mapped column!\nExpected columns: {expected_cols},\nbut found columns: {found_cols}")
+        
+        # Created when the player is given, so that invalid tables raise at once.
+        table_objs = self._make_table_objs(tables)
+
+        self._upserts[self._upsert_key(player_table)] = (player_table, table_objs)
+
+    @staticmethod
+    def _upsert_key(player_table: Dict[str, str | int]) -> Tuple[str, str]:
+        """Returns the (uid, season) of a player, as the columns of the player table give them."""
+
+        return str(player_table.get('uid')), str(player_table.get('season'))
+
+    def _write_upserts(self) -> None:
+        """
+        Writes the players buffered by `upsert` to the session, `UPSERT_BATCH` players at a time.
+
+        Each batch of players is inserted with one INSERT .. ON CONFLICT, which gives the `_id` of
+        each player, and the tables of the players that already existed are deleted with one
+        DELETE per table. The new tables are added to the session, which inserts them in batches.
+        """
+
+        records = list(self._upserts.values())
+        self._upserts.clear()
+
+        for start in range(0, len(records), self.UPSERT_BATCH):
+            batch = records[start:start + self.UPSERT_BATCH]
+
+            stmt = pg_insert(Player).values([player_table for player_table, _ in batch])
+            stmt = stmt.on_conflict_do_update(index_elements=[Player.uid, Player.season],
+                                              set_={column.name: stmt.excluded[column.name]
+                                                    for column in Player.__table__.columns
+                                                    if column.name not in ('_id', 'uid', 'season')})
+            # xmax is 0 for a newly inserted row.
+            stmt = stmt.returning(Player.uid, Player.season, Player._id, literal_column('xmax = 0'))
+
+            player_ids, existing = {}, []
+
+            for uid, season, player_id, inserted in self.session.execute(stmt):
+                player_ids[(uid, season)] = player_id
+
+                if not inserted:
+                    existing.append(player_id)
+
+            if existing:
+                for table_obj in (PlayerInfo, Attributes, Stats, Ca, Contract):
+                    self.session.execute(delete(table_obj).where(table_obj._playerID.in_(existing)))
+
+            for player_table, table_objs in batch:
+                player_id = player_ids[self._upsert_key(player_table)]
+
+                for table_obj in table_objs:
+                    table_obj._playerID = player_id
+
+                self.session.add_all(table_objs)
+
+    def checkpoint(self,
+                   fingerprint: str,
+                   season: str,
+                   offset: int) -> None:
+        """
+        Saves how far into a file the ingest has come. The checkpoint is written with the next commit.
+
+        Parameters:
+        ----------
+        fingerprint : str
+            The fingerprint of the file, see `checkpoint.fingerprint`.
+        season : str
+            The season of the entries of the file.
+        offset : int
+            The byte offset of the end of the last inserted line.
+        """
+
+        self.session.execute(checkpoint_statement(fingerprint, season, offset))
+
+    def clear_checkpoint(self,
+                         fingerprint: str,
+                         season: str) -> None:
+        """
+        Deletes the checkpoint of a file whose lines have all been inserted. The checkpoint is deleted with the next commit.
+
+        Parameters:
+        ----------
+        fingerprint : str
+            The fingerprint of the file, see `checkpoint.fingerprint`.
+        season : str
+            The season of the entries of the file.
+        """
+
+        self.session.execute(clear_checkpoint_statement(fingerprint, season))
+
+    def bump_season_version(self, season: str) -> None:
+        """
+        Gives a season a new version stamp, so that the cached queries of its players are run again,
+        see `QueryCache`. The stamp is written with the next commit.
+
+        Parameters:
+        ----------
+        season : str
+            The season whose players have been written.
+        """
+
+        self.session.execute(bump_version_statement(str(season)))
+
+    def create_indexes(self, verbose: bool = False) -> List[str]:
+        """
+        Creates the indexes and unique constraints declared on the ORM models that are missing from the database.
+
+        Migrates a database created before the indexes were declared, without reloading
+        any data, e.g. adds the unique (uid, season) of the players that the upserts of the
+        ingest rely on. The tables are analyzed afterwards so that the query planner has fresh
+        statistics to choose the new indexes by.
+
+        Parameters:
+        ----------
+        verbose : bool, optional
+            Print the name of each created index. Default is False.
+
+        Returns:
+        -------
+        list of str
+            The names of the created indexes and constraints. Empty if all already exist.
+
+        Raises:
+        ------
+        IntegrityError
+            If a unique constraint cannot be added because the table has duplicates, e.g. a
+            player inserted twice for a season before the constraint was declared.
+        """
+
+        inspector = inspect(self.engine)
+        created = []
+
+        for table in Base.metadata.sorted_tables:
+            existing = set([index['name'] for index in inspector.get_indexes(table.name)])
+            existing_unique = set([tuple(constraint['column_names'])
+                                   for constraint in inspector.get_unique_constraints(table.name)])
+
+            for constraint in table.constraints:
+                columns = tuple(column.name for column in constraint.columns)
+
+                if isinstance(constraint, UniqueConstraint) and columns not in existing_unique:
+                    # Named as PostgreSQL names the constraints of the tables it creates.
+                    name = constraint.name or f'{table.name}_{"_".join(columns)}_key'
+
+                    if verbose:
+                        print(f'Creating unique constraint {name}...')
+
+                    with self.engine.begin() as connection:
+                        connection.execute(AddConstraint(constraint, isolate_from_table=False))
+                    created.append(name)
+
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name not in existing:
+                    if verbose:
+                        print(f'Creating index {index.name}...')
+
+                    index.create(self.engine)
+                    created.append(index.name)
+
+        if created:
+            with self.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+                connection.execute(text('ANALYZE'))
+
+        return created
+
+    def explain(self,
+                analyze: bool = False,
+                **filters) -> str:
+        """
+        Returns the query plan of `select` for the given filters, as shown by PostgreSQL's EXPLAIN.
+
+        Parameters:
+        ----------
+        analyze : bool, optional
+            If True, runs the query and shows the actual times and row counts with EXPLAIN ANALYZE. Default is False.
+        **filters
+            The filters of `select`, e.g. season='24' or pos=['DC'].
+
+        Returns:
+        -------
+        str
+            The query plan, one node per line.
+        """
+
+        plan = self._explain(self.query(**filters), 'ANALYZE' if analyze else '')
+
+        return '\n'.join([row[0] for row in plan])
+
+    def _estimate_rows(self, statement: sqlalchemy.Select, params: dict = None) -> int:
+        """
+        Returns the number of rows of a query as estimated by the query planner for the values of its
+        parameters, without running the query. Only run for the total of the progress bar, when asked for.
+        """
+
+        plan = self._explain(statement, '(FORMAT JSON)', params)
+
+        return plan[0][0][0]['Plan']['Plan Rows']
+
+    def _explain(self,
+                 statement: sqlalchemy.Select,
+                 options: str,
+                 params: dict = None) -> list:
+        """Runs EXPLAIN with the given options on a query and returns the rows of the plan."""
+
+        compiled = self.statements.compiled(statement)
+
+        with self.engine.connect() as connection:
+            return connection.exec_driver_sql(f'EXPLAIN {options} {compiled}', compiled.construct_params(params)).all()
+
+    def get_checksums(self, season: str) -> Dict[str, str]:
+        """
+        Retrieves the checksum of every player of a season, see `Preprocess.checksum`.
+
+        Parameters:
+        ----------
+        season : str
+            The season of the players.
+
+        Returns:
+        -------
+        dict
+            The checksum of each player by `uid`. Players inserted without a checksum are left out.
+        """
+
+        query = select(Player.uid, Player._checksum).where(Player.season == str(season),
+                                                           Player._checksum.is_not(None))
+
+        with self.engine.connect() as connection:
+            return {uid: checksum for uid, checksum in connection.execute(query)}
+
+    def _make_table_objs(self,
+                         tables: Dict[str, Dict[str, str | float] |
+                                           Iterable[Dict[str, int]]],
+                         **player) -> list:
+        """Creates the ORM objects of the tables associated with a player, given by `_player` or `_playerID`."""
+
+        global_vars = globals()
+        
+        table_objs = []
         for table_name, table in tables.items():
             
             try:
@@ -178,25 +590,18 @@ class Interact:
                 raise UnexpecteTableNameError(f"Cannot find ORM table mapping with the name `{table_name}`.")
             
             if not isinstance(table, (tuple, list)):
+                table = (table,)
+
+            for t in table:
                 try:
-                    table_obj(_player=player, **table)
+                    table_objs.append(table_obj(**player, **t))
                 except TypeError:
                     expected_cols = ', '.join([column.name for column in table_obj.__table__.columns if not column.name.startswith('_')])
-                    found_cols = ', '.join(list(table.keys()))
+                    found_cols = ', '.join(list(t.keys()))
                     raise UnexpectedColumnNameError(f"Unexpected mapped column!\nExpected columns: {expected_cols},\nbut found columns: {found_cols}")
 
-            else:
-                for t in table:
-                    try:
-                        table_obj(_player=player, **t)
-                    except TypeError:
-                        expected_cols = ', '.join([column.name for column in table_obj.__table__.columns if not column.name.startswith('_')])
-                        found_cols = ', '.join(list(t.keys()))
-                        raise UnexpectedColumnNameError(f"Unexpected mapped column!\nExpected columns: {expected_cols},\nbut found columns: {found_cols}")
-        
-        self.session.add(player)
+        return table_objs
 
-            
     def get_lookup_id(self,
                       lookup_table_name: str,
                       lookup: Tuple[str, str]):
@@ -259,6 +664,157 @@ class Interact:
 
         return id[0]
 
+    def query(self,
+              pos: Iterable[str] | str = None,
+              mins: int = 0,
+              name: Iterable[str] | str = None,
+              division: Iterable[str] | str = None,
+              min_ca: int = 0,
+              eligible: str = None,
+              season: Iterable[str] | str = None,
+              attributes: Dict[str, int] = None,
+              columns = (Player, PlayerInfo,
+                         Ca, Contract, Stats, Attributes)) -> sqlalchemy.Select:
+        """
+        Builds the query that `select` runs for the given filters, without running it.
+
+        Takes the same arguments as `select`. Used to inspect the query plans of `select`,
+        e.g. with EXPLAIN.
+
+        Returns:
+        -------
+        sqlalchemy.Select
+            The query of the rows of the players matching the filters, with the values of the
+            filters bound to its parameters.
+        """
+
+        shape, params = self._shape(pos, mins, name, division, min_ca, eligible, season, attributes)
+
+        return self.statements.statement(('query', tuple(columns), shape),
+                                         lambda: self._query(columns, self._filters(shape))).params(params)
+
+    def _query(self, columns, filters) -> sqlalchemy.Select:
+        """Joins the tables of the players and applies the filters, see `query`."""
+
+        return select(*columns) \
+               .select_from(Player) \
+               .join(PlayerInfo, PlayerInfo._playerID == Player._id) \
+               .join(Ca, Ca._playerID == Player._id) \
+               .join(Contract, Contract._playerID == Player._id) \
+               .join(Attributes, Attributes._playerID == Player._id) \
+               .join(Stats, Stats._playerID == Player._id) \
+               .join(Division, PlayerInfo.division == Division.id) \
+               .join(Club, PlayerInfo.club == Club.id) \
+               .join(Nat, PlayerInfo.nat == Nat.id) \
+               .join(Eligible, PlayerInfo.eligible == Eligible.id) \
+               .filter(filters) \
+               .order_by(Player._id)
+
+    def _with_lookups(self, query) -> sqlalchemy.Select:
+        """
+        Loads the lookup tables of the player info with the rows of a query of `_query`, instead
+        of lazily with one SELECT per row when their names are unpacked.
+
+        The division, club, nationality and eligibility are loaded from the tables that `_query`
+        already joins, and the feet from one aliased join per foot. The positions need no join,
+        since their names are a column of the player info.
+        """
+
+        rightfoot = aliased(Foot, name='rightfoot_lookup')
+        leftfoot = aliased(Foot, name='leftfoot_lookup')
+
+        return query.join(rightfoot, PlayerInfo.rightfoot == rightfoot.id) \
+                    .join(leftfoot, PlayerInfo.leftfoot == leftfoot.id) \
+                    .options(contains_eager(PlayerInfo.Division),
+                             contains_eager(PlayerInfo.Club),
+                             contains_eager(PlayerInfo.Nat),
+                             contains_eager(PlayerInfo.Eligible),
+                             contains_eager(PlayerInfo.Rightfoot.of_type(rightfoot)),
+                             contains_eager(PlayerInfo.Leftfoot.of_type(leftfoot)))
+
+    def _shape(self, pos, mins, name, division, min_ca, eligible, season, attributes,
+               versions: tuple = None) -> Tuple[tuple, dict]:
+        """
+        Returns the shape of the filters of `select` and the values of its parameters, see `select` for the arguments.
+
+        The shape is the names of the parameters of the filters, so that the same filters with other
+        values, e.g. other names, have the same shape and thus the same statement, see `_filters`. The
+        positions, divisions and eligibility are given as the ids of their names, from `LookupCache`, so
+        that no query is run to find them. Names that do not exist match no players. The cached ids are
+        only used while the version stamps of the seasons are the same, see `LookupCache.validate`,
+        which are read with one small query unless given as `versions`.
+
+        Raises:
+        ------
+        UnexpectedColumnNameError
+            If given an attribute name that is not a column of the attributes table.
+        """
+
+        lookups = LookupCache.get(self.engine)
+        params = {'min_ca': min_ca, 'mins': mins}
+
+        if pos or division or eligible is not None:
+            lookups.validate(QueryCache.get(self.engine).versions() if versions is None else versions)
+
+        if pos:
+            params['pos'] = lookups.find_lookup_ids('Position', list(pos) if isinstance(pos, (tuple, list)) else [pos])
+
+        if division:
+            params['division'] = lookups.find_lookup_ids('Division', list(division) if isinstance(division, (tuple, list)) else [division])
+
+        if name:
+            params['name'] = list(name) if isinstance(name, (tuple, list)) else [name]
+
+        if eligible is not None:
+            params['eligible'] = lookups.find_lookup_ids('Eligible', [eligible])
+
+        if season is not None:
+            params['season'] = list(season) if isinstance(season, (tuple, list)) else [season]
+
+        if attributes:
+            for attribute, value in sorted(attributes.items()):
+                if attribute.startswith('_') or attribute not in Attributes.__table__.columns:
+                    expected_cols = ', '.join([column.name for column in Attributes.__table__.columns if not column.name.startswith('_')])
+                    raise UnexpectedColumnNameError(f"Unexpected attribute!\nExpected attributes: {expected_cols},\nbut found attribute: {attribute}")
+
+                params[f'attribute_{attribute}'] = value
+
+        return tuple(params), params
+
+    @staticmethod
+    def _filters(shape: tuple) -> sqlalchemy.ColumnElement:
+        """Returns the WHERE clause of `select` for a shape of filters, with their values as parameters, see `_shape`."""
+
+        ands = []
+        ands.append(Ca.ca >= bindparam('min_ca'))
+        ands.append(PlayerInfo.mins >= bindparam('mins'))
+
+        if 'pos' in shape:
+            # Players that can play any of the positions.
+            ands.append(PlayerInfo.position.overlap(bindparam('pos', type_=ARRAY(Integer))))
+
+        if 'division' in shape:
+            ands.append(PlayerInfo.division == any_(bindparam('division', type_=ARRAY(Integer))))
+
+        if 'name' in shape:
+            ands.append(Player.name == any_(bindparam('name', type_=ARRAY(String))))
+
+        if 'eligible' in shape:
+            ands.append(PlayerInfo.eligible == any_(bindparam('eligible', type_=ARRAY(Integer))))
+
+        if 'season' in shape:
+            ands.append(Player.season == any_(bindparam('season', type_=ARRAY(String))))
+
+        # The players after the cursor of a page, see `page`.
+        if 'after' in shape:
+            ands.append(Player._id > bindparam('after'))
+
+        for key in shape:
+            if key.startswith('attribute_'):
+                ands.append(Attributes.__table__.columns[key[len('attribute_'):]] >= bindparam(key))
+
+        return and_(*ands)
+
     def select(self,
                pos: Iterable[str] | str = None,
                mins: int = 0,
@@ -267,8 +823,10 @@ class Interact:
                min_ca: int = 0,
                eligible: str = None,
                season: Iterable[str] | str = None,
+               attributes: Dict[str, int] = None,
                columns = (Player, PlayerInfo,
-                          Ca, Contract, Stats, Attributes)):
+                          Ca, Contract, Stats, Attributes),
+               progress: bool = False):
         """
         Retrieves player records from the database based on various filtering criteria.
 
@@ -289,8 +847,15 @@ class Interact:
             The eligibility status to filter players by. If provided, only players matching this status will be selected.
         season : Iterable of str, optional
             The season year to filter players by. If provided, only players from this specified season will be included.
+        attributes : dict, optional
+            The minimum value of attributes to filter players by, e.g. {'pac': 15, 'acc': 14}. The filter runs
+            in the database. For attributes that are only partly scouted the low end of the range is compared,
+            so only players known to reach the value are included.
         columns : tuple, optional
             The columns to retrieve in the query. Defaults to a predefined set of player-related tables.
+        progress : bool, optional
+            If True, the progress bar shows the total number of rows, as estimated by the query planner
+            with an EXPLAIN before the query. Default is False, a progress bar without a total.
 
         Yields:
         -------
@@ -301,101 +866,525 @@ class Interact:
         ------
         NoPlayerFoundError
             If no players match the specified filtering criteria.
+        UnexpectedColumnNameError
+            If given an attribute name that is not a column of the attributes table.
 
         Notes:
         ------
         - Constructs a dynamic query using SQLAlchemy to filter players based on the provided parameters.
         - Joins various related tables (e.g., PlayerInfo, Ca, Contract, etc.) to retrieve comprehensive player data.
         - Processes results and groups them by player ID, yielding results in a structured format.
-        - Utilizes `tqdm` to display progress while processing rows, enhancing user experience.
+        - Streams the results with a server-side cursor, `YIELD_PER` rows at a time, instead of loading
+          all rows into memory before the first one is yielded.
+        - The query is built once per shape of the filters, with their values as parameters, see `StatementCache`.
+        - Utilizes `tqdm` to display progress while processing rows.
         """
         
-        def ands(pos, name, division, eligible):
-            ands = []
-            ands.append(Ca.ca >= min_ca)
-            ands.append(PlayerInfo.mins >= mins)
+        shape, params = self._shape(pos, mins, name, division, min_ca, eligible, season, attributes)
+        results_query = self.statements.statement(('select', tuple(columns), shape),
+                                                  lambda: self._select_query(columns, shape))
+
+        # The planner's estimate of the number of rows, since counting them would run the query twice.
+        rows = self._estimate_rows(results_query, params) if progress else None
 
-            if pos:
+        # Streams the rows of large queries from a server-side cursor in batches, so that memory stays
+        # the same however many players are found.
+        results = self.session.execute(results_query, params, execution_options={'yield_per': self.YIELD_PER})
 
-                if not isinstance(pos, (tuple, list)):
-                    pos = [pos]
+        try:
+            row = next(results, None)
+
+            if row is None:
+                raise NoPlayerFoundError('No players found with the given filters.')
 
-                pos = [res[0] for res in self.session.query(Position.id) \
-                            .filter(Position.position.in_(pos)).all()]
+            current_id = row.Player.uid
+            rows_of_one_player = [row]
 
-                ands.append(Player._id.in_(select(Player._id).join(PlayerInfo).filter(PlayerInfo.position.in_(pos))))
+            with tqdm(total=rows, desc='Processing rows') as pbar:
 
-            if division:
+                while row:
 
-                if not isinstance(division, (tuple, list)):
-                    division = [division]
+                    try:
+                        row = next(results)
+                    except StopIteration:
+                        yield row.Player.uid, rows_of_one_player
+                        break
 
-                division_id = [res[0] for res in self.session.query(Division.id) \
-                               .filter(Division.division.in_(division)).all()]
+                    pbar.update()
 
-                ands.append(PlayerInfo.division.in_(division_id))
+                    next_id = row.Player.uid
 
-            if name:
-                ands.append(Player.name.in_(name if isinstance(name, (tuple, list)) else [name]))
+                    # Yield the current rows if the next row is of a new player and start over.
+                    if current_id != next_id:
+                        yield current_id, rows_of_one_player
+                        rows_of_one_player = []
+                        current_id = next_id
 
-            if eligible is not None:
-                eligible_id = [res[0] for res in self.session.query(Eligible.id) \
-                               .filter(Eligible.eligible == eligible).all()][0]
-                
-                ands.append(PlayerInfo.eligible == eligible_id)
-
-            if season is not None:
-                ands.append(Player.season.in_(season if isinstance(season, (tuple, list)) else [season]))
-
-            return and_(*ands)
-
-        n_rows = self.session.query(func.count(Player._id)) \
-                             .join(PlayerInfo).join(Ca) \
-                             .filter(ands(pos, name, division, eligible)) \
-                             .scalar()
-
-        results_query = select(*columns) \
-                        .join(PlayerInfo, PlayerInfo._playerID == Player._id) \
-                        .join(Ca, Ca._playerID == Player._id) \
-                        .join(Contract, Contract._playerID == Player._id) \
-                        .join(Attributes, Attributes._playerID == Player._id) \
-                        .join(Stats, Stats._playerID == Player._id) \
-                        .join(Division, PlayerInfo.division == Division.id) \
-                        .join(Club, PlayerInfo.club == Club.id) \
-                        .join(Nat, PlayerInfo.nat == Nat.id) \
-                        .join(Eligible, PlayerInfo.eligible == Eligible.id) \
-                        .filter(ands(pos, name, division, eligible)) \
-                        .order_by(Player._id)
-
-        results = self.session.execute(results_query)
-
-        if n_rows == 0:
+                    rows_of_one_player.append(row)
+
+        finally:
+            results.close()
+
+    def _select_query(self, columns, shape) -> sqlalchemy.Select:
+        """Returns the query of `select` for a shape of filters, see `_shape`."""
+
+        results_query = self._query(columns, self._filters(shape))
+
+        if PlayerInfo in columns:
+            results_query = self._with_lookups(results_query)
+
+        return results_query
+
+    @staticmethod
+    def _fields_key(fields: Dict[str, Iterable[str]] = None) -> tuple | None:
+        """Returns the columns of `fields` as a hashable key, the same whatever the order of the columns."""
+
+        if not fields:
+            return None
+
+        return tuple(sorted((table_name, frozenset([col_names] if isinstance(col_names, str) else col_names))
+                            for table_name, col_names in fields.items()))
+
+    def _projection(self, columns, fields=None) -> Tuple[list, list, Unpacker]:
+        """
+        Returns the Core columns selected by `project` for a column set, the lookup tables
+        it joins in addition to `_query` and the `Unpacker` of its rows.
+
+        Each visible column of the tables is selected as a plain value: lookup ids are
+        replaced by the names in their lookup tables, positions by the array of their names and
+        attributes by both ends of their range. The first column is always the uid of the player.
+        Only the columns given by `fields` are selected of its tables, see `_fields_key`, and a
+        table given no columns is left out. Built once per column set and fields.
+        """
+
+        projection = self._projections.get((columns, fields))
+
+        if projection is not None:
+            return projection
+
+        table_names = {table.__tablename__[0].upper() + table.__tablename__[1:]: table for table in columns}
+        selected = dict(fields) if fields else {}
+
+        for table_name, col_names in selected.items():
+
+            if table_name not in table_names:
+                raise UnexpecteTableNameError(f"Cannot select the columns of `{table_name}`, expected one of: "
+                                              f"{', '.join(table_names)}.")
+
+            expected_cols = [column.name for column in table_names[table_name].__table__.columns
+                             if not column.name.startswith('_')]
+
+            unexpected_cols = sorted(col_names - set(expected_cols))
+
+            if unexpected_cols:
+                raise UnexpectedColumnNameError(f"Unexpected column of {table_name}!\nExpected columns: "
+                                                f"{', '.join(expected_cols)},\nbut found columns: {', '.join(unexpected_cols)}")
+
+        expressions, layout, ranges, joins = [Player.uid], [None], {}, []
+
+        # Joined by `_query`, other lookup tables are joined once per column, e.g. the foot.
+        joined = {Division, Club, Nat, Eligible}
+
+        for table_name, table in table_names.items():
+
+            mapper = inspect(table)
+            col_names = selected.get(table_name)
+
+            for column in table.__table__.columns:
+
+                if column.name.startswith('_') or (col_names is not None and column.name not in col_names):
+                    continue
+
+                lookup = mapper.relationships.get(column.name.capitalize())
+
+                if lookup is not None:
+                    lookup_table = lookup.mapper.class_
+
+                    if lookup_table not in joined:
+                        lookup_table = aliased(lookup_table, name=f'{column.name}_lookup')
+                        joins.append((lookup_table, getattr(table, column.name) == lookup_table.id))
+
+                    # The lookup tables have the id and the name as their only columns.
+                    name_column = [col.name for col in lookup.mapper.columns if col.name != 'id'][0]
+                    expression = getattr(lookup_table, name_column)
+
+                elif column.name.capitalize() in mapper.column_attrs:
+                    # Array columns, like the positions, are selected as the names of all their ids.
+                    expression = getattr(table, column.name.capitalize())
+
+                else:
+                    expression = getattr(table, column.name)
+
+                if f'_{column.name}High' in table.__table__.columns:
+                    ranges[len(expressions)] = len(expressions) + 1
+                    expressions.extend([expression, getattr(table, f'_{column.name}High')])
+                    layout.extend([(table_name, column.name), None])
+
+                else:
+                    expressions.append(expression)
+                    layout.append((table_name, column.name))
+
+        projection = (expressions, joins, Unpacker(layout, ranges))
+        self._projections[(columns, fields)] = projection
+
+        return projection
+
+    def _project_query(self, columns, shape, fields=None) -> Tuple[sqlalchemy.Select, Unpacker]:
+        """
+        Returns the query of `project` for a shape of filters and the `Unpacker` of its rows, see
+        `_projection`. Built once per column set, fields and shape, see `StatementCache`.
+        """
+
+        columns, fields = tuple(columns), self._fields_key(fields)
+
+        def build():
+            expressions, joins, unpack = self._projection(columns, fields)
+
+            results_query = self._query(expressions, self._filters(shape))
+
+            for lookup_table, onclause in joins:
+                results_query = results_query.join(lookup_table, onclause)
+
+            return results_query, unpack
+
+        return self.statements.statement(('project', columns, fields, shape), build)
+
+    def project(self,
+                pos: Iterable[str] | str = None,
+                mins: int = 0,
+                name: Iterable[str] | str = None,
+                division: Iterable[str] | str = None,
+                min_ca: int = 0,
+                eligible: str = None,
+                season: Iterable[str] | str = None,
+                attributes: Dict[str, int] = None,
+                columns = (Player, PlayerInfo,
+                           Ca, Contract, Stats, Attributes),
+                fields: Dict[str, Iterable[str]] = None,
+                progress: bool = False):
+        """
+        Retrieves player records from the database as plain values, already unpacked into their tables.
+
+        Takes the same arguments as `select`, but `columns` only takes tables of players, not lookup tables.
+        Instead of ORM objects the query selects the values of the columns, including the names of the
+        lookup ids, and each row is unpacked by an `Unpacker` built once per column set. Gives the same
+        tables as `Players.unpack_tables` of the rows of `select`, at a fraction of the cost.
+
+        Parameters:
+        ----------
+        fields : dict, optional
+            The columns to select of some of the tables, by table name, e.g. {'Stats': ['xa', 'npXg']}.
+            The other columns of these tables are neither selected nor unpacked, and a table given no
+            columns is left out. The other tables have all their columns. Default is None, all columns.
+        progress : bool, optional
+            If True, the progress bar shows the total number of rows estimated by the query planner, see `select`.
+            Default is False.
+
+        Yields:
+        -------
+        tuple
+            A tuple containing the player's unique ID and the columns and values of each table of the player,
+            by table name.
+
+        Raises:
+        ------
+        NoPlayerFoundError
+            If no players match the specified filtering criteria.
+        UnexpectedColumnNameError
+            If given an attribute name that is not a column of the attributes table.
+        """
+
+        shape, params = self._shape(pos, mins, name, division, min_ca, eligible, season, attributes)
+        results_query, unpack = self._project_query(columns, shape, fields)
+
+        rows = self._estimate_rows(results_query, params) if progress else None
+
+        # Executed as Core on a connection of its own, so that the rows are plain tuples and
+        # the transaction ends with the iteration.
+        with self.engine.connect() as connection:
+
+            results = connection.execute(results_query, params, execution_options={'yield_per': self.YIELD_PER})
+
+            row = next(results, None)
+
+            if row is None:
+                raise NoPlayerFoundError('No players found with the given filters.')
+
+            with tqdm(total=rows, desc='Processing rows') as pbar:
+
+                while row is not None:
+                    yield row[0], unpack(row)
+                    pbar.update()
+                    row = next(results, None)
+
+    def page(self,
+             pos: Iterable[str] | str = None,
+             mins: int = 0,
+             name: Iterable[str] | str = None,
+             division: Iterable[str] | str = None,
+             min_ca: int = 0,
+             eligible: str = None,
+             season: Iterable[str] | str = None,
+             attributes: Dict[str, int] = None,
+             columns = (Player, PlayerInfo,
+                        Ca, Contract, Stats, Attributes),
+             fields: Dict[str, Iterable[str]] = None,
+             size: int = 100,
+             after: str = None) -> Page:
+        """
+        Retrieves one page of the players of `project`, in the order of their ids.
+
+        Takes the same filters and fields as `project`. The page starts after the last player of the
+        previous page, given by its cursor, rather than at an offset, so the query reads only the rows
+        of the page through the primary key of the players however far the page is. Without concurrent
+        writes, no player is repeated or skipped. An ingest running meanwhile may commit players with
+        ids below the cursor of a page already returned, since `BulkInsert` reserves its ids before it
+        commits, and these players are skipped by the following pages.
+
+        Parameters:
+        ----------
+        size : int, optional
+            The maximum number of players of the page. Default is 100.
+        after : str, optional
+            The cursor of the page, i.e. `Page.after` of the previous page. Default is None,
+            which gives the first page.
+
+        Returns:
+        -------
+        Page
+            The players of the page and the cursor of the next page, None if it is the last.
+
+        Raises:
+        ------
+        NoPlayerFoundError
+            If no players match the specified filtering criteria.
+        UnexpectedColumnNameError
+            If given an attribute name that is not a column of the attributes table.
+        ValueError
+            If the size is not positive or the cursor is invalid.
+        """
+
+        if not isinstance(size, int) or size < 1:
+            raise ValueError(f'Expected argument `size` to be a positive int but got {size!r} instead.')
+
+        shape, params = self._shape(pos, mins, name, division, min_ca, eligible, season, attributes)
+
+        if after is not None:
+            params['after'] = decode_cursor(after)
+            shape += ('after',)
+
+        results_query, unpack = self._project_query(columns, shape, fields)
+
+        # The id is selected after the columns of the unpacker, and one more row than the page tells
+        # whether there is a next page.
+        results_query = self.statements.statement(('page', tuple(columns), self._fields_key(fields), shape),
+                                                  lambda: results_query.add_columns(Player._id).limit(bindparam('limit')))
+        params['limit'] = size + 1
+
+        # A page has at most `size` players, so it always runs as a prepared statement.
+        with self.engine.connect() as connection:
+            rows = connection.execute(results_query, params, execution_options={'prepare': True}).all()
+
+        if not rows and after is None:
             raise NoPlayerFoundError('No players found with the given filters.')
 
-        rows_of_one_player = []
-        row = next(results)
-        current_id = row.Player.uid
-        rows_of_one_player.append(row)
-        
-        # Iterate through all retrieved rows.
-        with tqdm(total=n_rows, desc='Processing rows') as pbar: 
-            
-            while row:
+        rows, more = rows[:size], len(rows) > size
 
-                try:
-                    row = next(results)
-                except StopIteration:
-                    yield row.Player.uid, rows_of_one_player
-                    break
-                
-                pbar.update()
-                
-                next_id = row.Player.uid
+        return Page([(row[0], unpack(row)) for row in rows],
+                    encode_cursor(rows[-1][-1]) if more else None)
+
+    def _frame_dtypes(self, columns) -> Dict[Tuple[str, str], np.dtype]:
+        """
+        Returns the dtypes of the numeric columns of `project_frame` by table name and column name.
+
+        Columns that can be null, and lookup ids, which are selected as names, are left out.
+        """
+
+        dtypes = {}
+
+        for table in columns:
+
+            table_name = table.__tablename__[0].upper() + table.__tablename__[1:]
+
+            for column in table.__table__.columns:
+
+                if column.name.startswith('_') or column.nullable or column.foreign_keys:
+                    continue
+
+                if isinstance(column.type, Float):
+                    dtypes[(table_name, column.name)] = np.float32
+                elif isinstance(column.type, SmallInteger):
+                    dtypes[(table_name, column.name)] = np.int16
+                elif isinstance(column.type, BigInteger):
+                    dtypes[(table_name, column.name)] = np.int64
+                elif isinstance(column.type, Integer):
+                    dtypes[(table_name, column.name)] = np.int32
+
+        return dtypes
+
+    def project_frame(self,
+                      pos: Iterable[str] | str = None,
+                      mins: int = 0,
+                      name: Iterable[str] | str = None,
+                      division: Iterable[str] | str = None,
+                      min_ca: int = 0,
+                      eligible: str = None,
+                      season: Iterable[str] | str = None,
+                      attributes: Dict[str, int] = None,
+                      columns = (Player, PlayerInfo,
+                                 Ca, Contract, Stats, Attributes),
+                      fields: Dict[str, Iterable[str]] = None) -> PlayerFrame:
+        """
+        Retrieves player records from the database as a `PlayerFrame`, with one array per column.
+
+        Takes the same arguments as `project` and gives the same players and values, but the rows
+        are turned into columns one batch of the server-side cursor at a time, with no dictionaries
+        per player.
+
+        Returns:
+        -------
+        PlayerFrame
+            The players matching the filters.
+
+        Raises:
+        ------
+        NoPlayerFoundError
+            If no players match the specified filtering criteria.
+        UnexpectedColumnNameError
+            If given an attribute name that is not a column of the attributes table.
+        """
+
+        shape, params = self._shape(pos, mins, name, division, min_ca, eligible, season, attributes)
+        results_query, unpack = self._project_query(columns, shape, fields)
+
+        with self.engine.connect() as connection:
+            results = connection.execute(results_query, params, execution_options={'yield_per': self.YIELD_PER})
+            frame = PlayerFrame.from_batches(results.partitions(), unpack.layout, unpack.ranges,
+                                             self._frame_dtypes(columns))
+
+        if not len(frame):
+            raise NoPlayerFoundError('No players found with the given filters.')
+
+        return frame
+
+    def _aggregate_query(self, shape, stats=None, percentiles=()) -> Tuple[sqlalchemy.Select, List[str]]:
+        """
+        Returns the query of `aggregate` for a shape of filters and the names of its stats, see `aggregate`.
+        Built once per shape, stats and percentiles, see `StatementCache`.
+        """
+
+        expected_stats = [column.name for column in Stats.__table__.columns if not column.name.startswith('_')]
+        stats = expected_stats if stats is None else list(stats)
+
+        unexpected_stats = [stat for stat in stats if stat not in expected_stats]
+
+        if unexpected_stats:
+            raise UnexpectedColumnNameError(f"Unexpected stat!\nExpected stats: {', '.join(expected_stats)},\n"
+                                            f"but found stats: {', '.join(unexpected_stats)}")
+
+        for percentile in percentiles:
+            if not 0 <= percentile <= 1:
+                raise ValueError(f'Expected percentiles between 0 and 1 but got {percentile} instead.')
+
+        def build():
+            expressions = [func.count()]
+
+            for stat in stats:
+                value = Stats.__table__.columns[stat]
+
+                expressions.extend([func.min(value), func.max(value), func.avg(value), func.stddev_samp(value)])
+                # Computed in double precision, but rounded back to the precision of the stats, so that
+                # a percentile that is the value of a player is that value, e.g. 12.55 and not 12.550000190734863.
+                expressions.extend(cast(func.percentile_cont(percentile).within_group(value), Float(16))
+                                   for percentile in percentiles)
+
+            # Only the tables of the filters are joined, and there is one row for the whole cohort.
+            return select(*expressions) \
+                   .select_from(Player) \
+                   .join(PlayerInfo, PlayerInfo._playerID == Player._id) \
+                   .join(Ca, Ca._playerID == Player._id) \
+                   .join(Attributes, Attributes._playerID == Player._id) \
+                   .join(Stats, Stats._playerID == Player._id) \
+                   .filter(self._filters(shape))
+
+        return self.statements.statement(('aggregate', shape, tuple(stats), percentiles), build), stats
+
+    def aggregate(self,
+                  pos: Iterable[str] | str = None,
+                  mins: int = 0,
+                  name: Iterable[str] | str = None,
+                  division: Iterable[str] | str = None,
+                  min_ca: int = 0,
+                  eligible: str = None,
+                  season: Iterable[str] | str = None,
+                  attributes: Dict[str, int] = None,
+                  stats: Iterable[str] = None,
+                  percentiles: Iterable[float] = ()) -> Aggregates:
+        """
+        Computes the minimum, maximum, average and standard deviation of stats over the players
+        matching the filters, in the database.
+
+        Takes the same filters as `select`. The stats are aggregated by a single query without
+        GROUP BY, so only one row is retrieved however many players there are, e.g. to compare a
+        player with a whole division.
+
+        The minimum, the maximum and the percentiles are given with the precision of the stats,
+        which are 4-byte floats, so e.g. the maximum is the value of a player exactly. The average
+        and the standard deviation are computed in double precision from the stored values, and
+        may differ from those of the decimals of the stats after about 7 significant digits.
+
+        Parameters:
+        ----------
+        stats : iterable of str, optional
+            The names of the stats to aggregate, in the order of the result. Default is None, all stats.
+        percentiles : iterable of float, optional
+            Fractions between 0 and 1 of which the continuous percentiles of each stat are also
+            computed, e.g. (0.25, 0.5, 0.75). Default is none.
+
+        Returns:
+        -------
+        Aggregates
+            The number of players and the aggregates of each stat.
+
+        Raises:
+        ------
+        NoPlayerFoundError
+            If no players match the specified filtering criteria.
+        UnexpectedColumnNameError
+            If given an attribute name or a stat name that is not a column of its table.
+        ValueError
+            If given a percentile that is not between 0 and 1.
+
+        Notes:
+        ------
+        - Each row of the players is counted, so a player of several seasons is counted once per season.
+        - The query is planned with the values of the filters each time, see below.
+        """
+
+        percentiles = tuple(percentiles)
+        shape, params = self._shape(pos, mins, name, division, min_ca, eligible, season, attributes)
+        results_query, stats = self._aggregate_query(shape, stats, percentiles)
+
+        # Not prepared, although it returns a single row: its cost is the scan of the cohort, whose best plan
+        # depends on how many players the values select. After a few small cohorts, a prepared statement
+        # would keep the generic plan for a large one too, and the planning is small next to the scan.
+        with self.engine.connect() as connection:
+            row = connection.execute(results_query, params).one()
+
+        if not row[0]:
+            raise NoPlayerFoundError('No players found with the given filters.')
+
+        return Aggregates.from_row(row, stats, percentiles)
+
+
+@event.listens_for(Base.metadata, 'after_drop')
+def _forget_checked_schema(target, connection, **kwargs) -> None:
+    """
+    Makes the next `Interact` of a database check its tables again after they have been dropped, e.g. by
+    `Interact.create`, and forgets the ids of the lookup tables.
+    """
 
-                # Yield the current rows if the next row is of a new player and start over.
-                if current_id != next_id:
-                    yield current_id, rows_of_one_player
-                    rows_of_one_player = []
-                    current_id = next_id
+    Interact._checked_schemas.discard(connection.engine.url.render_as_string(hide_password=False))
 
-                rows_of_one_player.append(row)
+    # The cached lookup ids are no longer valid once the lookup tables are dropped.
+    LookupCache.get(connection.engine).clear()
@@ -0,0 +1,176 @@
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+import sqlalchemy
+from sqlalchemy import event
+
+
+class StatementCache:
+    """
+    Cache of the statements of the queries of `Interact`, keyed by the shape of their filters.
+
+    The values of the filters are bound as parameters, so all queries of one shape, e.g. a
+    name and a season, share one statement, which SQLAlchemy builds and compiles once. The
+    statements are kept in a bounded LRU cache.
+
+    On PostgreSQL with psycopg2, the statements executed with the `prepare` execution option
+    are also prepared once per connection with PREPARE and run with EXECUTE, so the server parses
+    and analyzes each shape once instead of once per query. The plans are left to the default plan
+    cache mode of the server, which plans the first executions with their values and then keeps a
+    generic plan, which does not depend on the values, when it is not estimated to be worse than
+    those. Since the generic plan is then used for all values, only queries of a bounded number of
+    rows, such as the pages of `Interact.page`, should be prepared. Statements streamed from a
+    server-side cursor cannot be prepared, and are planned with their values each time as before.
+
+    There is one cache per database and process, retrieved with `StatementCache.get`.
+
+    Attributes
+    ----------
+    hits : int
+        The number of statements retrieved from the cache.
+    misses : int
+        The number of statements that had to be built.
+    """
+
+    # The parameters of psycopg2, e.g. %(name)s.
+    PARAMETER = re.compile(r'%\((\w+)\)s')
+
+    _caches: Dict[str, 'StatementCache'] = {}
+
+    def __init__(self,
+                 engine: sqlalchemy.engine.Engine,
+                 maxsize: int = 256) -> None:
+        self.engine = engine
+        self.maxsize = maxsize
+        self._statements: OrderedDict[tuple, Any] = OrderedDict()
+        self._compiled: Dict[Any, sqlalchemy.engine.Compiled] = {}
+        self._prepared: Dict[str, Tuple[str, str, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get(cls, engine: sqlalchemy.engine.Engine) -> 'StatementCache':
+        """
+        Returns the cache of the database the engine is connected to, creating it if needed.
+
+        Creating the cache of a psycopg2 engine makes the executions of the engine with the
+        `prepare` option run prepared statements.
+        """
+
+        key = engine.url.render_as_string(hide_password=False)
+
+        if key not in cls._caches:
+            cls._caches[key] = cls(engine)
+
+            if engine.dialect.driver == 'psycopg2':
+                event.listen(engine, 'before_cursor_execute', cls._caches[key]._execute_prepared, retval=True)
+
+        return cls._caches[key]
+
+    def statement(self,
+                  key: tuple,
+                  build: Callable[[], Any]) -> Any:
+        """
+        Returns the statement of a shape of query, building it with `build` if it is not cached.
+
+        Args:
+            key (tuple): The kind of query and the shape of its filters and columns.
+            build (Callable): Builds the statement of the shape.
+
+        Returns:
+            The statement, or whatever `build` returns, e.g. the statement and its `Unpacker`.
+        """
+
+        try:
+            statement = self._statements[key]
+            self._statements.move_to_end(key)
+            self.hits += 1
+            return statement
+
+        except KeyError:
+            self.misses += 1
+
+        statement = build()
+
+        self._statements[key] = statement
+        if len(self._statements) > self.maxsize:
+            self._statements.popitem(last=False)
+
+        return statement
+
+    def compiled(self, statement: sqlalchemy.Select) -> sqlalchemy.engine.Compiled:
+        """Returns the statement compiled for the dialect of the engine, compiling it once per statement."""
+
+        compiled = self._compiled.get(statement)
+
+        if compiled is None:
+            compiled = statement.compile(dialect=self.engine.dialect,
+                                         compile_kwargs={'render_postcompile': True})
+
+            if len(self._compiled) >= self.maxsize:
+                self._compiled.clear()
+            self._compiled[statement] = compiled
+
+        return compiled
+
+    def clear(self) -> None:
+        """Empties the cache. The statements already prepared on the connections are kept."""
+
+        self._statements.clear()
+        self._compiled.clear()
+        self._prepared.clear()
+
+    def _prepare(self, statement: str) -> Tuple[str, str, str]:
+        """
+        Returns the name of the prepared statement of the SQL of a query, the PREPARE of it
+        and the EXECUTE of it, with the same psycopg2 parameters as the query.
+        """
+
+        prepared = self._prepared.get(statement)
+
+        if prepared is not None:
+            return prepared
+
+        parameters = list(dict.fromkeys(self.PARAMETER.findall(statement)))
+        positions = {parameter: f'${i}' for i, parameter in enumerate(parameters, start=1)}
+
+        name = f'scouting_{hashlib.md5(statement.encode()).hexdigest()[:16]}'
+        # The PREPARE is run without parameters, so the percent signs are no longer escaped.
+        body = self.PARAMETER.sub(lambda match: positions[match.group(1)], statement).replace('%%', '%')
+        arguments = ', '.join(f'%({parameter})s' for parameter in parameters)
+
+        prepared = (name,
+                    f'PREPARE {name} AS {body}',
+                    f'EXECUTE {name}({arguments})' if parameters else f'EXECUTE {name}')
+
+        if len(self._prepared) >= self.maxsize:
+            self._prepared.clear()
+        self._prepared[statement] = prepared
+
+        return prepared
+
+    def _execute_prepared(self, connection, cursor, statement, parameters, context, executemany):
+        """
+        Replaces the SQL of the executions with the `prepare` option by the EXECUTE of its prepared
+        statement, preparing it first if the connection has not yet.
+        """
+
+        if (context is None or executemany or not isinstance(parameters, dict)
+                or not context.execution_options.get('prepare')):
+            return statement, parameters
+
+        name, prepare, execute = self._prepare(statement)
+
+        # The names of the statements prepared on the DBAPI connection, kept as long as it is open.
+        prepared = connection.info.setdefault('prepared_statements', set())
+
+        if name not in prepared:
+            if len(prepared) >= self.maxsize:
+                cursor.execute('DEALLOCATE ALL')
+                prepared.clear()
+
+            cursor.execute(prepare)
+            prepared.add(name)
+
+        return execute, parameters
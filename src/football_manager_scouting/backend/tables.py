@@ -1,9 +1,10 @@
 import sqlalchemy as sql
 import sqlalchemy.orm as orm
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Float
+from sqlalchemy import String, Integer, SmallInteger, Float, JSON, select, func, any_
 from sqlalchemy.types import BigInteger
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
 
 
 class Base(orm.DeclarativeBase):
@@ -13,6 +14,9 @@ class Base(orm.DeclarativeBase):
 class Player(Base):
 
     __tablename__ = 'player'
+    __table_args__ = (sql.UniqueConstraint('uid', 'season'),
+                      sql.Index('ix_player_season', 'season'),
+                      sql.Index('ix_player_name', 'name'))
 
     PlayerInfo: Mapped[List['PlayerInfo']] = relationship('PlayerInfo', back_populates='_player')
     Stats: Mapped[List['Stats']]           = relationship('Stats', back_populates='_player')
@@ -25,14 +29,21 @@ class Player(Base):
     name: Mapped[str]   = mapped_column(String(50))
     uid: Mapped[str]    = mapped_column(String(50))
     season: Mapped[str] = mapped_column(String(20))
+
+    _checksum: Mapped[Optional[str]] = mapped_column(String(32))
     
 
 class PlayerInfo(Base):
 
     __tablename__ = 'playerInfo'
+    # Filtering on positions tests the array for overlap, which a GIN index supports.
+    __table_args__ = (sql.Index('ix_playerInfo_position', 'position', postgresql_using='gin'),
+                      sql.Index('ix_playerInfo_division_mins', 'division', 'mins'),
+                      sql.Index('ix_playerInfo_mins', 'mins'))
 
     age: Mapped[int]       = mapped_column(Integer)
-    position: Mapped[int]  = mapped_column(Integer, sql.ForeignKey('position.id'))
+    # The ids of all positions of the player. JSON on SQLite, which has no arrays.
+    position: Mapped[List[int]] = mapped_column(ARRAY(Integer).with_variant(JSON, 'sqlite'))
     rightfoot: Mapped[int] = mapped_column(Integer, sql.ForeignKey('foot.id'))
     leftfoot: Mapped[int]  = mapped_column(Integer, sql.ForeignKey('foot.id'))
     mins: Mapped[int]      = mapped_column(Integer)
@@ -43,7 +54,6 @@ class PlayerInfo(Base):
 
     _player: Mapped['Player']      = relationship('Player', back_populates='PlayerInfo')
     
-    Position: Mapped['Position']   = relationship('Position', back_populates='_playerInfo')
     Rightfoot: Mapped['Foot']      = relationship('Foot', foreign_keys=[rightfoot], back_populates='_rightFootStrength')
     Leftfoot: Mapped['Foot']       = relationship('Foot', foreign_keys=[leftfoot], back_populates='_leftFootStrength')
     Division: Mapped['Division']   = relationship('Division', back_populates='_playerInfo')
@@ -54,16 +64,26 @@ class PlayerInfo(Base):
     
     
     _id: Mapped[int]       = mapped_column(primary_key=True, autoincrement=True)
-    _playerID: Mapped[int] = mapped_column(Integer, sql.ForeignKey('player._id'))
+    _playerID: Mapped[int] = mapped_column(Integer, sql.ForeignKey('player._id'), index=True)
 
 
 class Position(Base):
     
     __tablename__ = 'position'
     
-    _playerInfo: Mapped['PlayerInfo'] = relationship('PlayerInfo')
     id: Mapped[int]       = mapped_column(primary_key=True, autoincrement=True)
     position: Mapped[str] = mapped_column(String(100))
+
+
+# The names of the positions of a player, in the same order as their ids. Loaded together with
+# the player info, in place of a relationship since an array of ids cannot be a foreign key.
+PlayerInfo.Position = orm.column_property(
+    select(func.array_agg(aggregate_order_by(Position.position,
+                                             func.array_position(PlayerInfo.position, Position.id))))
+    .where(Position.id == any_(PlayerInfo.position))
+    .correlate_except(Position)
+    .scalar_subquery()
+)
     
 
 class Nat(Base):
@@ -119,7 +139,7 @@ class Stats(Base):
     __tablename__ = 'stats'
 
     _id: Mapped[int]          = mapped_column(primary_key=True, autoincrement=True)
-    _playerID: Mapped[int]    = mapped_column(Integer, sql.ForeignKey('player._id'))
+    _playerID: Mapped[int]    = mapped_column(Integer, sql.ForeignKey('player._id'), index=True)
     _player: Mapped['Player'] = relationship('Player', back_populates='Stats')
 
     aerA: Mapped[float]          = mapped_column(Float(16))
@@ -154,63 +174,114 @@ class Attributes(Base):
     _player: Mapped['Player'] = relationship('Player', back_populates='Attributes')
 
     _id: Mapped[int]          = mapped_column(primary_key=True, autoincrement=True)
-    _playerID: Mapped[int]    = mapped_column(Integer, sql.ForeignKey('player._id'))
-
-    cor: Mapped[str]       = mapped_column(String(5))
-    cro: Mapped[str]       = mapped_column(String(5))
-    dri: Mapped[str]       = mapped_column(String(5))
-    fin: Mapped[str]       = mapped_column(String(5))
-    fir: Mapped[str]       = mapped_column(String(5))
-    fre: Mapped[str]       = mapped_column(String(5))
-    hea: Mapped[str]       = mapped_column(String(5))
-    lon: Mapped[str]       = mapped_column(String(5))
-    lth: Mapped[str]       = mapped_column(String(5))
-    mar: Mapped[str]       = mapped_column(String(5))
-    pas: Mapped[str]       = mapped_column(String(5))
-    pen: Mapped[str]       = mapped_column(String(5))
-    tck: Mapped[str]       = mapped_column(String(5))
-    tec: Mapped[str]       = mapped_column(String(5))
-    agg: Mapped[str]       = mapped_column(String(5))
-    ant: Mapped[str]       = mapped_column(String(5))
-    bra: Mapped[str]       = mapped_column(String(5))
-    cmp: Mapped[str]       = mapped_column(String(5))
-    cnt: Mapped[str]       = mapped_column(String(5))
-    decisions: Mapped[str] = mapped_column(String(5))
-    det: Mapped[str]       = mapped_column(String(5))
-    fla: Mapped[str]       = mapped_column(String(5))
-    ldr: Mapped[str]       = mapped_column(String(5))
-    otb: Mapped[str]       = mapped_column(String(5))
-    pos: Mapped[str]       = mapped_column(String(5))
-    tea: Mapped[str]       = mapped_column(String(5))
-    vis: Mapped[str]       = mapped_column(String(5))
-    wor: Mapped[str]       = mapped_column(String(5))
-    acc: Mapped[str]       = mapped_column(String(5))
-    agi: Mapped[str]       = mapped_column(String(5))
-    bal: Mapped[str]       = mapped_column(String(5))
-    jum: Mapped[str]       = mapped_column(String(5))
-    natF: Mapped[str]      = mapped_column(String(5))
-    pac: Mapped[str]       = mapped_column(String(5))
-    sta: Mapped[str]       = mapped_column(String(5))
-    strength: Mapped[str]  = mapped_column(String(5))
-    aer: Mapped[str]       = mapped_column(String(5))
-    cmd: Mapped[str]       = mapped_column(String(5))
-    com: Mapped[str]       = mapped_column(String(5))
-    ecc: Mapped[str]       = mapped_column(String(5))
-    han: Mapped[str]       = mapped_column(String(5))
-    kic: Mapped[str]       = mapped_column(String(5))
-    oneVsOne: Mapped[str]  = mapped_column(String(5))
-    pun: Mapped[str]       = mapped_column(String(5))
-    ref: Mapped[str]       = mapped_column(String(5))
-    tro: Mapped[str]       = mapped_column(String(5))
-    thr: Mapped[str]       = mapped_column(String(5))
+    _playerID: Mapped[int]    = mapped_column(Integer, sql.ForeignKey('player._id'), index=True)
+
+    # Each attribute is stored as the low and the high end of its range, since FM only shows
+    # a range like 12-15 for players that are not fully scouted. Both are the same for a known
+    # attribute and NULL for an unknown one.
+    cor: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _corHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    cro: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _croHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    dri: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _driHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    fin: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _finHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    fir: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _firHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    fre: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _freHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    hea: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _heaHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    lon: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _lonHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    lth: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _lthHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    mar: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _marHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    pas: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _pasHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    pen: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _penHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    tck: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _tckHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    tec: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _tecHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    agg: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _aggHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    ant: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _antHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    bra: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _braHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    cmp: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _cmpHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    cnt: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _cntHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    decisions: Mapped[Optional[int]]      = mapped_column(SmallInteger)
+    _decisionsHigh: Mapped[Optional[int]] = mapped_column(SmallInteger)
+    det: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _detHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    fla: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _flaHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    ldr: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _ldrHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    otb: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _otbHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    pos: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _posHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    tea: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _teaHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    vis: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _visHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    wor: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _worHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    acc: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _accHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    agi: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _agiHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    bal: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _balHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    jum: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _jumHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    natF: Mapped[Optional[int]]           = mapped_column(SmallInteger)
+    _natFHigh: Mapped[Optional[int]]      = mapped_column(SmallInteger)
+    pac: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _pacHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    sta: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _staHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    strength: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    _strengthHigh: Mapped[Optional[int]]  = mapped_column(SmallInteger)
+    aer: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _aerHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    cmd: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _cmdHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    com: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _comHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    ecc: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _eccHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    han: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _hanHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    kic: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _kicHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    oneVsOne: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    _oneVsOneHigh: Mapped[Optional[int]]  = mapped_column(SmallInteger)
+    pun: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _punHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    ref: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _refHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    tro: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _troHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
+    thr: Mapped[Optional[int]]            = mapped_column(SmallInteger)
+    _thrHigh: Mapped[Optional[int]]       = mapped_column(SmallInteger)
 
 
 class Ca(Base):
 
     __tablename__ = 'ca'
+    __table_args__ = (sql.Index('ix_ca_ca', 'ca'),)
 
     _id: Mapped[int]          = mapped_column(primary_key=True, autoincrement=True)
-    _playerID: Mapped[int]    = mapped_column(Integer, sql.ForeignKey('player._id'))
+    _playerID: Mapped[int]    = mapped_column(Integer, sql.ForeignKey('player._id'), index=True)
     _player: Mapped['Player'] = relationship('Player', back_populates='Ca')
 
     ca: Mapped[int] = mapped_column(Integer)
@@ -221,7 +292,7 @@ class Contract(Base):
     __tablename__ = 'contract'
 
     _id: Mapped[int]          = mapped_column(primary_key=True, autoincrement=True)
-    _playerID: Mapped[int]    = mapped_column(Integer, sql.ForeignKey('player._id'))
+    _playerID: Mapped[int]    = mapped_column(Integer, sql.ForeignKey('player._id'), index=True)
     _player: Mapped['Player'] = relationship('Player', back_populates='Contract')
     
     beginDate: Mapped[int]        = mapped_column(Integer) 
@@ -230,3 +301,21 @@ class Contract(Base):
     wage: Mapped[int]             = mapped_column(BigInteger)
     value: Mapped[int]            = mapped_column(BigInteger)
     releaseClauseFee: Mapped[int] = mapped_column(BigInteger)
+
+
+class Checkpoint(Base):
+
+    __tablename__ = 'checkpoint'
+
+    fingerprint: Mapped[str] = mapped_column(String(64), primary_key=True)
+    season: Mapped[str]      = mapped_column(String(20), primary_key=True)
+    offset: Mapped[int]      = mapped_column(BigInteger)
+
+
+class SeasonVersion(Base):
+
+    __tablename__ = 'seasonVersion'
+
+    # A new random stamp each time the players of the season are written, see `QueryCache`.
+    season: Mapped[str]  = mapped_column(String(20), primary_key=True)
+    version: Mapped[str] = mapped_column(String(32))
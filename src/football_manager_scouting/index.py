@@ -1,8 +1,12 @@
 from football_manager_scouting.category_mappings.categories import STATS, ATTRIBUTES
-from football_manager_scouting.backend.score import Score
+from football_manager_scouting.backend.score import Score, Moments
 from football_manager_scouting.backend.request_data import Request
+from football_manager_scouting.backend.tables import Player, Stats, Attributes
+from collections import Counter
+from itertools import islice
 import csv
-from typing import Dict, Iterable
+import numpy as np
+from typing import Dict, Iterable, Iterator, List
 
 
 def _create_index(data, header, file) -> None:
@@ -16,9 +20,8 @@ def _create_index(data, header, file) -> None:
 
     Parameters
     ----------
-    data : dict
-        A dictionary where each key is a player identifier and each value 
-        contains the player's statistics and information.
+    data : PlayerFrame
+        The players, with one array per column of each table.
     header : list
         A list of column headers to include in the CSV file.
     file : str
@@ -30,76 +33,191 @@ def _create_index(data, header, file) -> None:
         The function does not return any value but writes the output to a file.
     """
     
-    stats = [list(entry['Stats'].values()) for entry in data.values()]
-    score = Score(all_stats=[*stats])
+    stats = data.values('Stats')
+    score = Score(all_stats=stats)
+    weighted, totals = score.scores(stats)
+    weighted, totals = weighted.tolist(), totals.tolist()
+
+    columns = {table_name: data.tolists(table_name) for table_name in data.tables if table_name != 'Stats'}
+
+    player_info = columns['PlayerInfo']
+    player_info['mins'] = [round(mins/90, 2) for mins in player_info['mins']]
+    player_info['position'] = [' '.join(position) if isinstance(position, (tuple, list)) else position
+                               for position in player_info['position']]
 
     with open(file, 'w', encoding='utf-8', newline='') as outf:
         
         writer = csv.writer(outf, delimiter=',')
         writer.writerow(['Score'] + header)
         
-        for player_data in data.values():
-            player_data['PlayerInfo']['mins'] = round(player_data['PlayerInfo']['mins']/90, 2)
-            player_data['PlayerInfo']['position'] = ' '.join(player_data['PlayerInfo']['position']) \
-                                                    if isinstance(player_data['PlayerInfo']['position'], (tuple, list)) \
-                                                    else player_data['PlayerInfo']['position']
+        for i in range(len(data)):
             row = [0]
 
-            for cat, vals in player_data.items():
+            for cat in data.tables:
                 if cat == 'Stats':
-                    scores = score(vals.values())
-                    row.extend(scores)
-                    row[0] = sum(scores)
+                    row.extend(weighted[i])
+                    row[0] = totals[i]
                 else:
-                    row.extend(list(vals.values()))
+                    row.extend([vals[i] for vals in columns[cat].values()])
         
             writer.writerow(row)
 
 
-def _postprocess(data, cats):
+def _chunks(players: Iterator[dict]) -> Iterator[List[dict]]:
+    """Splits the players of `Request.iterator` into lists of at most `Score.CHUNK` players."""
+
+    while chunk := list(islice(players, Score.CHUNK)):
+        yield chunk
+
+
+def _rows_per_uid(request, filter) -> Counter:
+    """
+    Returns the number of rows of each uid of the players of a filter, e.g. one per season,
+    retrieving only the columns of the players table.
+    """
+
+    return Counter(tables['Player']['uid'] for tables in
+                   request.iterator({**filter, 'columns': (Player,), 'fields': None}))
+
+
+def _last_rows(players: Iterator[dict], rows: Counter) -> Iterator[dict]:
+    """
+    Yields only the last row of each uid of the players of `Request.iterator`, as kept by
+    `Request.fetch_all`, counting down the rows of each uid left to come in `rows`.
+    """
+
+    for tables in players:
+        uid = tables['Player']['uid']
+        rows[uid] -= 1
+
+        if not rows[uid]:
+            yield tables
+
+
+def _stats(players: List[dict]) -> np.ndarray:
+    """Returns the stats of the players as a 2-D array, one row per player."""
+
+    return np.array([list(tables['Stats'].values()) for tables in players],
+                    dtype=np.float64).reshape(len(players), len(players[0]['Stats']))
+
+
+def _stream_index(request, filter, file) -> None:
+    """
+    Scores players based on their statistics and writes the results to a CSV file,
+    without loading all players at once.
+
+    The players are streamed from the database twice, one chunk at a time. The first
+    pass accumulates the `Moments` of their statistics, and the second scores them and
+    writes their rows, so the memory used does not depend on the number of players,
+    apart from a count of the rows of each uid. As in `_create_index`, a player with
+    several rows, e.g. one per season of a filter of several seasons, is only scored
+    and written once, with the last of them. The rows are those of `_create_index`,
+    in the order of the last row of each player, but a score may rarely differ by a
+    hundredth, see `Score.from_moments`.
+
+    Parameters
+    ----------
+    request : Request
+        The request the players are retrieved with.
+    filter : dict
+        The filters of the players, see `Request.iterator`.
+    file : str
+        The name of the CSV file to write the player scores to.
+
+    Returns
+    -------
+    None
+        The function does not return any value but writes the output to a file.
+    """
+
+    rows = _rows_per_uid(request, filter)
+
+    moments = None
+
+    for players in _chunks(_last_rows(request.iterator(filter), rows.copy())):
+        stats = _stats(players)
+
+        if moments is None:
+            moments = Moments(stats.shape[1])
+        moments.update(stats)
+
+    score = Score.from_moments(moments)
+
+    with open(file, 'w', encoding='utf-8', newline='') as outf:
+
+        writer = csv.writer(outf, delimiter=',')
+
+        for n, players in enumerate(_chunks(_last_rows(request.iterator(filter), rows.copy()))):
+            if not n:
+                writer.writerow(['Score'] + _header(players[0]))
+
+            weighted, totals = score.scores(_stats(players))
+
+            for tables, player_weighted, total in zip(players, weighted.tolist(), totals.tolist()):
+                player_info = tables['PlayerInfo']
+                player_info['mins'] = round(player_info['mins']/90, 2)
+                player_info['position'] = (' '.join(player_info['position'])
+                                           if isinstance(player_info['position'], (tuple, list))
+                                           else player_info['position'])
+
+                row = [total]
+
+                for cat, columns in tables.items():
+                    row.extend(player_weighted if cat == 'Stats' else columns.values())
+
+                writer.writerow(row)
+
+
+def _fields(category: str) -> Dict[str, list]:
+    """
+    Returns the columns of the stats and attributes tables in a category, for the `fields`
+    of the query, so that the columns of other categories are never retrieved.
+
+    Names of the category that are not columns of the tables are left out.
+
+    Parameters
+    ----------
+    category : str
+        The category, one of the keys of categories.STATS.
+
+    Returns
+    -------
+    dict
+        The names of the columns to select by table name.
     """
-    Processes player data by filtering out unwanted statistics and generating a header.
 
-    This function removes unwanted statistics from the player data based on the 
-    specified categories and constructs a header list for the remaining data. 
-    It uses helper functions to filter out unwanted categories and generate the 
-    final header.
+    return {'Stats': [stat for stat in STATS[category] if stat in Stats.__table__.columns],
+            'Attributes': [attribute for attribute in ATTRIBUTES[category] if attribute in Attributes.__table__.columns]}
+
+
+def _postprocess(data):
+    """
+    Generates the header of the player data.
+
+    The header has the columns of each table of the player data, in order,
+    with the minutes shown as 90s.
 
     Parameters
     ----------
-    data : dict
-        A dictionary containing player data, where each key is a player identifier 
-        and each value contains statistics and other information.
-    cats : dict
-        A dictionary specifying the categories to retain in the player data.
+    data : PlayerFrame
+        The players, with one array per column of each table.
 
     Returns
     -------
     tuple
         A tuple containing two elements:
-        - dict: The processed player data with unwanted statistics removed.
-        - list: The generated header list reflecting the retained statistics.
+        - PlayerFrame: The player data.
+        - list: The generated header list.
     """
-    
-    def remove_unwanted_data(data, filter_cats):
-        for uid, records in data.items():
-            for cat in filter_cats:
-                data[uid][cat] = {key:val for key, val in records[cat].items()
-                                  if key in filter_cats[cat]}
-        return data
-
-    def get_header(data):
-        header = []
-        for entry in data.values():
-            for table_name in entry.values():
-                header.extend(list(table_name.keys()))
-            return header
-
-    data = remove_unwanted_data(data, cats)
-    header = [header if header != 'mins' else '90s' 
-              for header in get_header(data)]
-    
-    return data, header
+
+    return data, _header(data.tables)
+
+
+def _header(tables: Dict[str, Iterable[str]]) -> List[str]:
+    """Returns the header of the columns of the tables, in order, with the minutes shown as 90s."""
+
+    return [header if header != 'mins' else '90s'
+            for columns in tables.values() for header in columns]
 
 
 def create_index(db_login: Dict[str, str],
@@ -108,7 +226,8 @@ def create_index(db_login: Dict[str, str],
                  position: str | Iterable[str] = None,
                  mins: int = 0,
                  division: str | Iterable[str] = None,
-                 file: str = None) -> None:
+                 file: str = None,
+                 stream: bool = False) -> None:
     """
     Creates an index of FM players specifying how each player compares to the
     other players based on the statistics of each player.
@@ -129,6 +248,9 @@ def create_index(db_login: Dict[str, str],
         season (str): Seasons to filter players by.
         file (str, optional): The file name that the filtered data should be written to. Default (None)
             a CSV file named after the category.
+        stream (bool, optional): If True, the players are streamed from the database twice, one chunk
+            at a time, instead of loaded at once, so that the memory used does not depend on the number
+            of players. A score may then rarely differ by a hundredth. Default is False.
     Returns:
         None: Writes the filtered player data to a CSV file.
 
@@ -150,17 +272,22 @@ def create_index(db_login: Dict[str, str],
     
     division = [division] if isinstance(division, str) else division
     
-    filter = {'pos': position, 'mins': mins, 'division': division, 'season': season}
+    # Only the columns of the category are selected.
+    filter = {'pos': position, 'mins': mins, 'division': division, 'season': season,
+              'fields': _fields(category)}
     
-    data = request.fetch_all(filter=filter)
-    
-    cats = {'Stats': set(STATS[category]),
-            'Attributes': set(ATTRIBUTES[category])}
-    
-    data, header = _postprocess(data, cats)
-    
-    print('Creating player index...')
-    
-    _create_index(data, header, file)
+    if stream:
+        print('Creating player index...')
+
+        _stream_index(request, filter, file)
+
+    else:
+        data = request.fetch_all(filter=filter, frame=True)
+
+        data, header = _postprocess(data)
+
+        print('Creating player index...')
+
+        _create_index(data, header, file)
 
     print(f'Finished! Data saved to file {file}')
@@ -1,6 +1,9 @@
 from typing import Dict
 from football_manager_scouting.backend.preprocess_data import Preprocess
 from football_manager_scouting.backend.server import Interact, Setup
+from football_manager_scouting.backend.bulk_insert import BulkInsert
+from football_manager_scouting.backend.checkpoint import fingerprint, load_checkpoint
+from football_manager_scouting.backend.pipeline import Pipeline
 from tqdm import tqdm
 
 def insert_data_to_database(
@@ -8,7 +11,13 @@ def insert_data_to_database(
                     path: str,
                     season: str,
                     total: int = None,
-                    n: int = 50000) -> None:
+                    n: int = 50000,
+                    bulk: bool = False,
+                    workers: int = None,
+                    resume: bool = True,
+                    incremental: bool = False,
+                    pipeline: bool = False,
+                    batch_size: int = 1000) -> None:
     """
     Inserts the data of an RTF file generated from Football Manager into a database.
     
@@ -35,40 +44,129 @@ def insert_data_to_database(
         After how many entries should commits be done. For a high number of inserts it is
         recommended to commit several times rather than one big final commit. If None will
         perform one commit after all entries have been inserted.
+    bulk : bool, optional
+        If True, streams the entries to the database with PostgreSQL's `COPY FROM STDIN`
+        instead of inserting them through the ORM. Much faster for large files. Default is False.
+    workers : int, optional
+        The number of processes used to parse the file. If None or 1 the file is parsed
+        in this process.
+    resume : bool, optional
+        If True, continues from the checkpoint of the last commit if an earlier ingest of the same
+        file for the season was interrupted. A finished ingest leaves no checkpoint. Default is True.
+    incremental : bool, optional
+        If True, only writes the players that are new or have changed since the season was last
+        inserted, e.g. when refreshing the data with a new export of the same save. Unchanged
+        players are skipped. Default is False.
+    pipeline : bool, optional
+        If True, parses the file in a background thread while the entries are written to the
+        database, with a bounded queue of batches in between. The throughput of each stage is
+        printed at the end to show which one is the bottleneck. Default is False.
+    batch_size : int, optional
+        The number of entries in each batch passed from the parser to the writer when `pipeline`
+        is True. Default is 1000.
 
     Notes:
     ------
     - Initializes a `Preprocess` instance for handling RTF file data based on the specified season.
     - Uses the `tqdm` library to display progress for each entry insertion.
-    - The `source_connection.insert` method is called for each entry, passing tables, player data, and lookup tables.
-    - Commits either for every n entry or after all entries have been inserted.
+    - The `upsert` method of either `Interact` or `BulkInsert` is called for each entry, passing tables and player data.
+      A player that already exists for the season, identified by its `uid`, is replaced rather than duplicated.
+    - A checksum of the tables of each player is stored with the player. In incremental mode the
+      checksums of the season are loaded first and the players with an unchanged checksum are skipped.
+    - Commits either for every n entry or after all entries have been inserted. Each commit saves a checkpoint
+      with the fingerprint of the file and the byte offset of the last committed line in the same transaction.
+      The final commit deletes the checkpoint, so that only an ingest that did not finish is resumed.
+    - Each commit also gives the season a new version stamp in the same transaction, so that the queries
+      of its players cached by `Request.fetch_all` are run again, even if the ingest does not finish.
     """
 
     engine = Setup.create_engine(**db_login)
     interact = Interact(engine)
+    writer = BulkInsert(engine) if bulk else interact
 
     args = {'season': season}
     args.update(db_login)
     process = Preprocess(**args)
 
+    file_fingerprint = fingerprint(path)
+    offset = load_checkpoint(engine, file_fingerprint, str(season)) if resume else None
+
+    if offset:
+        print(f'Resuming from checkpoint at byte {offset}...')
+    else:
+        offset = 0
+
     print('Inserting entries...')
 
-    read_rtf_file = process.read_rtf_file
-    insert = interact.insert
-    commit = interact.commit
+    if workers is not None and workers > 1:
+        entries = process.read_rtf_file_parallel(path, offset=offset, workers=workers)
+    else:
+        entries = process.read_rtf_file(path, offset=offset)
+
+    insert = writer.upsert
+    commit = writer.commit
+    checkpoint = writer.checkpoint
+    clear_checkpoint = writer.clear_checkpoint
+    # Invalidates the cached queries of the season with each commit, see `QueryCache`.
+    bump_season_version = writer.bump_season_version
+
+    checksums = interact.get_checksums(season) if incremental else {}
+    skipped = 0
+
+    def parse():
+        """The parser stage. Yields each entry with its checksum and the offset of the end of its line."""
+
+        for tables in entries:
+            yield tables, process.checksum(tables), process.offset
 
     count = 0
-    for tables in tqdm(read_rtf_file(path), desc='Entry', total=total):
-        _tables = tables.copy()
+    progress = tqdm(desc='Entry', total=total)
+
+    def write(batch):
+        """The writer stage. Inserts a batch of entries and commits for every n entry."""
+
+        nonlocal count, skipped
 
-        player = _tables['Player']
-        del _tables['Player']
+        for tables, checksum, offset in batch:
+            _tables = tables.copy()
 
-        insert(tables=_tables, player_table=player)        
+            player = _tables['Player']
+            del _tables['Player']
 
-        if n is not None and count % n == 0 and count != 0:
-            commit(verbose=True)
+            if checksums.get(player['uid']) == checksum:
+                skipped += 1
+            else:
+                insert(tables=_tables, player_table={**player, '_checksum': checksum})
 
-        count += 1
+            if n is not None and count % n == 0 and count != 0:
+                checkpoint(file_fingerprint, str(season), offset)
+                bump_season_version(season)
+                commit(verbose=True)
 
+            count += 1
+
+        progress.update(len(batch))
+
+    if pipeline:
+        stages = Pipeline(batch_size=batch_size)
+        stages.run(parse(), write)
+    else:
+        for entry in parse():
+            write([entry])
+
+    progress.close()
+
+    # The whole file is inserted, so a later ingest of it starts over rather than resuming at its end.
+    clear_checkpoint(file_fingerprint, str(season))
+    bump_season_version(season)
     commit(verbose=True)
+
+    if pipeline:
+        print(stages.report())
+
+    if incremental:
+        print(f'Skipped {skipped} unchanged of {count} entries.')
+
+    lookup_cache = process.lookup_cache
+    print(f'Lookup cache hit rate: {lookup_cache.hit_rate:.1%} '
+          f'({lookup_cache.hits} hits, {lookup_cache.misses} misses)')
@@ -0,0 +1,115 @@
+from football_manager_scouting.backend.server import Setup, Interact
+from football_manager_scouting.backend.tables import Player, PlayerInfo, Division
+from football_manager_scouting.backend.schema import migrate_schema
+from sqlalchemy import select, func
+from typing import Dict, List
+
+
+def _standard_shapes(interact: Interact) -> Dict[str, dict]:
+    """
+    Returns the filters of the standard shapes of `select`, as used by index and spider.
+
+    The values are taken from the database so that the plans are realistic: the latest season
+    and the division and name of one of its players.
+    """
+
+    with interact.engine.connect() as connection:
+        season = connection.execute(select(func.max(Player.season))).scalar()
+        name, division = connection.execute(select(Player.name, Division.division)
+                                            .join(PlayerInfo, PlayerInfo._playerID == Player._id)
+                                            .join(Division, PlayerInfo.division == Division.id)
+                                            .where(Player.season == season)
+                                            .limit(1)).one()
+
+    return {
+        'season': {'season': season},
+        'season, position and minutes (index)': {'season': season, 'pos': ['DC'], 'mins': 500},
+        'season, position, minutes and division (spider)': {'season': season, 'pos': ['DC'], 'mins': 500,
+                                                            'division': [division]},
+        'name (spider)': {'name': name},
+        'season and current ability': {'season': season, 'min_ca': 120},
+        'season and attributes': {'season': season, 'attributes': {'pac': 15, 'acc': 15}}
+    }
+
+
+def _report(plans_before: Dict[str, str], plans_after: Dict[str, str]) -> str:
+    """Formats the query plans of each shape before and after the migration."""
+
+    lines = []
+    for shape, plan_before in plans_before.items():
+        lines.extend([f'===== {shape} =====', '--- Before ---', plan_before, '--- After ---', plans_after[shape], ''])
+
+    return '\n'.join(lines)
+
+
+def migrate_database(db_login: Dict[str, str],
+                     report: bool = True,
+                     analyze: bool = False) -> List[str]:
+    """
+    Migrates a database created with an older version to the current schema, without reloading the data.
+
+    First converts the columns that have changed since the first version, see `migrate_schema`: the
+    positions of each player in one row of the player info, the attributes parsed into their low and
+    high ends, and the checksum of each player. Then creates every index declared on the ORM models that the database is missing, e.g. on
+    `player.season` and on the `_playerID` of each table joined by `select`, and the unique
+    (uid, season) of the players that the ingest upserts by. Running it on a database that
+    already has all indexes and constraints does nothing.
+
+    Parameters:
+    ----------
+    db_login : Dict[str, str]
+        Dictionary containing login credentials for the database connection.
+        Should contain the keys: 'user', 'password', 'host' (both host and port) and 'database'.
+    report : bool, optional
+        If True, prints the query plans of the standard shapes of `select`, as shown by EXPLAIN,
+        before and after the indexes are created. The plans before are of the converted columns.
+        Default is True.
+    analyze : bool, optional
+        If True, the report uses EXPLAIN ANALYZE, which runs the queries and shows their actual times.
+        Default is False.
+
+    Returns:
+    -------
+    list of str
+        The names of the created indexes and constraints.
+
+    Example:
+    -------
+    ```python
+    migrate_database(
+        db_login={
+            'user': 'username',
+            'password': 'password',
+            'host': 'localhost:5432',
+            'database': 'database'
+        }
+    )
+    ```
+    """
+
+    engine = Setup.create_engine(**db_login)
+
+    # The current queries, including those of the report, only run on the current columns.
+    migrated = migrate_schema(engine, verbose=True)
+
+    interact = Interact(engine)
+
+    shapes = _standard_shapes(interact) if report and interact.session.query(Player._id).first() else {}
+
+    plans_before = {shape: interact.explain(analyze=analyze, **filters) for shape, filters in shapes.items()}
+
+    created = interact.create_indexes(verbose=True)
+
+    plans_after = {shape: interact.explain(analyze=analyze, **filters) for shape, filters in shapes.items()}
+
+    if shapes:
+        print(_report(plans_before, plans_after))
+
+    if migrated:
+        print(f'Migrated the columns {", ".join(migrated)}.')
+
+    print(f'Created {len(created)} indexes and constraints.' if created else 'All indexes and constraints already exist.')
+
+    interact.session.close()
+
+    return created
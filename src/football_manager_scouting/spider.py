@@ -1,10 +1,12 @@
 from soccerplots.radar_chart import Radar
 from football_manager_scouting.category_mappings.categories import STATS
-from football_manager_scouting.backend.request_data import Request
-from collections import defaultdict
+from football_manager_scouting.backend.request_data import AsyncRequest
 from football_manager_scouting.backend.errors import MultiplePlayersFoundError
 from football_manager_scouting.backend.player import Players
+from football_manager_scouting.backend.aggregate import Aggregates
 from typing import List, Tuple, Dict, Iterable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 
 
 def _create_radar_chart(ranges: List[Tuple[float, float]],
@@ -71,20 +73,20 @@ def _create_radar_chart(ranges: List[Tuple[float, float]],
                                title=title, dpi=500, compare=True, filename=f'{name}.jpg')
     
 
-def _get_ranges(all_stats: Dict[str, List[float]]) -> List[tuple[float, float]]:
+def _get_ranges(aggregates: Aggregates) -> List[tuple[float, float]]:
     """
-    Calculates the min and max ranges for each statistic from the provided data.
+    Gets the min and max ranges for each statistic from the provided aggregates.
 
     This function generates a list of tuples representing the minimum and 
-    maximum values for each statistic in the provided dictionary. 
+    maximum values for each statistic of the aggregates. 
     Special handling is applied for the 'possLost' statistic to reverse its 
     range since a lower value is preferred.
 
     Parameters
     ----------
-    all_stats : Dict[str, List[float]]
-        A dictionary where keys are statistic names and values are lists of 
-        corresponding values for different players.
+    aggregates : Aggregates
+        The aggregates of each statistic over the players, as computed by
+        the database.
 
     Returns
     -------
@@ -92,24 +94,24 @@ def _get_ranges(all_stats: Dict[str, List[float]]) -> List[tuple[float, float]]:
         A list of tuples containing the min and max values for each statistic.
     """
     
-    ranges = [(min(all_stats[stat]), max(all_stats[stat]))
+    ranges = [(aggregates[stat]['min'], aggregates[stat]['max'])
               # The lower the category possLost is the better,
               # therefore reverse the order of this category's ranges
-              if stat != 'possLost' else (max(all_stats[stat]), min(all_stats[stat]))
-              for stat in all_stats]
+              if stat != 'possLost' else (aggregates[stat]['max'], aggregates[stat]['min'])
+              for stat in aggregates]
     
     return ranges
 
 
-def _average_stats(all_stats: Dict[str, List[float]]) -> List[float]:
+def _average_stats(aggregates: Aggregates) -> List[float]:
     """
-    Calculates the average values for each statistic in the provided data.
+    Gets the average values for each statistic from the provided aggregates.
 
     Parameters
     ----------
-    all_stats : Dict[str, List[float]]
-        A dictionary where keys are statistic names and values are lists of 
-        corresponding values for different players.
+    aggregates : Aggregates
+        The aggregates of each statistic over the players, as computed by
+        the database.
 
     Returns
     -------
@@ -117,41 +119,44 @@ def _average_stats(all_stats: Dict[str, List[float]]) -> List[float]:
         A list of average values for each statistic.
     """
     
-    return [sum(stat)/len(stat) for stat in all_stats.values()]
+    return [aggregates[stat]['avg'] for stat in aggregates]
 
 
-def _get_stats(data: Players[Dict[str, Dict[str, str | float]]], filter_cats: set[str]) -> Dict[str, list[float]]:
+async def _fetch_many(db_login: Dict[str, str],
+                      filters: List[dict],
+                      cohort_filter: dict,
+                      stats: List[str]) -> Tuple[List[Players], Aggregates]:
+    """
+    Fetches the players of each filter and the aggregates of the stats of the players of the cohort
+    filter at once, each on a connection of its own, see `AsyncRequest.fetch_many` and `AsyncRequest.aggregate`.
     """
-    Extracts statistics for players based on specified categories.
 
-    This function filters the statistics of players in the provided data 
-    according to the specified categories and compiles them into a 
-    dictionary.
+    request = AsyncRequest(**db_login)
 
-    Parameters
-    ----------
-    data : Players[Dict[Dict[str, str | float]]]
-        A collection of player data where each player's statistics are stored 
-        in a dictionary format.
-    filter_cats : set[str]
-        A set of category names to filter the statistics.
+    try:
+        return tuple(await asyncio.gather(request.fetch_many(filters),
+                                          request.aggregate(cohort_filter, stats=stats)))
 
-    Returns
-    -------
-    Dict[str, List[float]]
-        A dictionary where keys are the filtered statistic names and values 
-        are lists of corresponding statistics for the players.
+    finally:
+        await request.close()
+
+
+def _run(coroutine):
+    """
+    Runs a coroutine to completion and returns its result.
+
+    In a thread of its own if an event loop is already running, e.g. in a Jupyter notebook,
+    since `asyncio.run` cannot be called from a running event loop.
     """
-    
-    stats = defaultdict(list)
-    
-    for records in data.values():
-        player_stats: Dict[str, float] = records['Stats']
-        for key, val in player_stats.items():
-            if key in filter_cats:
-                stats[key].append(val)
-                
-    return dict(stats)
+
+    try:
+        asyncio.get_running_loop()
+
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
 
 
 def create_spider(db_login: Dict[str, str],
@@ -219,18 +224,40 @@ def create_spider(db_login: Dict[str, str],
     if not isinstance(season, str):
         season = str(season)
 
-    request = Request(**db_login)
-    
     category = STATS[category]
     
-    ###########
+    comparison_division = comparison_division if comparison_division is not None else division
+    comparison_position = comparison_position if comparison_position is not None else position
+    comparison_season = comparison_season if comparison_season is not None else season
+
+    # Only the stats of the category are selected, and no attributes.
+    fields = {'Stats': category, 'Attributes': []}
+
     player_filter = {'name': name, 'season': season,
                      'pos': position, 'division': division,
-                     'mins': mins}
+                     'mins': mins, 'fields': fields}
+
+    players_from_division_filter  = {'season': comparison_season,
+                                     'pos': comparison_position,
+                                     'division': comparison_division,
+                                     'mins': mins}
+
+    comp_player_filter = {'name': comparison,
+                          'season': comparison_season,
+                          'pos': comparison_position,
+                          'division': comparison_division,
+                          'mins': mins, 'fields': fields}
 
-    player: Players[dict[dict[str, str | int | float]]] = \
-        request.fetch_all(filter=player_filter)
+    filters = [player_filter]
+    if comparison != 'average':
+        filters.append(comp_player_filter)
 
+    # The fetches do not depend on each other, so they run at once. Only the ranges and the
+    # averages of the players from the division are needed, so they are computed by the database.
+    (player, *comp_player), players_from_division = _run(_fetch_many(db_login, filters,
+                                                                      players_from_division_filter, category))
+
+    ###########
     if len(player) > 1:
         raise MultiplePlayersFoundError('Multiple players found! Apply more filters.')
 
@@ -239,43 +266,19 @@ def create_spider(db_login: Dict[str, str],
     ###########
 
     ###########
-    comparison_division = comparison_division if comparison_division is not None else division
-    comparison_position = comparison_position if comparison_position is not None else position
-    comparison_season = comparison_season if comparison_season is not None else season
-    
-    players_from_division_filter  = {'season': comparison_season,
-                                     'pos': comparison_position,
-                                     'division': comparison_division,
-                                     'mins': mins}
-
-    request.players = Players()  # Inte en bra lösning!
-
-    players_from_division: Players[dict[dict[str, str | int | float]]] = \
-        request.fetch_all(filter=players_from_division_filter)
-
     if len(players_from_division) <= 15:
         print(f'Only {len(players_from_division)} players in database!')
 
-    stats_of_players_from_division = _get_stats(players_from_division, set(category))
-
-    ranges = _get_ranges(stats_of_players_from_division)
+    ranges = _get_ranges(players_from_division)
 
     if comparison != 'average':
-        request.players = Players()  # Inte en bra lösning!
-
-        comp_player_filter = {'name': comparison,
-                              'season': comparison_season,
-                              'pos': comparison_position,
-                              'division': comparison_division,
-                              'mins': mins}
-
-        comp_player = next(iter(request.fetch_all(filter=comp_player_filter).values()))
+        comp_player = next(iter(comp_player[0].values()))
         comp_name = comp_player['Player']['name']
         comparison = [comp_player['Stats'][stat] for stat in category]
 
     else:
         comp_name = 'average'
-        comparison: list[float] = _average_stats(stats_of_players_from_division)
+        comparison: list[float] = _average_stats(players_from_division)
 
     _create_radar_chart(
         ranges=ranges,
@@ -1,8 +1,11 @@
 from football_manager_scouting.index import create_index
 from football_manager_scouting.insert_data import insert_data_to_database
 from football_manager_scouting.backend.server import Interact, Setup
+from football_manager_scouting.backend.score import Score, Moments
 from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
+import numpy as np
+import math
 
 
 db_login = {
@@ -78,7 +81,7 @@ def test_zero_filters():
 
 def test_pos_filters():
     create_index(db_login=db_login, category='all', position='ML', file='position.csv')
-    results = get_records(column='position.position', lookup_join='JOIN position ON "playerInfo".position = position.id', where_filter="WHERE position.position = 'ML'")
+    results = get_records(column='position.position', lookup_join='JOIN position ON position.id = ANY("playerInfo".position)', where_filter="WHERE position.position = 'ML'")
     found = [(d['name'], set(d['position'].split())) for d in parse_csv('position.csv')]
     assert all([exp_name == found_name and exp_pos in found_poss for (exp_name, exp_pos), (found_name, found_poss) in zip(results, found)])
     
@@ -108,7 +111,7 @@ def test_all_filters():
             JOIN "playerInfo"
             ON "playerInfo"."_playerID" = player._id
             JOIN position
-            ON "playerInfo".position = position.id
+            ON position.id = ANY("playerInfo".position)
             JOIN division
             ON "playerInfo".division = division.id
             WHERE position.position = 'AML' AND "playerInfo".mins >= 100 AND division.division = 'Bundesliga 2' and player.season = '25';
@@ -122,3 +125,71 @@ def test_all_filters():
         vals.append((found_name == exp_name, found_season == exp_season, exp_pos in found_pos,
                      found_mins == exp_mins, found_div == exp_div))
     assert all(vals)
+
+
+def test_score():
+    rng = np.random.default_rng(0)
+    stats = np.round(rng.gamma(2, 2, size=(5000, 23)), 2)
+    stats[:, 5] = 0
+
+    # The players are added one at a time, as Python's sum is compensated since 3.12.
+    mean, summed_squares = [0] * 23, [0] * 23
+    for player_stats in stats.tolist():
+        for i, x in enumerate(player_stats):
+            mean[i] += x
+    mean = [x / len(stats) for x in mean]
+    for player_stats in stats.tolist():
+        for i, x in enumerate(player_stats):
+            summed_squares[i] += (x - mean[i]) ** 2
+    std = [math.sqrt(x / len(stats)) for x in summed_squares]
+
+    score = Score(all_stats=stats)
+
+    assert score.mean == mean and score.std == std
+
+    weighted, totals = score.scores(stats)
+    expected_weighted = [score(player_stats) for player_stats in stats.tolist()]
+
+    assert weighted.tolist() == expected_weighted
+    assert totals.tolist() == [sum(player_weighted) for player_weighted in expected_weighted]
+
+
+def test_moments():
+    rng = np.random.default_rng(0)
+    stats = np.round(rng.gamma(2, 2, size=(5000, 23)), 2)
+
+    moments = Moments(23)
+    for start in range(0, len(stats), 999):
+        moments.update(stats[start:start + 999])
+
+    assert moments.count == len(stats)
+    assert np.allclose(moments.mean, stats.mean(axis=0)) and np.allclose(moments.std, stats.std(axis=0))
+
+    # The moments of parts of the players merge into those of all of them.
+    first, second = Moments(23).update(stats[:1234]), Moments(23).update(stats[1234:])
+    merged = first.merge(second)
+
+    assert first.count == 1234 and merged.count == len(stats)
+    assert np.allclose(merged.mean, moments.mean) and np.allclose(merged.m2, moments.m2)
+    assert Moments(23).merge(merged).mean.tolist() == merged.mean.tolist()
+
+    score = Score.from_moments(merged)
+    assert np.allclose(score.mean, Score(all_stats=stats).mean)
+
+def test_stream_index():
+    create_index(db_login=db_login, category='all', season='24', file='loaded.csv')
+    create_index(db_login=db_login, category='all', season='24', file='streamed.csv', stream=True)
+
+    with open('loaded.csv', encoding='utf-8') as loaded, open('streamed.csv', encoding='utf-8') as streamed:
+        assert sorted(loaded) == sorted(streamed)
+
+    # Test that a player of several seasons is written once, with the row of the last season, as when loaded.
+    create_index(db_login=db_login, category='all', season=['24', '25'], file='loaded.csv')
+    create_index(db_login=db_login, category='all', season=['24', '25'], file='streamed.csv', stream=True)
+
+    with open('loaded.csv', encoding='utf-8') as loaded, open('streamed.csv', encoding='utf-8') as streamed:
+        loaded, streamed = sorted(loaded), sorted(streamed)
+
+    seasons = [d['season'] for d in parse_csv('streamed.csv')]
+    assert loaded == streamed and len(seasons) == len(get_records(column=None, query='SELECT DISTINCT uid FROM player'))
+    assert set(seasons) == {'25'}
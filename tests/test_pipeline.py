@@ -0,0 +1,68 @@
+from football_manager_scouting.backend.pipeline import Pipeline
+import time
+import pytest
+
+
+def test_run():
+    batches = []
+    pipeline = Pipeline(batch_size=3)
+    pipeline.run(range(10), batches.append)
+
+    # Test that all items reach the consumer in order and in batches.
+    assert batches == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+    assert pipeline.stats['Parser'].items == pipeline.stats['Writer'].items == 10
+
+    # Test that it raises ValueError when given a batch size or queue size below one.
+    with pytest.raises(ValueError):
+        Pipeline(batch_size=0)
+
+    with pytest.raises(ValueError):
+        Pipeline(maxsize=0)
+
+
+def test_backpressure():
+    produced, ahead = [], []
+
+    def producer():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    def consumer(batch):
+        time.sleep(0.001)
+        ahead.append(len(produced) - batch[-1])
+
+    Pipeline(batch_size=2, maxsize=3).run(producer(), consumer)
+
+    # Test that the producer is never more than the queued batches, the batch being
+    # built and the batch being put ahead of the consumer.
+    assert max(ahead) <= 2 * (3 + 2) + 1
+
+
+def test_errors():
+    produced = []
+
+    def producer():
+        for i in range(10000):
+            produced.append(i)
+            yield i
+
+    def failing_consumer(batch):
+        raise RuntimeError('writer failed')
+
+    # Test that an exception in the consumer is raised and stops the producer.
+    with pytest.raises(RuntimeError, match='writer failed'):
+        Pipeline(batch_size=10, maxsize=2).run(producer(), failing_consumer)
+
+    assert len(produced) < 10000
+
+    def failing_producer():
+        yield 1
+        raise KeyError('parser failed')
+
+    # Test that an exception in the producer is raised after the items before it are consumed.
+    batches = []
+    with pytest.raises(KeyError, match='parser failed'):
+        Pipeline(batch_size=1).run(failing_producer(), batches.append)
+
+    assert batches == [[1]]
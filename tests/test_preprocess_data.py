@@ -0,0 +1,88 @@
+from football_manager_scouting.backend.preprocess_data import Preprocess, _parse_chunk, _expand
+
+
+data_path = './data/test_data.rtf'
+
+process = Preprocess(season='24')
+
+
+def parse_serial():
+    with open(data_path, 'r', encoding='utf-8') as fhand:
+        column_headers = process._get_column_headers(fhand.readline())
+        plan = process._compile_plan(column_headers)
+        return column_headers, [process._parse_line(line, plan)
+                                for line in fhand if process._is_content(line)]
+
+
+def without_asking_price(rows):
+    # The asking price is obfuscated with a random number.
+    for tables in rows:
+        del tables['Contract']['value']
+    return rows
+
+
+def test_split_file():
+    with open(data_path, 'rb') as fhand:
+        fhand.readline()
+        header_end = fhand.tell()
+        chunks = process._split_file(fhand, 10000)
+
+        # Test that the chunks cover the whole file after the header without overlapping.
+        assert chunks[0][0] == header_end
+        assert all(end == next_start for (_, end), (next_start, _) in zip(chunks, chunks[1:]))
+        assert chunks[-1][1] == fhand.seek(0, 2)
+
+        # Test that every chunk starts at the beginning of a line.
+        for start, _ in chunks:
+            fhand.seek(start - 1)
+            assert fhand.read(1) == b'\n'
+
+
+def test_parse_chunk():
+    column_headers, expected = parse_serial()
+
+    with open(data_path, 'rb') as fhand:
+        fhand.readline()
+        chunks = process._split_file(fhand, 10000)
+
+    found = []
+    for start, end in chunks:
+        found.extend(_expand(_parse_chunk(data_path, start, end, '24', column_headers)))
+
+    # Test that the chunks parsed separately give the same rows, in the same order, as the whole file.
+    assert without_asking_price(found) == without_asking_price(expected)
+    assert found[0]['Player']['season'] == '24'
+
+
+def test_compile_plan():
+    column_headers = ['Name', 'Age', 'Inf', 'AP', 'Pres A/90', 'Pac', 'Acc', 'Sta']
+    plan = process._compile_plan(column_headers)
+
+    # Test that unused columns are left out and the used ones are mapped to their table and column,
+    # with the attributes mapped to both ends of their range.
+    assert [(i, table, column) for i, table, column, _ in plan] == \
+        [(0, 'Player', 'name'), (1, 'PlayerInfo', 'age'), (3, 'Contract', 'value'), (4, 'Stats', 'presA'),
+         (5, 'Attributes', 'pac'), (5, 'Attributes', '_pacHigh'), (6, 'Attributes', 'acc'), (6, 'Attributes', '_accHigh'),
+         (7, 'Attributes', 'sta'), (7, 'Attributes', '_staHigh')]
+
+    tables = process._parse_line('| Lionel Messi | 36 | Wnt | 0\xa0kr | - | 12-15 | 17 | - |', plan)
+
+    assert tables['Player'] == {'name': 'Lionel Messi', 'season': '24'}
+    assert tables['PlayerInfo'] == {'age': 36}
+    assert tables['Contract'] == {'value': 0}
+    assert tables['Stats'] == {'presA': 0.0}
+    assert tables['Attributes'] == {'pac': 12, '_pacHigh': 15, 'acc': 17, '_accHigh': 17, 'sta': None, '_staHigh': None}
+
+
+def test_checksum():
+    _, rows = parse_serial()
+
+    checksums = [process.checksum(tables) for tables in rows]
+
+    # Test that the checksum does not depend on the obfuscated asking price.
+    assert checksums == [process.checksum(tables) for tables in parse_serial()[1]]
+
+    # Test that the checksum changes when a value changes.
+    rows[0]['Stats']['xa'] += 0.01
+    assert process.checksum(rows[0]) != checksums[0]
+    assert process.checksum(rows[1]) == checksums[1]
@@ -1,9 +1,24 @@
 from football_manager_scouting.backend.server import Setup, Interact
+from football_manager_scouting.backend.bulk_insert import BulkInsert
+from football_manager_scouting.backend.lookup_cache import LookupCache
+from football_manager_scouting.backend.checkpoint import fingerprint, load_checkpoint
+from football_manager_scouting.backend.preprocess_data import Preprocess
+from football_manager_scouting.backend.player import Players, Unpacker
+from football_manager_scouting.backend.query_cache import QueryCache, bump_version_statement
+from football_manager_scouting.backend.frame import PlayerFrame, Categorical
+from football_manager_scouting.backend.request_data import Request, AsyncRequest
+from football_manager_scouting.insert_data import insert_data_to_database
 from football_manager_scouting.backend.tables import (Player, PlayerInfo, Attributes, Stats, Ca, Contract, Base,
-                    Position, Division, Foot, Nat, Club, Eligible)
-from football_manager_scouting.backend.errors import UnexpecteTableNameError, NoPlayerFoundError, UnexpectedColumnNameError
-from sqlalchemy.engine import Connection
-from sqlalchemy import MetaData, text
+                    Position, Division, Foot, Nat, Club, Eligible, Checkpoint, SeasonVersion)
+from football_manager_scouting.backend.errors import (UnexpecteTableNameError, NoPlayerFoundError, UnexpectedColumnNameError,
+                                                      OutdatedSchemaError)
+from football_manager_scouting.backend.schema import outdated_schema, _attribute_columns
+from football_manager_scouting.migrate import migrate_database
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy import MetaData, text, select, event, inspect
+import asyncio
+import threading
+import numpy as np
 import pytest
 
 
@@ -22,6 +37,31 @@ def test_create_engine():
     
     # Test that the database exists.
     assert isinstance(connection, Connection)
+    connection.close()
+
+    # Test that the same login gives the same engine, and that only the first Interact checks the tables.
+    assert Setup.create_engine(user='postgres', password='root', host='localhost:5432', database='playerstest') is engine
+
+    interact.create(drop=False, verbose=False)
+    Interact(engine)
+
+    statements = []
+    count_statement = lambda conn, cursor, statement, *args: statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    try:
+        Interact(engine)
+        assert statements == []
+
+        # Test that the tables are checked, and created, again once they are dropped.
+        Base.metadata.drop_all(engine)
+        statements.clear()
+        Interact(engine)
+        assert statements and inspect(engine).has_table('player')
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+
+    Base.metadata.drop_all(engine)
 
 def test_create():
     
@@ -37,12 +77,36 @@ def test_create():
     metadata.reflect(bind=engine)
     
     tables = set([table.__tablename__ for table in (Player, PlayerInfo, Attributes, Stats, Ca, Contract,
-                Position, Division, Foot, Nat, Club, Eligible)])
+                Position, Division, Foot, Nat, Club, Eligible, Checkpoint, SeasonVersion)])
     created_tables = set(metadata.tables.keys())
     
     # Verify that the engine in server.py has the expected table relations.
     assert tables == created_tables
 
+def test_create_indexes():
+    # Test that nothing is created when the database already has all indexes.
+    assert interact.create_indexes() == []
+
+    # Test that a missing index is added to an existing database.
+    with engine.begin() as connection:
+        connection.execute(text('DROP INDEX "ix_stats__playerID"; DROP INDEX ix_player_season;'))
+
+    assert interact.create_indexes() == ['ix_player_season', 'ix_stats__playerID']
+    assert interact.create_indexes() == []
+
+    # Test that the unique (uid, season) of the players, which the upserts rely on, is added too.
+    with engine.begin() as connection:
+        connection.execute(text('ALTER TABLE player DROP CONSTRAINT player_uid_season_key;'))
+
+    assert interact.create_indexes() == ['player_uid_season_key']
+    assert interact.create_indexes() == []
+
+    # Test that the plan of a select is explained, using the new indexes.
+    plan = interact.explain(season='24', pos=['DC'], attributes={'pac': 15})
+    assert 'Sort Key: player._id' in plan
+    assert 'actual time' not in interact.explain(name='x')
+    assert 'actual time' in interact.explain(analyze=True, name='x')
+
 def test_insert():
     # Test that the function raises exception when given a tables dict with unexpected tablenames.
     with pytest.raises(UnexpecteTableNameError):
@@ -85,9 +149,9 @@ def test_insert():
         for val in vals:
             interact.get_lookup_id(table, (table.lower(), val))
     
-    playerinfo = [{'age': 24, 'rightfoot': 1, 'leftfoot': 2, 'mins': 37, 'division': 1, 'club': 1, 'nat': 1, 'eligible': 1, 'position': 1}]
+    playerinfo = [{'age': 24, 'rightfoot': 1, 'leftfoot': 2, 'mins': 37, 'division': 1, 'club': 1, 'nat': 1, 'eligible': 1, 'position': [1]}]
     contract = {'beginDate': 2027, 'expiryDate': 2031, 'extension': 0, 'wage': 765000, 'releaseClauseFee': 0, 'value': 77535945}
-    attributes = {"cor": "7", "cro": "15", "dri": "12", "fin": "10", "fir": "18", "fre": "14", "hea": "9", "lon": "16", "lth": "8", "mar": "6", "pas": "17", "pen": "4", "tck": "11", "tec": "19", "agg": "13", "ant": "12", "bra": "5", "cmp": "16", "cnt": "20", "decisions": "8", "det": "14", "fla": "3", "ldr": "11", "otb": "10", "pos": "9", "tea": "18", "vis": "15", "wor": "7", "acc": "17", "agi": "19", "bal": "12", "jum": "8", "natF": "13", "pac": "14", "sta": "10", "strength": "20", "aer": "11", "cmd": "15", "com": "16", "ecc": "4", "han": "9", "kic": "8", "oneVsOne": "6", "pun": "7", "ref": "18", "tro": "14", "thr": "13"}
+    attributes = {"cor": 7, "cro": 15, "dri": 12, "fin": 10, "fir": 18, "fre": 14, "hea": 9, "lon": 16, "lth": 8, "mar": 6, "pas": 17, "pen": 4, "tck": 11, "tec": 19, "agg": 13, "ant": 12, "bra": 5, "cmp": 16, "cnt": 20, "decisions": 8, "det": 14, "fla": 3, "ldr": 11, "otb": 10, "pos": 9, "tea": 18, "vis": 15, "wor": 7, "acc": 17, "agi": 19, "bal": 12, "jum": 8, "natF": 13, "pac": 14, "sta": 10, "strength": 20, "aer": 11, "cmd": 15, "com": 16, "ecc": 4, "han": 9, "kic": 8, "oneVsOne": 6, "pun": 7, "ref": 18, "tro": 14, "thr": 13}
     ca = {'ca': 126}
     stats = {'aerA': 2.2, 'hdrsW': 4.2, 'blk': 3.3, 'clr': 4.4, 'tckC': 1.6, 'presA': 2.3, 'presC': 4.3, 'interceptions': 3.1, 'sprints': 4.9, 'possLost': 3.7, 'possWon': 2.3, 'drb': 0.2, 'opCrsA': 3.4, 'opCrsC': 2.7, 'psA': 4.2, 'psC': 1.2, 'prPasses': 1.0, 'opKp': 0.8, 'chC': 0.4, 'xa': 0.3, 'shot': 3.5, 'sht': 2.0, 'npXg': 1.9}
     tables =   {'Stats': stats,
@@ -126,7 +190,690 @@ def test_get_lookup_id():
     assert id1 == id2
     
     remove_all_rows()
-    
+
+def test_lookup_cache():
+    cache = LookupCache(engine)
+
+    # Test that the function raises exception when given unexpected table or column names.
+    with pytest.raises(UnexpecteTableNameError):
+        cache.get_lookup_id('position', ('position', 'MC'))
+
+    with pytest.raises(UnexpectedColumnNameError):
+        cache.get_lookup_id('Position', ('Position', 'MC'))
+
+    # Test that values already in the lookup tables are preloaded.
+    id1 = interact.get_lookup_id('Position', ('position', 'MC'))
+    cache.preload()
+    assert cache.get_lookup_id('Position', ('position', 'MC')) == id1
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    # Test that missing values are inserted in one batch and then cached.
+    ids = cache.get_lookup_ids([('Position', ('position', 'ML')), ('Club', ('club', 'Odd')),
+                                ('Position', ('position', 'ML')), ('Position', ('position', 'MC'))])
+    assert ids[0] == ids[2] and ids[3] == id1
+    assert (cache.hits, cache.misses) == (2, 3)
+    assert interact.get_lookup_id('Position', ('position', 'ML')) == ids[0]
+    assert interact.get_lookup_id('Club', ('club', 'Odd')) == ids[1]
+
+    cache.get_lookup_ids([('Position', ('position', 'ML')), ('Club', ('club', 'Odd'))])
+    assert cache.hit_rate == 4 / 7
+
+    remove_all_rows()
+
+def test_position_cache():
+    cache = LookupCache(engine, maxsize=2)
+
+    # Test that a position string is split and encoded to the ids of its positions.
+    ids = cache.get_position_ids('D/WB (R), M (C)')
+    assert ids == tuple(interact.get_lookup_id('Position', ('position', pos)) for pos in ('DR', 'WBR', 'MC'))
+
+    # Test that the same string is answered from the cache without any lookups.
+    hits, misses = cache.hits, cache.misses
+    assert cache.get_position_ids('D/WB (R), M (C)') is ids
+    assert (cache.hits, cache.misses) == (hits, misses)
+
+    # Test that the least recently used string is evicted when the cache is full.
+    cache.get_position_ids('GK')
+    cache.get_position_ids('D/WB (R), M (C)')
+    cache.get_position_ids('ST (C)')
+    assert list(cache._positions) == ['D/WB (R), M (C)', 'ST (C)']
+
+    # Test that finding ids only returns the names that exist and never inserts.
+    assert cache.find_lookup_ids('Position', ['MC', 'AMR', 'GK']) == [ids[2], cache.get_position_ids('GK')[0]]
+    assert LookupCache(engine).find_lookup_ids('Position', ['AMR']) == []
+
+    remove_all_rows()
+
+def test_stale_lookup_ids():
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+
+    insert_data_to_database(db_login, './data/test_data.rtf', '24', bulk=True)
+
+    goalkeepers = [uid for uid, _ in interact.project(season='24', pos=['GK'])]
+    defenders = [uid for uid, _ in interact.project(season='24', pos=['DC'])]
+
+    def swap_positions():
+        # The names of the positions get each other's ids, as when another process loads the lookup tables
+        # again in another order, and the season a new stamp with the players written with them.
+        with engine.begin() as connection:
+            connection.execute(text("UPDATE position SET position = CASE position WHEN 'GK' THEN 'DC' ELSE 'GK' END "
+                                    "WHERE position IN ('GK', 'DC')"))
+            connection.execute(bump_version_statement('24'))
+
+    async def fetch(filter):
+        request = AsyncRequest(**db_login)
+        try:
+            return await request.fetch_all(filter, cache=False)
+        finally:
+            await request.close()
+
+    # Test that the cached ids of the names are looked up again once the stamps have changed.
+    swap_positions()
+    assert [uid for uid, _ in interact.project(season='24', pos=['GK'])] == defenders
+    assert list(asyncio.run(fetch({'season': '24', 'pos': ['DC']}))) == goalkeepers
+
+    swap_positions()
+    assert list(asyncio.run(fetch({'season': '24', 'pos': ['GK']}))) == goalkeepers
+    assert [uid for uid, _ in interact.project(season='24', pos=['DC'])] == defenders
+
+    remove_all_rows()
+
+def test_bulk_insert():
+    writer = BulkInsert(engine, reserve=2)
+
+    # Test that the function raises exception when given a tables dict with unexpected tablenames.
+    with pytest.raises(UnexpecteTableNameError):
+        writer.insert({'playerinfo': {'age': 24}}, {'name': 'blabla', 'uid': '1', 'season': '23'})
+
+    # Test that the function raises exception when given a table dict with unexpected column names.
+    with pytest.raises(UnexpectedColumnNameError):
+        writer.insert({'Ca': {'caa': 126}}, {'name': 'blabla', 'uid': '1', 'season': '23'})
+
+    writer = BulkInsert(engine, reserve=2)
+
+    for table, vals in {'Club': ['Mainz 05'], 'Division': ['Bundesliga 2'], 'Foot': ['Very Strong', 'Weak'],
+                        'Nat': ['NED'], 'Eligible': ['Yes'], 'Position': ['ML', 'MC']}.items():
+        for val in vals:
+            interact.get_lookup_id(table, (table.lower(), val))
+
+    playerinfo = {'age': 24, 'rightfoot': 1, 'leftfoot': 2, 'mins': 37, 'division': 1, 'club': 1, 'nat': 1, 'eligible': 1, 'position': [1, 2]}
+    contract = {'beginDate': 2027, 'expiryDate': 2031, 'extension': 0, 'wage': 765000, 'releaseClauseFee': 7500000.0, 'value': 77535945}
+    ca = {'ca': 126}
+    stats = {'aerA': 2.2, 'hdrsW': 4.2, 'blk': 3.3, 'clr': 4.4, 'tckC': 1.6, 'presA': 2.3, 'presC': 4.3, 'interceptions': 3.1, 'sprints': 4.9, 'possLost': 3.7, 'possWon': 2.3, 'drb': 0.2, 'opCrsA': 3.4, 'opCrsC': 2.7, 'psA': 4.2, 'psC': 1.2, 'prPasses': 1.0, 'opKp': 0.8, 'chC': 0.4, 'xa': 0.3, 'shot': 3.5, 'sht': 2.0, 'npXg': 1.9}
+    attributes = {"cor": 7, "cro": 12, "_croHigh": 15, "dri": 12, "fin": 10, "fir": 18, "fre": 14, "hea": 9, "lon": 16, "lth": 8, "mar": 6, "pas": 17, "pen": 4, "tck": 11, "tec": 19, "agg": 13, "ant": 12, "bra": 5, "cmp": 16, "cnt": 20, "decisions": 8, "det": 14, "fla": 3, "ldr": 11, "otb": 10, "pos": 9, "tea": 18, "vis": 15, "wor": 7, "acc": 17, "agi": 19, "bal": 12, "jum": 8, "natF": 13, "pac": 14, "sta": 10, "strength": 20, "aer": 11, "cmd": 15, "com": 16, "ecc": 4, "han": 9, "kic": 8, "oneVsOne": 6, "pun": 7, "ref": 18, "tro": 14, "thr": 13}
+
+    # Insert more players than the reserved id range to force a second reservation.
+    for uid in ('1', '2', '3'):
+        writer.insert({'PlayerInfo': playerinfo, 'Contract': contract, 'Ca': ca, 'Stats': stats, 'Attributes': attributes},
+                      {'name': f'player {uid}', 'uid': uid, 'season': '23'})
+    writer.commit()
+
+    found = {}
+    for uid, rows in interact.select():
+        found[uid] = rows
+
+    assert set(found) == {'1', '2', '3'}
+    # Test that the positions are stored as one array per player, loaded together with their names.
+    assert all(len(rows) == 1 for rows in found.values())
+    assert found['2'][0].PlayerInfo.position == [1, 2]
+    assert found['2'][0].PlayerInfo.Position == ['ML', 'MC']
+    assert found['3'][0].Contract.releaseClauseFee == 7500000
+    assert found['3'][0].Stats.npXg == 1.9
+    assert (found['3'][0].Attributes.cro, found['3'][0].Attributes._croHigh) == (12, 15)
+
+    remove_all_rows()
+
+def test_upsert():
+    for table, vals in {'Club': ['Mainz 05'], 'Division': ['Bundesliga 2'], 'Foot': ['Very Strong', 'Weak'],
+                        'Nat': ['NED'], 'Eligible': ['Yes'], 'Position': ['ML', 'MC']}.items():
+        for val in vals:
+            interact.get_lookup_id(table, (table.lower(), val))
+
+    playerinfo = {'age': 24, 'rightfoot': 1, 'leftfoot': 2, 'mins': 37, 'division': 1, 'club': 1, 'nat': 1, 'eligible': 1, 'position': [1, 2]}
+    contract = {'beginDate': 2027, 'expiryDate': 2031, 'extension': 0, 'wage': 765000, 'releaseClauseFee': 0, 'value': 77535945}
+    stats = {'aerA': 2.2, 'hdrsW': 4.2, 'blk': 3.3, 'clr': 4.4, 'tckC': 1.6, 'presA': 2.3, 'presC': 4.3, 'interceptions': 3.1, 'sprints': 4.9, 'possLost': 3.7, 'possWon': 2.3, 'drb': 0.2, 'opCrsA': 3.4, 'opCrsC': 2.7, 'psA': 4.2, 'psC': 1.2, 'prPasses': 1.0, 'opKp': 0.8, 'chC': 0.4, 'xa': 0.3, 'shot': 3.5, 'sht': 2.0, 'npXg': 1.9}
+    attributes = {"cor": 7, "cro": 12, "_croHigh": 15, "dri": 12, "fin": 10, "fir": 18, "fre": 14, "hea": 9, "lon": 16, "lth": 8, "mar": 6, "pas": 17, "pen": 4, "tck": 11, "tec": 19, "agg": 13, "ant": 12, "bra": 5, "cmp": 16, "cnt": 20, "decisions": 8, "det": 14, "fla": 3, "ldr": 11, "otb": 10, "pos": 9, "tea": 18, "vis": 15, "wor": 7, "acc": 17, "agi": 19, "bal": 12, "jum": 8, "natF": 13, "pac": 14, "sta": 10, "strength": 20, "aer": 11, "cmd": 15, "com": 16, "ecc": 4, "han": 9, "kic": 8, "oneVsOne": 6, "pun": 7, "ref": 18, "tro": 14, "thr": 13}
+
+    def tables(ca):
+        return {'PlayerInfo': playerinfo, 'Contract': contract, 'Ca': {'ca': ca}, 'Stats': stats, 'Attributes': attributes}
+
+    # Test that the function raises exception when given unexpected table or column names.
+    with pytest.raises(UnexpecteTableNameError):
+        interact.upsert({'playerinfo': {'age': 24}}, {'name': 'blabla', 'uid': '1', 'season': '23'})
+
+    with pytest.raises(UnexpectedColumnNameError):
+        interact.upsert(tables(100), {'nname': 'blabla', 'uid': '1', 'season': '23'})
+
+    # Test that upserting an existing player replaces it and its tables instead of adding a duplicate.
+    interact.upsert(tables(100), {'name': 'blabla', 'uid': '1', 'season': '23'})
+    interact.commit()
+    player_id = interact.session.query(Player._id).filter(Player.uid == '1').scalar()
+    interact.upsert(tables(110), {'name': 'bla', 'uid': '1', 'season': '23'})
+    interact.upsert(tables(120), {'name': 'blablabla', 'uid': '1', 'season': '23'})
+    interact.upsert(tables(130), {'name': 'blabla', 'uid': '1', 'season': '24'})
+
+    # Test that the players are written at commit, with one statement for all players and one per table to delete.
+    statements = []
+    record_statement = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, 'before_cursor_execute', record_statement)
+    try:
+        interact.commit()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record_statement)
+
+    assert len([statement for statement in statements if statement.startswith('INSERT INTO player ')]) == 1
+    assert len([statement for statement in statements if statement.startswith('DELETE')]) == 5
+
+    # Test the same with the bulk writer, also for a player upserted twice in the same batch.
+    writer = BulkInsert(engine, reserve=2)
+    writer.upsert(tables(140), {'name': 'blabla', 'uid': '1', 'season': '24'})
+    writer.upsert(tables(50), {'name': 'bla', 'uid': '2', 'season': '24'})
+    writer.upsert(tables(60), {'name': 'bla', 'uid': '2', 'season': '24'})
+    writer.checkpoint('abc', '24', 1234)
+    writer.commit()
+
+    found = {}
+    for _, rows in interact.select():
+        for row in rows:
+            found.setdefault((row.Player.uid, row.Player.season), set()).add((row.Player.name, row.Ca.ca))
+
+    assert found == {('1', '23'): {('blablabla', 120)}, ('1', '24'): {('blabla', 140)}, ('2', '24'): {('bla', 60)}}
+    assert interact.session.query(Player._id).filter(Player.uid == '1', Player.season == '23').scalar() == player_id
+    assert interact.session.query(PlayerInfo).count() == 3
+
+    # Test that the checkpoint is saved with the commit.
+    assert load_checkpoint(engine, 'abc', '24') == 1234
+    assert load_checkpoint(engine, 'abc', '23') is None
+
+    # Test that the version stamp of a season is written with the commit of its players.
+    versions = QueryCache(engine).versions('24')
+    writer.upsert(tables(70), {'name': 'bla', 'uid': '2', 'season': '24'})
+    writer.bump_season_version('24')
+    assert QueryCache(engine).versions('24') == versions
+    writer.commit()
+    assert QueryCache(engine).versions('24') != versions
+
+    remove_all_rows()
+
+def test_read_rtf_file_offset():
+    path = './data/test_data.rtf'
+    process = Preprocess(season='24', user='postgres', password='root', host='localhost:5432', database='playerstest')
+
+    uids, offsets = [], []
+    for tables in process.read_rtf_file(path):
+        uids.append(tables['Player']['uid'])
+        offsets.append(process.offset)
+
+    with open(path, 'rb') as fhand:
+        assert process.offset == len(fhand.read())
+
+    # Test that reading from the offset of a row continues with the next row.
+    resumed = [tables['Player']['uid'] for tables in process.read_rtf_file(path, offset=offsets[99])]
+    assert resumed == uids[100:]
+
+    # Test that the fingerprint is stable and tells files apart.
+    assert fingerprint(path) == fingerprint(path) != fingerprint('./README.md')
+
+    remove_all_rows()
+
+def test_finished_ingest():
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+    path = './data/test_data.rtf'
+
+    insert_data_to_database(db_login, path, '24', bulk=True)
+    players = interact.session.query(Player).count()
+    interact.session.commit()
+
+    # Test that a finished ingest leaves no checkpoint, so that the same file is inserted again in full.
+    assert load_checkpoint(engine, fingerprint(path), '24') is None
+
+    remove_all_rows()
+    insert_data_to_database(db_login, path, '24')
+
+    assert interact.session.query(Player).count() == players > 0
+    interact.session.commit()
+
+    remove_all_rows()
+
+def test_incremental_insert(tmp_path):
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+    path = './data/test_data.rtf'
+
+    insert_data_to_database(db_login, path, '24', bulk=True)
+
+    def stats_ids():
+        query = select(Player.uid, Player.name, Player._checksum, Stats._id).join(Stats)
+        return {uid: (name, checksum, id) for uid, name, checksum, id in interact.session.execute(query)}
+
+    before = stats_ids()
+    interact.session.commit()
+
+    # Rename one player in a new export of the same season.
+    with open(path, 'r', encoding='utf-8') as fhand:
+        content = fhand.read()
+    uid, (name, _, _) = next(iter(before.items()))
+    changed = tmp_path / 'test_data.rtf'
+    changed.write_text(content.replace(name, 'Changed Name'), encoding='utf-8')
+
+    insert_data_to_database(db_login, str(changed), '24', bulk=True, incremental=True)
+
+    after = stats_ids()
+    interact.session.commit()
+
+    # Test that only the changed player was written.
+    assert set(after) == set(before)
+    assert after[uid][0] == 'Changed Name' and after[uid][1] != before[uid][1] and after[uid][2] != before[uid][2]
+    assert {u: row for u, row in after.items() if u != uid} == {u: row for u, row in before.items() if u != uid}
+
+    remove_all_rows()
+
+def test_query_cache(tmp_path):
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+    path = './data/test_data.rtf'
+
+    insert_data_to_database(db_login, path, '24', bulk=True)
+
+    request = Request(**db_login, cache_size=2, cache_dir=str(tmp_path))
+    request.cache.clear()
+
+    players = dict(request.fetch_all(filter={'season': '24', 'pos': ['DC', 'ST'], 'mins': 500}))
+    assert players and request.cache.misses == 1
+
+    statements = []
+    count_statement = lambda conn, cursor, statement, *args: statements.append(statement)
+
+    # Test that the same filters, in any order and form, are answered from the cache with one small query
+    # of the version stamps, and that modifying the fetched players does not modify the cache.
+    request.players = Players()
+    event.listen(Engine, 'before_cursor_execute', count_statement)
+    try:
+        cached = request.fetch_all(filter={'mins': 500, 'pos': ['ST', 'DC'], 'season': '24', 'division': None})
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count_statement)
+
+    assert dict(cached) == players and request.cache.hits == 1 and len(statements) == 1
+    next(iter(cached.values()))['PlayerInfo']['mins'] = -1
+
+    request.players = Players()
+    assert dict(request.fetch_all(filter={'season': '24', 'pos': ['DC', 'ST'], 'mins': 500})) == players
+
+    # Test that the least recently used query is evicted from memory but read back from the directory.
+    request.fetch_all(filter={'season': '24', 'mins': 500})
+    request.fetch_all(filter={'season': '24', 'mins': 1000})
+    assert QueryCache.key({'season': '24', 'pos': ['DC', 'ST'], 'mins': 500}) not in request.cache._players
+
+    request.players = Players()
+    hits = request.cache.hits
+    assert dict(request.fetch_all(filter={'season': '24', 'pos': ['DC', 'ST'], 'mins': 500})) == players
+    assert request.cache.hits == hits + 1
+
+    # Test that a request given no size shares the cache without resizing it, so no query is evicted.
+    assert Request(**db_login).cache is request.cache
+    assert request.cache.maxsize == 2 and len(request.cache._players) == 2
+
+    # Test that writing the season again invalidates its queries, in memory and in the directory.
+    insert_data_to_database(db_login, path, '24', bulk=True, incremental=True)
+
+    request.players = Players()
+    misses = request.cache.misses
+    assert dict(request.fetch_all(filter={'season': '24', 'pos': ['DC', 'ST'], 'mins': 500})) == players
+    assert request.cache.misses == misses + 1
+
+    remove_all_rows()
+
+def test_async_request():
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+
+    insert_data_to_database(db_login, './data/test_data.rtf', '24', bulk=True)
+
+    filters = [{'season': '24', 'pos': ['DC']}, {'season': '24', 'pos': 'STC', 'mins': 100},
+               {'season': '24', 'eligible': 'Yes', 'attributes': {'pac': 12}}, {'name': 'x'}]
+
+    async def fetch(filters):
+        request = AsyncRequest(**db_login)
+        try:
+            return await request.fetch_many(filters, cache=False), \
+                   await asyncio.gather(*[request.fetch_all(filter, cache=False) for filter in filters])
+        finally:
+            await request.close()
+
+    # Test that a filter without players fails the fetch as a whole.
+    with pytest.raises(NoPlayerFoundError):
+        asyncio.run(fetch(filters))
+
+    # Test that the concurrent fetches give the same players as project, with the same values.
+    fetched, gathered = asyncio.run(fetch(filters[:-1]))
+
+    for filter, players, players_gathered in zip(filters, fetched, gathered):
+        assert len(players) > 0
+        assert dict(players) == dict(players_gathered) == dict(interact.project(**filter))
+
+    # Test that names not yet cached are looked up outside of the event loop, by one Interact for all requests.
+    threads = []
+    record_thread = lambda conn, cursor, statement, *args: threads.append(threading.current_thread())
+
+    LookupCache.get(engine).clear()
+    event.listen(engine, 'before_cursor_execute', record_thread)
+    try:
+        fetched, _ = asyncio.run(fetch(filters[:-1]))
+    finally:
+        event.remove(engine, 'before_cursor_execute', record_thread)
+
+    assert threads and threading.main_thread() not in threads
+    assert AsyncRequest(**db_login).connection.interact is AsyncRequest(**db_login).connection.interact
+
+    remove_all_rows()
+
+def test_player_frame():
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+
+    insert_data_to_database(db_login, './data/test_data.rtf', '24', bulk=True)
+    insert_data_to_database(db_login, './data/test_data.rtf', '25', bulk=True)
+
+    # Test that the frame has the same players as project, in the same order and with the same values,
+    # with one entry per uid when a player has several seasons.
+    for filters in ({'season': '24'}, {'season': ['24', '25'], 'pos': ['DC', 'STC']},
+                    {'season': '24', 'attributes': {'pac': 12}}, {'columns': (Player, Stats)}):
+        frame = interact.project_frame(**filters)
+        projected = list(interact.project(**filters))
+
+        assert len(frame) == len(dict(projected))
+        assert list(frame.to_players().items()) == list(dict(projected).items())
+
+    # Test the columns of the frame: numbers as arrays, names as categoricals.
+    frame = interact.project_frame(season='24')
+    players = dict(interact.project(season='24'))
+
+    assert frame['Stats']['xa'].dtype == np.float32
+    assert frame['PlayerInfo']['mins'].dtype.kind == 'i' and frame['Ca']['ca'].dtype.kind == 'i'
+    assert isinstance(frame['PlayerInfo']['club'], Categorical)
+    assert len(frame['PlayerInfo']['club'].categories) < len(frame)
+    assert frame['PlayerInfo']['club'].tolist() == [tables['PlayerInfo']['club'] for tables in players.values()]
+
+    # Test that the values of the stats are those of the database, not of float32.
+    stats = frame.values('Stats', ['xa', 'npXg'])
+    assert stats.dtype == np.float64 and stats.shape == (len(frame), 2)
+    assert stats.tolist() == [[tables['Stats']['xa'], tables['Stats']['npXg']] for tables in players.values()]
+
+    # Test that fetch_all gives the frame, and caches it apart from the players.
+    request = Request(**db_login)
+    request.cache.clear()
+    hits = request.cache.hits
+    fetched = request.fetch_all(filter={'season': '24'}, frame=True)
+
+    assert isinstance(fetched, PlayerFrame) and fetched.to_players() == frame.to_players()
+    assert isinstance(request.fetch_all(filter={'season': '24'}), Players)
+    assert request.fetch_all(filter={'season': '24'}, frame=True).to_players() == frame.to_players()
+    assert request.cache.hits == hits + 1
+
+    with pytest.raises(NoPlayerFoundError):
+        interact.project_frame(name='x')
+
+    remove_all_rows()
+
+def test_fields():
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+
+    insert_data_to_database(db_login, './data/test_data.rtf', '24', bulk=True)
+
+    fields = {'Stats': ['xa', 'presC', 'psC'], 'Attributes': ['pas', 'dri'], 'Contract': []}
+    players = list(interact.project(season='24'))
+
+    def select_fields(tables):
+        tables = {table_name: {col_name: value for col_name, value in columns.items()
+                               if table_name not in fields or col_name in fields[table_name]}
+                  for table_name, columns in tables.items()}
+        return {table_name: columns for table_name, columns in tables.items() if columns}
+
+    # Test that only the given columns of the tables are selected, in the order of the tables,
+    # and that a table given no columns is left out.
+    selected = list(interact.project(season='24', fields=fields))
+    assert selected == [(uid, select_fields(tables)) for uid, tables in players]
+    assert list(selected[0][1]['Stats']) == ['presC', 'psC', 'xa'] and 'Contract' not in selected[0][1]
+
+    frame = interact.project_frame(season='24', fields=fields)
+    assert list(frame.to_players().items()) == list(dict(selected).items())
+    assert list(interact.page(season='24', fields=fields, size=5)) == selected[:5]
+
+    # Test that the columns are part of the key of the query cache, in any order.
+    request = Request(**db_login)
+    fetched = request.fetch_all(filter={'season': '24', 'fields': fields})
+    assert dict(fetched) == dict(selected)
+
+    hits = request.cache.hits
+    reordered = {'Contract': [], 'Attributes': ['dri', 'pas'], 'Stats': ['psC', 'xa', 'presC']}
+    assert request.fetch_all(filter={'season': '24', 'fields': reordered}, frame=True).to_players() == frame.to_players()
+    assert dict(Request(**db_login).fetch_all(filter={'season': '24', 'fields': reordered})) == dict(selected)
+    assert request.cache.hits == hits + 1
+
+    with pytest.raises(UnexpectedColumnNameError):
+        next(interact.project(season='24', fields={'Stats': ['xa', 'goals']}))
+
+    with pytest.raises(UnexpectedColumnNameError):
+        next(interact.project(season='24', fields={'Attributes': ['_pasHigh']}))
+
+    with pytest.raises(UnexpecteTableNameError):
+        next(interact.project(season='24', columns=(Player, Stats), fields={'Attributes': ['pas']}))
+
+    remove_all_rows()
+
+def test_aggregate():
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+
+    insert_data_to_database(db_login, './data/test_data.rtf', '24', bulk=True)
+
+    filters = {'season': '24', 'pos': ['DC', 'DL', 'DR'], 'mins': 500}
+    stats = ['possLost', 'xa', 'hdrsW']
+    players = [tables['Stats'] for _, tables in interact.project(**filters)]
+
+    # Test that the aggregates of the database are those of the values of the players, exactly for
+    # the values of players and to the precision of the stats otherwise.
+    aggregates = interact.aggregate(**filters, stats=stats, percentiles=(0, 0.5, 1))
+    assert len(aggregates) == len(players) and list(aggregates) == stats
+
+    for stat in stats:
+        values = sorted(player[stat] for player in players)
+        mean = sum(values) / len(values)
+        stddev = (sum((value - mean) ** 2 for value in values) / (len(values) - 1)) ** 0.5
+        median = (values[(len(values) - 1) // 2] + values[len(values) // 2]) / 2
+
+        assert aggregates[stat]['min'] == values[0] and aggregates[stat]['max'] == values[-1]
+        assert aggregates[stat]['avg'] == pytest.approx(mean, rel=1e-6, abs=1e-6)
+        assert aggregates[stat]['stddev'] == pytest.approx(stddev, rel=1e-6, abs=1e-6)
+        assert aggregates[stat]['percentiles'] == {0: values[0], 0.5: pytest.approx(median, rel=1e-6, abs=1e-6), 1: values[-1]}
+
+    # Test that the aggregates are planned with the values of the filters, so that a large cohort of positions
+    # gets a plan of its own after small cohorts rather than the generic plan a prepared statement would keep.
+    statements = []
+    record_statement = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+    cohort = ['DC', 'DL', 'DR', 'DM', 'MC', 'ML', 'MR', 'AMC', 'AML', 'AMR', 'STC']
+    LookupCache.get(engine).find_lookup_ids('Position', ['GK'] + cohort)
+
+    event.listen(engine, 'before_cursor_execute', record_statement)
+    try:
+        for pos in [['GK']] * 5 + [cohort]:
+            interact.aggregate(season='24', pos=pos, stats=stats)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record_statement)
+
+    statements = [(statement, parameters) for statement, parameters in statements if '"seasonVersion"' not in statement]
+    assert len(statements) == 6 and all(statement.startswith('SELECT') for statement, _ in statements)
+
+    with engine.connect() as connection:
+        connection.exec_driver_sql('ANALYZE')
+        costs = [connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}', parameters).scalar()[0]['Plan']['Total Cost']
+                 for statement, parameters in (statements[0], statements[-1])]
+
+    assert costs[1] > costs[0]
+
+    # Test that all stats are aggregated by default, and the same by Request and AsyncRequest.
+    aggregates = Request(**db_login).aggregate(filters)
+    assert list(aggregates) == list(players[0]) and 'percentiles' not in aggregates['xa']
+
+    async def aggregate(filter):
+        request = AsyncRequest(**db_login)
+        try:
+            return await request.aggregate(filter)
+        finally:
+            await request.close()
+
+    assert asyncio.run(aggregate(filters)).stats == aggregates.stats
+
+    with pytest.raises(NoPlayerFoundError):
+        interact.aggregate(name='x')
+
+    with pytest.raises(UnexpectedColumnNameError):
+        interact.aggregate(stats=['xa', 'goals'])
+
+    with pytest.raises(ValueError):
+        interact.aggregate(percentiles=[90])
+
+    remove_all_rows()
+
+def test_migrate_schema():
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+
+    insert_data_to_database(db_login, './data/test_data.rtf', '24', bulk=True)
+
+    players = list(interact.project(season='24'))
+    defenders = list(interact.project(season='24', pos=['DC', 'DL']))
+
+    # Convert the database back to the columns of the first version: one row of player info per
+    # position, the attributes as the text of their ranges and no checksums.
+    attributes = _attribute_columns()
+    with engine.begin() as connection:
+        connection.execute(text('ALTER TABLE player DROP COLUMN "_checksum"'))
+        connection.execute(text('ALTER TABLE "playerInfo" ADD COLUMN old_position INTEGER REFERENCES position (id)'))
+        connection.execute(text('INSERT INTO "playerInfo" (age, rightfoot, leftfoot, mins, division, club, nat, eligible, '
+                                '                          "_playerID", position, old_position) '
+                                'SELECT age, rightfoot, leftfoot, mins, division, club, nat, eligible, "_playerID", \'{}\', p '
+                                'FROM "playerInfo", unnest(position) WITH ORDINALITY AS positions(p, i) WHERE i > 1 '
+                                'ORDER BY "playerInfo"._id, i'))
+        connection.execute(text('UPDATE "playerInfo" SET old_position = position[1] WHERE old_position IS NULL'))
+        connection.execute(text('ALTER TABLE "playerInfo" DROP COLUMN position'))
+        connection.execute(text('ALTER TABLE "playerInfo" RENAME COLUMN old_position TO position'))
+        connection.execute(text('ALTER TABLE attributes ' + ', '.join(
+            f'ALTER COLUMN "{attribute}" TYPE VARCHAR(5) USING CASE WHEN "{attribute}" IS NULL THEN \'-\' '
+            f'WHEN "{attribute}" = "_{attribute}High" THEN "{attribute}"::text '
+            f'ELSE "{attribute}" || \'-\' || "_{attribute}High" END, DROP COLUMN "_{attribute}High"'
+            for attribute in attributes)))
+
+    assert outdated_schema(engine) == ['player._checksum', 'playerInfo.position', 'attributes']
+
+    # Test that the current version refuses to run on the old columns rather than failing in a query.
+    Interact._checked_schemas.clear()
+    with pytest.raises(OutdatedSchemaError):
+        Interact(engine)
+
+    # Test that the migration converts the columns without losing any data, and adds the index of the positions.
+    assert migrate_database(db_login, report=True) == ['ix_playerInfo_position']
+    assert outdated_schema(engine) == []
+
+    assert list(interact.project(season='24')) == players
+    assert list(interact.project(season='24', pos=['DC', 'DL'])) == defenders
+
+    # Test that the migrated database is the same as a new one to insert into.
+    insert_data_to_database(db_login, './data/test_data.rtf', '24', bulk=True, incremental=True)
+    assert [uid for uid, _ in interact.project(season='24')] == [uid for uid, _ in players]
+    assert migrate_database(db_login, report=False) == []
+
+    remove_all_rows()
+
+def test_page():
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+
+    insert_data_to_database(db_login, './data/test_data.rtf', '24', bulk=True)
+    insert_data_to_database(db_login, './data/test_data.rtf', '25', bulk=True)
+
+    # Test that the pages together give the players of project, in the same order, none twice.
+    for filters in ({'season': ['24', '25'], 'pos': ['DC', 'STC']}, {'season': '24', 'mins': 500, 'min_ca': 100},
+                    {'division': 'Bundesliga', 'eligible': 'Yes'}, {'columns': (Player, Ca)}):
+        projected = list(interact.project(**filters))
+
+        paged, page = [], interact.page(**filters, size=7)
+        while True:
+            assert 0 < len(page) <= 7
+            paged.extend(page)
+
+            if page.after is None:
+                break
+            page = interact.page(**filters, size=7, after=page.after)
+
+        assert paged == projected
+
+    # Test that a page that is the whole cohort has no next page.
+    request = Request(**db_login)
+    page = request.fetch_page({'season': '24', 'pos': 'GK', 'mins': 500}, size=1000)
+    assert page.after is None and list(page) == list(interact.project(season='24', pos='GK', mins=500))
+
+    with pytest.raises(NoPlayerFoundError):
+        interact.page(name='x')
+
+    with pytest.raises(ValueError):
+        interact.page(size=0)
+
+    with pytest.raises(ValueError):
+        interact.page(after='not a cursor')
+
+    remove_all_rows()
+
+def test_statement_cache():
+    db_login = {'user': 'postgres', 'password': 'root', 'host': 'localhost:5432', 'database': 'playerstest'}
+
+    insert_data_to_database(db_login, './data/test_data.rtf', '24', bulk=True)
+
+    players = list(interact.project(season='24'))
+    names = [tables['Player']['name'] for _, tables in players[:5]]
+    division = players[0][1]['PlayerInfo']['division']
+
+    statements = []
+    record_statement = lambda conn, cursor, statement, *args: statements.append((statement, cursor.name))
+
+    list(interact.project(division=division, eligible='Yes'))
+    misses = interact.statements.misses
+
+    event.listen(engine, 'before_cursor_execute', record_statement)
+    try:
+        # Test that the queries of one shape give their own players, with one statement built for all,
+        # and that the names of divisions are not looked up in the database.
+        for name in names:
+            assert [uid for uid, _ in interact.project(name=name, season='24')] == \
+                   [uid for uid, tables in players if tables['Player']['name'] == name]
+
+        assert list(interact.project(division=division, eligible='Yes')) == \
+               [(uid, tables) for uid, tables in players
+                if tables['PlayerInfo']['division'] == division and tables['PlayerInfo']['eligible'] == 'Yes']
+
+        assert interact.statements.misses == misses + 1
+
+        # Test that the queries are streamed from a server-side cursor however few players they find, and
+        # that the cached ids of the division and eligibility are only checked against the version stamps.
+        streamed = [statement for statement, cursor_name in statements if cursor_name is not None]
+        assert len(streamed) == 6 and all(statement.startswith('SELECT') for statement in streamed)
+        assert [statement for statement, cursor_name in statements if cursor_name is None] == \
+               [str(QueryCache.versions_query().compile(engine))]
+
+        # Test that pages, of a bounded number of players, run prepared, with one statement for all pages of a shape.
+        statements.clear()
+        for name in names:
+            assert [uid for uid, _ in interact.page(name=name, season='24', size=10).players] == \
+                   [uid for uid, tables in players if tables['Player']['name'] == name][:10]
+
+        executed = [statement for statement, _ in statements]
+        assert len(executed) == 5 and all(statement.startswith('EXECUTE') for statement in executed)
+        assert len({statement.split('(')[0] for statement in executed}) == 1
+    finally:
+        event.remove(engine, 'before_cursor_execute', record_statement)
+
+    # Test that the connections keep the default plan cache mode.
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql('SHOW plan_cache_mode').scalar() == 'auto'
+
+    # Test that the query of select has the values of the filters.
+    assert interact.query(season='24', name=names[0]).compile().params['name'] == [names[0]]
+
+    remove_all_rows()
+
 def test_select():
     interact.create(drop=True, verbose=False)
 
@@ -145,9 +892,9 @@ def test_select():
         for val in vals:
             interact.get_lookup_id(table, (table.lower(), val))
 
-    playerinfo = [{'age': 24, 'rightfoot': 1, 'leftfoot': 2, 'mins': 37, 'division': 1, 'club': 1, 'nat': 1, 'eligible': 1, 'position': 1}]
+    playerinfo = [{'age': 24, 'rightfoot': 1, 'leftfoot': 2, 'mins': 37, 'division': 1, 'club': 1, 'nat': 1, 'eligible': 1, 'position': [1]}]
     contract = {'beginDate': 2027, 'expiryDate': 2031, 'extension': 0, 'wage': 765000, 'releaseClauseFee': 0, 'value': 77535945}
-    attributes = {"cor": "7", "cro": "15", "dri": "12", "fin": "10", "fir": "18", "fre": "14", "hea": "9", "lon": "16", "lth": "8", "mar": "6", "pas": "17", "pen": "4", "tck": "11", "tec": "19", "agg": "13", "ant": "12", "bra": "5", "cmp": "16", "cnt": "20", "decisions": "8", "det": "14", "fla": "3", "ldr": "11", "otb": "10", "pos": "9", "tea": "18", "vis": "15", "wor": "7", "acc": "17", "agi": "19", "bal": "12", "jum": "8", "natF": "13", "pac": "14", "sta": "10", "strength": "20", "aer": "11", "cmd": "15", "com": "16", "ecc": "4", "han": "9", "kic": "8", "oneVsOne": "6", "pun": "7", "ref": "18", "tro": "14", "thr": "13"}
+    attributes = {"cor": 7, "cro": 15, "dri": 12, "fin": 10, "fir": 18, "fre": 14, "hea": 9, "lon": 16, "lth": 8, "mar": 6, "pas": 17, "pen": 4, "tck": 11, "tec": 19, "agg": 13, "ant": 12, "bra": 5, "cmp": 16, "cnt": 20, "decisions": 8, "det": 14, "fla": 3, "ldr": 11, "otb": 10, "pos": 9, "tea": 18, "vis": 15, "wor": 7, "acc": 17, "agi": 19, "bal": 12, "jum": 8, "natF": 13, "pac": 14, "sta": 10, "strength": 20, "aer": 11, "cmd": 15, "com": 16, "ecc": 4, "han": 9, "kic": 8, "oneVsOne": 6, "pun": 7, "ref": 18, "tro": 14, "thr": 13}
     ca = {'ca': 126}
     stats = {'aerA': 2.2, 'hdrsW': 4.2, 'blk': 3.3, 'clr': 4.4, 'tckC': 1.6, 'presA': 2.3, 'presC': 4.3, 'interceptions': 3.1, 'sprints': 4.9, 'possLost': 3.7, 'possWon': 2.3, 'drb': 0.2, 'opCrsA': 3.4, 'opCrsC': 2.7, 'psA': 4.2, 'psC': 1.2, 'prPasses': 1.0, 'opKp': 0.8, 'chC': 0.4, 'xa': 0.3, 'shot': 3.5, 'sht': 2.0, 'npXg': 1.9}
     tables = {'Stats': stats,
@@ -159,9 +906,9 @@ def test_select():
 
     interact.insert(tables, player_table)
 
-    playerinfo2 = [{'age': 30, 'rightfoot': 2, 'leftfoot': 3, 'mins': 45, 'division': 2, 'club': 3, 'nat': 2, 'eligible': 2, 'position': 5}, {'age': 30, 'rightfoot': 2, 'leftfoot': 3, 'mins': 45, 'division': 2, 'club': 3, 'nat': 2, 'eligible': 2, 'position': 6}, {'age': 30, 'rightfoot': 2, 'leftfoot': 3, 'mins': 45, 'division': 2, 'club': 3, 'nat': 2, 'eligible': 2, 'position': 7}, {'age': 30, 'rightfoot': 2, 'leftfoot': 3, 'mins': 45, 'division': 2, 'club': 3, 'nat': 2, 'eligible': 2, 'position': 8}]
+    playerinfo2 = [{'age': 30, 'rightfoot': 2, 'leftfoot': 3, 'mins': 45, 'division': 2, 'club': 3, 'nat': 2, 'eligible': 2, 'position': [5, 6, 7, 8]}]
     contract2 = {'beginDate': 2025, 'expiryDate': 2030, 'extension': 1, 'wage': 800000, 'releaseClauseFee': 500000, 'value': 80000000}
-    attributes2 = {"cor": "5", "cro": "18", "dri": "16", "fin": "13", "fir": "7", "fre": "19", "hea": "12", "lon": "11", "lth": "9", "mar": "8", "pas": "14", "pen": "10", "tck": "6", "tec": "20", "agg": "15", "ant": "8", "bra": "17", "cmp": "13", "cnt": "12", "decisions": "10", "det": "9", "fla": "11", "ldr": "7", "otb": "16", "pos": "18", "tea": "15", "vis": "12", "wor": "14", "acc": "19", "agi": "6", "bal": "9", "jum": "13", "natF": "10", "pac": "8", "sta": "20", "strength": "7", "aer": "18", "cmd": "14", "com": "13", "ecc": "12", "han": "6", "kic": "17", "oneVsOne": "9", "pun": "16", "ref": "19", "tro": "14", "thr": "11"}
+    attributes2 = {"cor": 5, "cro": 18, "dri": 16, "fin": 13, "fir": 7, "fre": 19, "hea": 12, "lon": 11, "lth": 9, "mar": 8, "pas": 14, "pen": 10, "tck": 6, "tec": 20, "agg": 15, "ant": 8, "bra": 17, "cmp": 13, "cnt": 12, "decisions": 10, "det": 9, "fla": 11, "ldr": 7, "otb": 16, "pos": 18, "tea": 15, "vis": 12, "wor": 14, "acc": 19, "agi": 6, "bal": 9, "jum": 13, "natF": 10, "pac": 8, "sta": 20, "strength": 7, "aer": 18, "cmd": 14, "com": 13, "ecc": 12, "han": 6, "kic": 17, "oneVsOne": 9, "pun": 16, "ref": 19, "tro": 14, "thr": 11}
     ca2 = {'ca': 40}
     stats2 = {'aerA': 3.3, 'hdrsW': 2.7, 'blk': 3.5, 'clr': 1.3, 'tckC': 1.1, 'presA': 3.2, 'presC': 0.4, 'interceptions': 5.0, 'sprints': 2.3, 'possLost': 1.2, 'possWon': 0.0, 'drb': 1.4, 'opCrsA': 3.5, 'opCrsC': 3.9, 'psA': 0.4, 'psC': 2.3, 'prPasses': 3.2, 'opKp': 2.4, 'chC': 3.2, 'xa': 0.2, 'shot': 3.4, 'sht': 2.7, 'npXg': 2.3}
     tables2 = {'Stats': stats2,
@@ -172,9 +919,9 @@ def test_select():
     player_table2 = {'name': 'blablabla', 'uid': '2', 'season': '24'}
     interact.insert(tables2, player_table2)
     
-    playerinfo3 = [{'age': 24, 'rightfoot': 1, 'leftfoot': 2, 'mins': 105, 'division': 20, 'club': 1, 'nat': 1, 'eligible': 1, 'position': 2}]
+    playerinfo3 = [{'age': 24, 'rightfoot': 1, 'leftfoot': 2, 'mins': 105, 'division': 20, 'club': 1, 'nat': 1, 'eligible': 1, 'position': [2]}]
     contract3 = {'beginDate': 2025, 'expiryDate': 2030, 'extension': 1, 'wage': 800000, 'releaseClauseFee': 500000, 'value': 80000000}
-    attributes3 = {"cor": "5", "cro": "18", "dri": "16", "fin": "13", "fir": "7", "fre": "19", "hea": "12", "lon": "11", "lth": "9", "mar": "8", "pas": "14", "pen": "10", "tck": "6", "tec": "20", "agg": "15", "ant": "8", "bra": "17", "cmp": "13", "cnt": "12", "decisions": "10", "det": "9", "fla": "11", "ldr": "7", "otb": "16", "pos": "18", "tea": "15", "vis": "12", "wor": "14", "acc": "19", "agi": "6", "bal": "9", "jum": "13", "natF": "10", "pac": "8", "sta": "20", "strength": "7", "aer": "18", "cmd": "14", "com": "13", "ecc": "12", "han": "6", "kic": "17", "oneVsOne": "9", "pun": "16", "ref": "19", "tro": "14", "thr": "11"}
+    attributes3 = {"cor": 5, "cro": 18, "dri": 16, "fin": 13, "fir": 7, "fre": 19, "hea": 12, "lon": 11, "lth": 9, "mar": 8, "pas": 14, "pen": 10, "tck": 6, "tec": 20, "agg": 15, "ant": 8, "bra": 17, "cmp": 13, "cnt": 12, "decisions": 10, "det": 9, "fla": 11, "ldr": 7, "otb": 16, "pos": 18, "tea": 15, "vis": 12, "wor": 14, "acc": 19, "agi": 6, "bal": 9, "jum": 13, "natF": 10, "pac": 8, "sta": 20, "strength": 7, "aer": 18, "cmd": 14, "com": 13, "ecc": 12, "han": 6, "kic": 17, "oneVsOne": 9, "pun": 16, "ref": 19, "tro": 14, "thr": 11}
     ca3 = {'ca': 130}
     stats3 = {'aerA': 3.3, 'hdrsW': 2.7, 'blk': 3.5, 'clr': 1.3, 'tckC': 1.1, 'presA': 3.2, 'presC': 0.4, 'interceptions': 5.0, 'sprints': 2.3, 'possLost': 1.2, 'possWon': 0.0, 'drb': 1.4, 'opCrsA': 3.5, 'opCrsC': 3.9, 'psA': 0.4, 'psC': 2.3, 'prPasses': 3.2, 'opKp': 2.4, 'chC': 3.2, 'xa': 0.2, 'shot': 3.4, 'sht': 2.7, 'npXg': 2.3}
     tables3 = {'Stats': stats3,
@@ -279,29 +1026,114 @@ def test_select():
     # Expect player 2
     _select_tst_helper(expected_uids={'2'}, season='24')
 
+    ###### Test streaming ######
+    # Expect the rows to be fetched from a server-side cursor that is closed when the players are consumed
+    players = interact.select()
+    next(players)
+    assert interact.session.execute(text('SELECT count(*) FROM pg_cursors')).scalar() == 1
+    assert len(list(players)) == 2
+    assert interact.session.execute(text('SELECT count(*) FROM pg_cursors')).scalar() == 0
+
+    ###### Test attributes filter ######
+    # Expect no players and NoPlayerFoundError to be raised
+    with pytest.raises(NoPlayerFoundError):
+        _, _ = _select_helper(attributes={'pac': 15})
+
+    # Expect player 1
+    _select_tst_helper(expected_uids={'1'}, attributes={'pac': 10})
+
+    # Expect player 2 and 3
+    _select_tst_helper(expected_uids={'2', '3'}, attributes={'pac': 8, 'sta': 20})
+
+    # Expect UnexpectedColumnNameError for names that are not attributes
+    with pytest.raises(UnexpectedColumnNameError):
+        _, _ = _select_helper(attributes={'pace': 10})
+
+    with pytest.raises(UnexpectedColumnNameError):
+        _, _ = _select_helper(attributes={'_pacHigh': 10})
+
+    ###### Test projection ######
+    # Expect the same tables as unpacking the ORM objects of select, in the same order
+    for filters in ({}, {'pos': ['ML', 'MC'], 'season': ['23', '25']}, {'attributes': {'pac': 8}}):
+        selected = [(uid, Players().unpack_tables(rows)) for uid, rows in interact.select(**filters)]
+        projected = list(interact.project(**filters))
+
+        assert projected == selected
+        assert [list(tables['PlayerInfo']) for _, tables in projected] == \
+               [list(tables['PlayerInfo']) for _, tables in selected]
+
+    _, tables = next(interact.project(name='blablabla'))
+    assert tables['PlayerInfo']['position'] == ['DR', 'GK', 'STC', 'DC']
+    assert tables['PlayerInfo']['rightfoot'] == 'Reasonable' and tables['PlayerInfo']['leftfoot'] == '-'
+
+    # Expect the columns of a subset of the tables only
+    _, tables = next(interact.project(name='blabla', columns=(Player, Ca)))
+    assert tables == {'Player': {'name': 'blabla', 'uid': '1', 'season': '23'}, 'Ca': {'ca': 126}}
+
+    with pytest.raises(NoPlayerFoundError):
+        next(interact.project(name='x'))
+
+    ###### Test lookup names ######
+    # Expect a cohort to be fetched and unpacked with one query, the lookup names included
+    statements = []
+    count_statement = lambda conn, cursor, statement, *args: statements.append(statement)
+
+    interact.session.expunge_all()
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    try:
+        players = [Players().unpack_tables(rows) for _, rows in interact.select()]
+        projected = [tables for _, tables in interact.project()]
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+
+    assert len(players) == 3 and players == projected
+    assert len(statements) == 2
+
+    # Expect the total of the progress bar to be estimated by an EXPLAIN only when asked for
+    statements.clear()
+    event.listen(engine, 'before_cursor_execute', count_statement)
+    try:
+        assert [tables for _, tables in interact.project(progress=True)] == projected
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_statement)
+
+    assert len(statements) == 2 and statements[0].startswith('EXPLAIN')
+
 
     remove_all_rows()
 
 
+def test_unpacker():
+    unpack = Unpacker([None, ('Player', 'name'), ('Attributes', 'cro'), None, ('Ca', 'ca'), ('Attributes', 'pac'), None],
+                      ranges={2: 3, 5: 6})
+
+    assert unpack(('1', 'blabla', 12, 15, 126, 14, 14)) == \
+        {'Player': {'name': 'blabla'}, 'Attributes': {'cro': '12-15', 'pac': 14}, 'Ca': {'ca': 126}}
+
+    assert unpack(('1', 'blabla', None, None, 126, 14, None))['Attributes'] == {'cro': '-', 'pac': 14}
+
+
 def _select_tst_helper(expected_positions=None, expected_uids=None, raw_positions=None,
-                        mins=0, name=None, division=None, min_ca=0, eligible=None, season=None):
+                        mins=0, name=None, division=None, min_ca=0, eligible=None, season=None, attributes=None):
     found_positions, found_uids = _select_helper(pos=raw_positions, mins=mins, name=name,
-                                                division=division, min_ca=min_ca, eligible=eligible, season=season)
+                                                division=division, min_ca=min_ca, eligible=eligible, season=season,
+                                                attributes=attributes)
     
     if expected_positions:
         assert found_positions == expected_positions, f'Expected values {expected_positions}, but found values {found_positions}'
     
     assert found_uids == expected_uids, f'Expected values {expected_uids}, but found values {found_uids}'
 
-def _select_helper(pos=None, mins=0, name=None, division=None, min_ca=0, eligible=None, season=None):
-    res = [row for row in interact.select(pos=pos, mins=mins, name=name, division=division, min_ca=min_ca, eligible=eligible, season=season)]
+def _select_helper(pos=None, mins=0, name=None, division=None, min_ca=0, eligible=None, season=None, attributes=None):
+    res = [row for row in interact.select(pos=pos, mins=mins, name=name, division=division, min_ca=min_ca, eligible=eligible, season=season,
+                                          attributes=attributes)]
     
     positions, players = set(), set()
     
     for _, tables_of_player in res:
         for table_of_player in tables_of_player:
     
-            positions.add(table_of_player.PlayerInfo.position)
+            positions.update(table_of_player.PlayerInfo.position)
             players.add(table_of_player.Player.uid)
     
     return positions, players
@@ -309,7 +1141,7 @@ def _select_helper(pos=None, mins=0, name=None, division=None, min_ca=0, eligibl
 
 def remove_all_rows():
     interact.session.flush()
-    table_names = ('stats', '"playerInfo"', 'attributes', 'contract', 'ca', 'player', 'foot', 'position', 'club', 'nat', 'division', 'eligible')
+    table_names = ('stats', '"playerInfo"', 'attributes', 'contract', 'ca', 'player', 'foot', 'position', 'club', 'nat', 'division', 'eligible', '"seasonVersion"')
     query = text(f'TRUNCATE TABLE {', '.join(table_names)} RESTART IDENTITY CASCADE;')
     interact.session.execute(query)
     interact.session.commit()
\ No newline at end of file